@@ -3,7 +3,7 @@
 所有工具插件都需要继承此类
 """
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 
 class BasePlugin(ABC):
@@ -57,6 +57,19 @@ class BasePlugin(ABC):
         """
         return []
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        获取本次调用的结果缓存策略，返回None表示不缓存（默认）
+        只有结果完全由参数（以及参数指向的文件内容）决定的调用才应该声明缓存
+
+        Returns:
+            缓存策略，格式: {
+                "file_params": ["input_file"],  # 值为文件路径的参数，文件变化后缓存失效（可选）
+                "ttl": 300                      # 缓存有效期（秒），省略表示不过期（可选）
+            }
+        """
+        return None
+    
     def validate_params(self, params: Dict[str, Any]) -> tuple[bool, str]:
         """
         验证参数
@@ -0,0 +1,338 @@
+"""
+内容寻址文件存储
+上传文件和输出文件按SHA-256保存为 <root>/<哈希前2位>/<哈希><扩展名>，相同内容和扩展名只保存一份
+（扩展名是键的一部分：按扩展名判断格式的工具拿到的路径总与文件名的类型一致）；
+文件名到内容的映射保存在SQLite索引中，同名文件再次写入时只改变映射，不会覆盖正在被读取的旧文件。
+每个文件记录引用计数，垃圾回收按时间和总大小配额清理不再使用的文件
+"""
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """计算文件的SHA-256"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BUFFER_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class BlobStore:
+    """内容寻址文件存储"""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: 存储目录，索引数据库和临时目录也位于其中
+        """
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._gc_stop = threading.Event()
+        self._gc_thread: Optional[threading.Thread] = None
+
+        self._conn = sqlite3.connect(os.path.join(self.root, "index.db"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # blobs.hash 与 names.hash 保存内容的键（SHA-256加扩展名，见 _blob_key）
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS names (
+                namespace TEXT NOT NULL,
+                name TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, name)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_names_hash ON names(hash)")
+        self._conn.commit()
+
+    def new_temp_path(self, suffix: str = "") -> str:
+        """在存储目录内生成临时文件路径（与最终位置在同一文件系统，保证可原子重命名）"""
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    def put_file(self, src_path: str, name: str, namespace: str = "uploads",
+                 digest: str = None) -> Dict[str, Any]:
+        """
+        把文件存入存储并以 name 命名（src_path 会被移动或删除）
+
+        Args:
+            src_path: 已写入完成的源文件
+            name: 文件名（同一命名空间内唯一，再次写入同名文件时指向新内容）
+            namespace: 命名空间，如 uploads、outputs
+            digest: 已知的SHA-256，未提供时读取文件计算
+
+        Returns:
+            {"hash", "path", "size", "name", "deduplicated"}
+        """
+        digest = digest or hash_file(src_path)
+        key = self._blob_key(digest, name)
+        blob_path = os.path.join(self.root, digest[:2], key)
+        size = os.path.getsize(src_path)
+
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM blobs WHERE hash = ?", (key,)).fetchone()
+            deduplicated = row is not None and os.path.exists(row[0])
+            if deduplicated:
+                os.remove(src_path)
+                blob_path = row[0]
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                self._move_into_place(src_path, blob_path)
+                now = time.time()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (hash, path, size, refcount, created_at, last_access) "
+                    "VALUES (?, ?, ?, COALESCE((SELECT refcount FROM blobs WHERE hash = ?), 0), ?, ?)",
+                    (key, blob_path, size, key, now, now)
+                )
+            self._link_locked(key, name, namespace)
+            self._conn.commit()
+
+        return {"hash": digest, "path": blob_path, "size": size, "name": name, "deduplicated": deduplicated}
+
+    def link(self, digest: str, name: str, namespace: str = "uploads") -> Optional[Dict[str, Any]]:
+        """为已存在的内容添加文件名（用于客户端提供哈希时的秒传），相同内容和扩展名的文件不存在时返回None"""
+        key = self._blob_key(digest, name)
+        with self._lock:
+            row = self._conn.execute("SELECT path, size FROM blobs WHERE hash = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                return None
+            self._link_locked(key, name, namespace)
+            self._conn.commit()
+        return {"hash": digest, "path": row[0], "size": row[1], "name": name, "deduplicated": True}
+
+    def resolve(self, name: str, namespace: str = "uploads") -> Optional[str]:
+        """按文件名查找文件路径，并刷新访问时间"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.path, b.hash FROM names n JOIN blobs b ON b.hash = n.hash "
+                "WHERE n.namespace = ? AND n.name = ?",
+                (namespace, name)
+            ).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                return None
+            now = time.time()
+            self._conn.execute(
+                "UPDATE names SET last_access = ? WHERE namespace = ? AND name = ?", (now, namespace, name)
+            )
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, row[1]))
+            self._conn.commit()
+        return row[0]
+
+    def name_for_path(self, path: str) -> Optional[str]:
+        """查找存储中文件对应的（最近使用的）原始文件名，不是存储中的文件时返回None"""
+        path = os.path.abspath(path)
+        if os.path.dirname(os.path.dirname(path)) != self.root:
+            return None
+        key = os.path.basename(path)
+        with self._lock:
+            # 早期版本的键不含扩展名
+            row = self._conn.execute(
+                "SELECT name FROM names WHERE hash IN (?, ?) ORDER BY last_access DESC LIMIT 1",
+                (key, os.path.splitext(key)[0])
+            ).fetchone()
+        return row[0] if row else None
+
+    def unlink(self, name: str, namespace: str = "uploads") -> bool:
+        """删除文件名，内容在引用计数归零后由垃圾回收清理"""
+        with self._lock:
+            removed = self._unlink_locked(name, namespace)
+            self._conn.commit()
+        return removed
+
+    def gc(self, max_age: float = 7 * 24 * 3600, max_bytes: int = 0, grace: float = 3600) -> Dict[str, Any]:
+        """
+        垃圾回收
+
+        Args:
+            max_age: 超过该时间（秒）未被访问的文件名被删除
+            max_bytes: 存储总大小上限，超出时按最久未访问的顺序删除文件名，0表示不限制
+            grace: 最近该时间（秒）内创建或访问过的内容不会被删除，避免清理正在被任务读取的文件
+
+        Returns:
+            {"names_removed", "blobs_removed", "bytes_freed", "total_bytes"}
+        """
+        now = time.time()
+        names_removed = 0
+        with self._lock:
+            # 1. 按时间配额删除长期未访问的文件名
+            cutoff = now - max(max_age, grace)
+            for namespace, name in self._conn.execute(
+                "SELECT namespace, name FROM names WHERE last_access < ?", (cutoff,)
+            ).fetchall():
+                names_removed += self._unlink_locked(name, namespace)
+
+            # 2. 按大小配额删除最久未访问的文件名（只考虑宽限期之外的内容）
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if max_bytes and total > max_bytes:
+                rows = self._conn.execute(
+                    "SELECT n.namespace, n.name, b.hash, b.size FROM names n JOIN blobs b ON b.hash = n.hash "
+                    "WHERE b.last_access < ? ORDER BY n.last_access ASC",
+                    (now - grace,)
+                ).fetchall()
+                released = set()
+                for namespace, name, digest, size in rows:
+                    if total <= max_bytes:
+                        break
+                    names_removed += self._unlink_locked(name, namespace)
+                    refcount = self._conn.execute(
+                        "SELECT refcount FROM blobs WHERE hash = ?", (digest,)
+                    ).fetchone()[0]
+                    if refcount <= 0 and digest not in released:
+                        released.add(digest)
+                        total -= size
+
+            # 3. 删除引用计数为0且已过宽限期的内容
+            blobs_removed, bytes_freed = 0, 0
+            for digest, path, size in self._conn.execute(
+                "SELECT hash, path, size FROM blobs WHERE refcount <= 0 AND last_access < ?", (now - grace,)
+            ).fetchall():
+                if os.path.exists(path):
+                    os.remove(path)
+                self._conn.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+                blobs_removed += 1
+                bytes_freed += size
+            self._conn.commit()
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+        # 4. 清理中断写入遗留的临时文件
+        for entry in os.scandir(self.tmp_dir):
+            try:
+                if now - entry.stat().st_mtime > grace:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+        if names_removed or blobs_removed:
+            logger.info(
+                f"文件存储垃圾回收: 删除 {names_removed} 个文件名, {blobs_removed} 个文件, "
+                f"释放 {bytes_freed / 1024 / 1024:.1f} MB, 当前 {total / 1024 / 1024:.1f} MB"
+            )
+        return {
+            "names_removed": names_removed,
+            "blobs_removed": blobs_removed,
+            "bytes_freed": bytes_freed,
+            "total_bytes": total
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """存储统计信息"""
+        with self._lock:
+            blobs, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            names = self._conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        return {"blobs": blobs, "names": names, "total_bytes": total}
+
+    def start_gc(self, interval: float, **quotas):
+        """启动后台垃圾回收线程，每隔 interval 秒按 quotas（同 gc() 的参数）执行一次"""
+        if self._gc_thread and self._gc_thread.is_alive():
+            return
+
+        def run():
+            while not self._gc_stop.wait(interval):
+                try:
+                    self.gc(**quotas)
+                except Exception as e:
+                    logger.error(f"文件存储垃圾回收失败: {str(e)}")
+
+        self._gc_stop.clear()
+        self._gc_thread = threading.Thread(target=run, name="blob-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_gc(self):
+        """停止后台垃圾回收线程"""
+        self._gc_stop.set()
+
+    def _link_locked(self, key: str, name: str, namespace: str):
+        """把文件名指向指定内容，并维护新旧内容的引用计数"""
+        row = self._conn.execute(
+            "SELECT hash FROM names WHERE namespace = ? AND name = ?", (namespace, name)
+        ).fetchone()
+        if row and row[0] == key:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE names SET last_access = ? WHERE namespace = ? AND name = ?", (now, namespace, name)
+            )
+            self._conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, key))
+            return
+        if row:
+            self._unlink_locked(name, namespace)
+
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO names (namespace, name, hash, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (namespace, name, key, now, now)
+        )
+        self._conn.execute(
+            "UPDATE blobs SET refcount = refcount + 1, last_access = ? WHERE hash = ?", (now, key)
+        )
+
+    def _unlink_locked(self, name: str, namespace: str) -> bool:
+        """删除文件名并减少对应内容的引用计数"""
+        row = self._conn.execute(
+            "SELECT hash FROM names WHERE namespace = ? AND name = ?", (namespace, name)
+        ).fetchone()
+        if row is None:
+            return False
+        self._conn.execute("DELETE FROM names WHERE namespace = ? AND name = ?", (namespace, name))
+        self._conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", (row[0],))
+        return True
+
+    @staticmethod
+    def _blob_key(digest: str, name: str) -> str:
+        """内容的键：SHA-256加上文件名的扩展名（小写），相同内容以不同扩展名写入时分别保存"""
+        return f"{digest}{os.path.splitext(name)[1].lower()}"
+
+    @staticmethod
+    def _move_into_place(src_path: str, blob_path: str):
+        """原子地把文件移动到最终位置；跨文件系统时先复制到目标目录下的临时文件再重命名"""
+        try:
+            os.replace(src_path, blob_path)
+        except OSError:
+            tmp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, blob_path)
+            os.remove(src_path)
+
+
+_store: Optional[BlobStore] = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """获取进程内共享的文件存储实例（按config.py配置延迟创建）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                import config
+                _store = BlobStore(getattr(config, 'BLOB_STORE_DIR', 'uploads/blobs'))
+    return _store
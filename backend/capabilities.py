@@ -0,0 +1,190 @@
+"""
+硬件与编码器能力注册表
+进程内共享一份 ffmpeg 编码器列表和 NVIDIA 显卡信息，探测结果按TTL缓存，
+过期后在后台线程刷新，调用方始终直接拿到缓存结果，不必每次请求都启动外部进程
+"""
+import logging
+import subprocess
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def _probe_ffmpeg() -> Dict[str, Any]:
+    """探测ffmpeg版本和支持的编码器（一次 ffmpeg -encoders 调用）"""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+        return {"installed": False, "version": None, "encoders": []}
+
+    if result.returncode != 0:
+        return {"installed": False, "version": None, "encoders": []}
+
+    # 版本信息在stderr的横幅中，如 "ffmpeg version 6.1.1 Copyright ..."
+    version = None
+    for line in result.stderr.splitlines():
+        if line.startswith("ffmpeg version"):
+            version = line.split()[2]
+            break
+
+    # 编码器列表格式: " V....D libx264   libx264 H.264 / AVC ..."，位于 "------" 分隔行之后
+    encoders = []
+    in_list = False
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if not in_list:
+            in_list = bool(parts) and set(parts[0]) == {"-"}
+            continue
+        if len(parts) >= 2 and len(parts[0]) == 6:
+            encoders.append(parts[1])
+
+    return {"installed": True, "version": version, "encoders": encoders}
+
+
+def _probe_nvidia_gpus() -> List[Dict[str, str]]:
+    """通过nvidia-smi获取所有NVIDIA显卡的型号和显存"""
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+        return []
+
+    if result.returncode != 0:
+        return []
+
+    gpus = []
+    # 输出格式: "GPU Name, 8192 MiB"
+    for line in result.stdout.strip().splitlines():
+        parts = line.split(',')
+        if len(parts) < 2:
+            continue
+        memory_str = parts[1].strip()
+        try:
+            memory = f"{round(float(memory_str.split()[0]) / 1024, 1)} GB"
+        except (ValueError, IndexError):
+            memory = memory_str
+        gpus.append({"model": parts[0].strip(), "memory": memory})
+    return gpus
+
+
+class CapabilityRegistry:
+    """能力注册表：首次使用时同步探测，之后按TTL在后台刷新"""
+
+    def __init__(self, ttl: float = 300):
+        """
+        Args:
+            ttl: 探测结果有效期（秒），过期后返回旧结果并触发后台刷新
+        """
+        self.ttl = ttl
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> Dict[str, Any]:
+        """
+        获取能力信息
+
+        Returns:
+            {"ffmpeg": {"installed", "version", "encoders"}, "nvidia_gpus": [{"model", "memory"}], "probed_at": 时间戳}
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+
+        if time.time() - snapshot["probed_at"] > self.ttl:
+            self._refresh_in_background()
+        return snapshot
+
+    def refresh(self) -> Dict[str, Any]:
+        """立即重新探测（同一时间只有一个探测在执行，其他调用等待其结果）"""
+        previous = self._snapshot
+        with self._lock:
+            # 等锁期间其他线程已完成探测时直接使用其结果
+            if self._snapshot is not previous:
+                return self._snapshot
+
+            start = time.time()
+            snapshot = {
+                "ffmpeg": _probe_ffmpeg(),
+                "nvidia_gpus": _probe_nvidia_gpus(),
+                "probed_at": time.time()
+            }
+            self._snapshot = snapshot
+            logger.info(
+                f"能力探测完成，耗时 {time.time() - start:.2f}s: "
+                f"ffmpeg={'已安装' if snapshot['ffmpeg']['installed'] else '未安装'}, "
+                f"NVIDIA显卡 {len(snapshot['nvidia_gpus'])} 张"
+            )
+            return snapshot
+
+    def has_encoder(self, encoder: str) -> bool:
+        """ffmpeg是否支持指定编码器"""
+        return encoder in self.get()["ffmpeg"]["encoders"]
+
+    def start(self):
+        """启动后台线程：立即探测一次，之后每隔TTL刷新"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="capability-probe", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台刷新线程"""
+        self._stop_event.set()
+
+    def _refresh_loop(self):
+        """后台刷新循环"""
+        while not self._stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"能力探测失败: {str(e)}")
+            self._stop_event.wait(self.ttl)
+
+    def _refresh_in_background(self):
+        """结果过期时在后台线程刷新，避免阻塞当前请求"""
+        with self._refreshing_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"能力探测失败: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="capability-refresh", daemon=True).start()
+
+
+_registry: Optional[CapabilityRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_capability_registry() -> CapabilityRegistry:
+    """获取进程内共享的能力注册表（按config.py配置延迟创建）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                import config
+                _registry = CapabilityRegistry(getattr(config, 'CAPABILITY_TTL', 300))
+    return _registry
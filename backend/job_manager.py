@@ -0,0 +1,330 @@
+"""
+任务管理器
+负责长耗时插件执行的异步调度：提交后立即返回任务ID，
+由有界线程池在后台执行，并按插件限制并发数
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from .plugin_manager import PluginManager
+from .job_store import JobStore
+
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+# 当前线程正在执行的任务，插件可通过 get_current_job() 上报进度或检查取消
+_local = threading.local()
+
+
+def get_current_job() -> Optional["Job"]:
+    """获取当前线程正在执行的任务（不在任务中执行时返回None）"""
+    return getattr(_local, "job", None)
+
+
+class Job:
+    """单个异步任务"""
+
+    # 使用任务存储时，读取取消标记和保存进度的最小间隔（秒）
+    STORE_SYNC_INTERVAL = 1.0
+
+    def __init__(self, plugin_name: str, params: Dict[str, Any], store: Optional[JobStore] = None):
+        self.id = uuid.uuid4().hex
+        self.plugin_name = plugin_name
+        self.params = params or {}
+        self.status = JOB_QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.progress: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self._store = store
+        self._cancel_checked_at = 0.0
+        self._persisted_at = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """由任务存储中的记录构造任务快照（用于查询其他工作进程中的任务）"""
+        job = cls(data["plugin"], data.get("params"))
+        job.id = data["id"]
+        job.status = data["status"]
+        job.result = data.get("result")
+        job.error = data.get("error")
+        job.progress = data.get("progress") or {}
+        job.created_at = data.get("created_at")
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        if data.get("cancel_requested"):
+            job.cancel_event.set()
+        return job
+
+    @property
+    def cancel_requested(self) -> bool:
+        """是否已请求取消"""
+        if self.cancel_event.is_set():
+            return True
+
+        # 多进程部署时，取消请求可能由其他工作进程写入任务存储
+        now = time.time()
+        if self._store and now - self._cancel_checked_at >= self.STORE_SYNC_INTERVAL:
+            self._cancel_checked_at = now
+            if self._store.is_cancel_requested(self.id):
+                self.cancel_event.set()
+                return True
+        return False
+
+    def update_progress(self, **progress):
+        """更新任务进度（由插件在执行过程中调用）"""
+        self.progress.update(progress)
+        if self._store and time.time() - self._persisted_at >= self.STORE_SYNC_INTERVAL:
+            self.persist()
+
+    def persist(self):
+        """把任务当前状态写入任务存储（未使用存储时不做任何事）"""
+        if self._store:
+            self._persisted_at = time.time()
+            self._store.save(self)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        data = {
+            "id": self.id,
+            "plugin": self.plugin_name,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """任务管理器"""
+
+    def __init__(self, plugin_manager: PluginManager, max_workers: int = 4,
+                 max_queued: int = 100, plugin_limits: Dict[str, int] = None,
+                 history_limit: int = 200, store: Optional[JobStore] = None):
+        """
+        Args:
+            plugin_manager: 插件管理器
+            max_workers: 同时执行的任务总数上限（线程池大小）
+            max_queued: 排队任务数上限，超过后拒绝提交
+            plugin_limits: 每个插件的并发上限 {plugin_name: limit}，未配置的插件仅受总数限制
+            history_limit: 保留的已结束任务数量，超出后淘汰最早结束的任务
+            store: 任务存储，多进程部署时用于在工作进程间共享任务状态；
+                   为None时任务只保存在当前进程内存中
+        """
+        self.plugin_manager = plugin_manager
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.plugin_limits = plugin_limits or {}
+        self.history_limit = history_limit
+        self.store = store
+
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: deque = deque()
+        self._running: Dict[str, int] = {}  # {plugin_name: 运行中任务数}
+        self._running_total = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._shutdown = False
+
+        if store:
+            # 上次运行时所属进程已退出的任务不会再有结果
+            orphaned = store.mark_orphaned("服务进程已退出，任务中断，请重新提交")
+            if orphaned:
+                logger.warning(f"{orphaned} 个未完成的任务因所属进程退出被标记为失败")
+
+    def submit(self, plugin_name: str, params: Dict[str, Any] = None) -> tuple[bool, Any]:
+        """
+        提交任务
+
+        Returns:
+            (是否成功, Job或错误信息)
+        """
+        plugin = self.plugin_manager.get_plugin(plugin_name)
+        if not plugin:
+            return False, f"插件不存在: {plugin_name}"
+
+        # 提交前先校验参数，避免排队后才失败
+        valid, error_msg = plugin.validate_params(params)
+        if not valid:
+            return False, f"参数验证失败: {error_msg}"
+
+        job = Job(plugin_name, params, self.store)
+        with self._lock:
+            if self._shutdown:
+                return False, "任务管理器已关闭"
+            if len(self._pending) >= self.max_queued:
+                return False, f"任务队列已满（{self.max_queued}），请稍后重试"
+
+            self.jobs[job.id] = job
+            self._pending.append(job)
+            job.persist()
+            self._dispatch_locked()
+
+        logger.info(f"提交任务 {job.id} ({plugin_name})")
+        return True, job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        """获取指定任务（当前进程中没有时从任务存储读取快照）"""
+        job = self.jobs.get(job_id)
+        if job is None and self.store:
+            data = self.store.load(job_id)
+            if data:
+                job = Job.from_dict(data)
+        return job
+
+    def list_jobs(self, status: str = None, plugin_name: str = None) -> List[Dict[str, Any]]:
+        """列出任务（不包含执行结果）"""
+        if self.store:
+            return self.store.list(status, plugin_name)
+
+        with self._lock:
+            jobs = list(self.jobs.values())
+        return [
+            job.to_dict(include_result=False) for job in jobs
+            if (status is None or job.status == status)
+            and (plugin_name is None or job.plugin_name == plugin_name)
+        ]
+
+    def cancel(self, job_id: str) -> tuple[bool, str]:
+        """
+        取消任务
+        排队中的任务直接取消；运行中的任务设置取消标记，
+        支持协作取消的插件会尽快停止，其余插件的结果将被丢弃
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job:
+                if self.store:
+                    # 任务在其他工作进程中，写入取消标记由所属进程处理
+                    return self.store.request_cancel(job_id)
+                return False, f"任务不存在: {job_id}"
+            if job.status in FINISHED_STATES:
+                return False, f"任务已结束: {job.status}"
+
+            job.cancel_event.set()
+            if job.status == JOB_QUEUED:
+                self._pending.remove(job)
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                job.persist()
+                self._trim_history_locked()
+                return True, "任务已取消"
+
+            job.persist()
+
+        return True, "已请求取消，任务将在当前步骤结束后停止"
+
+    def stats(self) -> Dict[str, Any]:
+        """任务池统计信息"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running_total,
+                "queued": len(self._pending),
+                "running_by_plugin": dict(self._running),
+                "plugin_limits": dict(self.plugin_limits)
+            }
+
+    def shutdown(self, wait: bool = False):
+        """关闭任务管理器，取消所有排队中的任务"""
+        with self._lock:
+            self._shutdown = True
+            while self._pending:
+                job = self._pending.popleft()
+                job.cancel_event.set()
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                job.persist()
+            for job in self.jobs.values():
+                if job.status == JOB_RUNNING:
+                    job.cancel_event.set()
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch_locked(self):
+        """在持有锁的情况下，把满足并发限制的排队任务交给线程池"""
+        if self._shutdown:
+            return
+
+        # 按提交顺序扫描，跳过已达到插件并发上限的任务
+        for job in list(self._pending):
+            # 其他工作进程可能已通过任务存储取消了排队中的任务
+            if job.cancel_requested:
+                self._pending.remove(job)
+                job.status = JOB_CANCELLED
+                job.finished_at = time.time()
+                job.persist()
+                continue
+            if self._running_total >= self.max_workers:
+                break
+            limit = self.plugin_limits.get(job.plugin_name)
+            if limit is not None and self._running.get(job.plugin_name, 0) >= limit:
+                continue
+
+            self._pending.remove(job)
+            self._running[job.plugin_name] = self._running.get(job.plugin_name, 0) + 1
+            self._running_total += 1
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            job.persist()
+            self._executor.submit(self._run_job, job)
+
+    def _run_job(self, job: Job):
+        """在工作线程中执行任务"""
+        _local.job = job
+        try:
+            result = self.plugin_manager.execute_plugin(job.plugin_name, job.params)
+            if job.cancel_requested:
+                job.status = JOB_CANCELLED
+            elif result.get("success"):
+                job.status = JOB_COMPLETED
+            else:
+                job.status = JOB_FAILED
+                job.error = result.get("message") or result.get("error")
+            job.result = result
+        except Exception as e:
+            logger.error(f"任务 {job.id} 执行异常: {str(e)}")
+            job.status = JOB_FAILED
+            job.error = str(e)
+        finally:
+            _local.job = None
+            job.finished_at = time.time()
+            job.persist()
+            logger.info(f"任务 {job.id} ({job.plugin_name}) 结束: {job.status}")
+
+            with self._lock:
+                self._running[job.plugin_name] -= 1
+                if self._running[job.plugin_name] <= 0:
+                    del self._running[job.plugin_name]
+                self._running_total -= 1
+                self._trim_history_locked()
+                self._dispatch_locked()
+
+    def _trim_history_locked(self):
+        """淘汰超出保留数量的已结束任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history_limit)]:
+            del self.jobs[job_id]
+        if self.store:
+            self.store.trim(self.history_limit)
@@ -0,0 +1,198 @@
+"""
+任务存储
+把任务状态、进度、结果和取消标记保存到SQLite，
+生产模式下多个工作进程共用同一份任务记录：任一进程都能查询和取消其他进程中的任务
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+
+# 与 job_manager 中的状态常量保持一致（此处不导入以避免循环依赖）
+_UNFINISHED_STATES = ("queued", "running")
+_FINISHED_STATES = ("completed", "failed", "cancelled")
+
+
+class JobStore:
+    """基于SQLite的任务存储（WAL模式，可被多个进程同时读写）"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                plugin TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params TEXT,
+                result TEXT,
+                error TEXT,
+                progress TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER,
+                created_at REAL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+        self._conn.commit()
+
+    def save(self, job) -> None:
+        """保存任务（新增或更新）；取消标记只会被置位，不会被覆盖清除"""
+        data = job.to_dict()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, plugin, status, params, result, error, progress,
+                                  cancel_requested, owner_pid, created_at, started_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    status = excluded.status,
+                    result = excluded.result,
+                    error = excluded.error,
+                    progress = excluded.progress,
+                    cancel_requested = MAX(cancel_requested, excluded.cancel_requested),
+                    started_at = excluded.started_at,
+                    finished_at = excluded.finished_at
+                """,
+                (
+                    data["id"], data["plugin"], data["status"],
+                    json.dumps(job.params, ensure_ascii=False, default=str),
+                    json.dumps(data["result"], ensure_ascii=False, default=str) if data["result"] is not None else None,
+                    data["error"],
+                    json.dumps(data["progress"], ensure_ascii=False, default=str),
+                    int(data["cancel_requested"]), os.getpid(),
+                    data["created_at"], data["started_at"], data["finished_at"]
+                )
+            )
+            self._conn.commit()
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务，返回与 Job.to_dict() 相同结构的字典（额外包含params），不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, plugin, status, params, result, error, progress, cancel_requested, "
+                "created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._row_to_dict(row, include_result=True) if row else None
+
+    def list(self, status: str = None, plugin_name: str = None) -> List[Dict[str, Any]]:
+        """列出任务（不包含执行结果），按创建时间排序"""
+        sql = ("SELECT id, plugin, status, params, NULL, error, progress, cancel_requested, "
+               "created_at, started_at, finished_at FROM jobs WHERE 1 = 1")
+        args = []
+        if status is not None:
+            sql += " AND status = ?"
+            args.append(status)
+        if plugin_name is not None:
+            sql += " AND plugin = ?"
+            args.append(plugin_name)
+        sql += " ORDER BY created_at"
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+
+        jobs = []
+        for row in rows:
+            data = self._row_to_dict(row, include_result=False)
+            data.pop("params")
+            jobs.append(data)
+        return jobs
+
+    def request_cancel(self, job_id: str) -> tuple[bool, str]:
+        """
+        写入取消标记，由任务所在进程在检查取消时读取
+
+        Returns:
+            (是否成功, 提示信息)
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return False, f"任务不存在: {job_id}"
+            if row[0] in _FINISHED_STATES:
+                return False, f"任务已结束: {row[0]}"
+
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+        if row[0] == "queued":
+            return True, "已请求取消，任务将不会被执行"
+        return True, "已请求取消，任务将在当前步骤结束后停止"
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """是否已有进程请求取消该任务"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    def mark_orphaned(self, error: str) -> int:
+        """把所属进程已不存在的未结束任务标记为失败，返回处理的任务数"""
+        import psutil
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, owner_pid FROM jobs WHERE status IN ({','.join('?' * len(_UNFINISHED_STATES))})",
+                _UNFINISHED_STATES
+            ).fetchall()
+            orphaned = [(job_id,) for job_id, pid in rows if not pid or not psutil.pid_exists(pid)]
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                [(error, time.time(), job_id) for (job_id,) in orphaned]
+            )
+            self._conn.commit()
+        return len(orphaned)
+
+    def trim(self, history_limit: int) -> None:
+        """只保留最近结束的 history_limit 个任务"""
+        with self._lock:
+            self._conn.execute(
+                f"""
+                DELETE FROM jobs WHERE id IN (
+                    SELECT id FROM jobs WHERE status IN ({','.join('?' * len(_FINISHED_STATES))})
+                    ORDER BY finished_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (*_FINISHED_STATES, history_limit)
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _row_to_dict(row, include_result: bool) -> Dict[str, Any]:
+        """数据库行转换为任务字典"""
+        (job_id, plugin, status, params, result, error, progress, cancel_requested,
+         created_at, started_at, finished_at) = row
+        data = {
+            "id": job_id,
+            "plugin": plugin,
+            "status": status,
+            "params": json.loads(params) if params else {},
+            "progress": json.loads(progress) if progress else {},
+            "cancel_requested": bool(cancel_requested),
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "error": error
+        }
+        if include_result:
+            data["result"] = json.loads(result) if result else None
+        return data
@@ -0,0 +1,347 @@
+"""
+JSON结构化差异与补丁（RFC 6902 JSON Patch / RFC 6901 JSON Pointer）
+对象按键集合比较；数组按元素的规范化指纹匹配（哈希表 + 最长递增子序列），
+不做两两比较，大数组上的耗时接近线性
+"""
+import bisect
+import json
+from typing import Dict, Any, List
+
+
+class JsonPatchError(ValueError):
+    """补丁格式错误或无法应用"""
+
+
+def _fingerprint(value: Any) -> str:
+    """值的规范化指纹：键排序后的紧凑JSON，区分 true/1 和 1/1.0"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def json_identical(a: Any, b: Any) -> bool:
+    """两个值是否完全相同（对象键顺序无关；类型也必须相同，1 与 1.0、true 与 1 都不相同），diff 用它判断是否需要生成操作"""
+    if type(a) is not type(b):
+        return False
+    if type(a) is dict or type(a) is list:
+        # Python的 == 在C中完成且多数情况下就能判定不相等，相等时再用指纹排除 true 与 1 之类的差异
+        return a == b and _fingerprint(a) == _fingerprint(b)
+    return a == b
+
+
+def json_equal(a: Any, b: Any) -> bool:
+    """
+    按RFC 6902 §4.6 比较两个值（test 操作使用）：数字按数值比较（1 与 1.0 相等），
+    布尔值与数字不相等，对象键顺序无关；用显式栈遍历，深层嵌套不受递归深度限制
+    """
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        type_a, type_b = type(a), type(b)
+        if type_a is dict:
+            if type_b is not dict or a.keys() != b.keys():
+                return False
+            stack.extend((a[key], b[key]) for key in a)
+        elif type_a is list:
+            if type_b is not list or len(a) != len(b):
+                return False
+            stack.extend(zip(a, b))
+        elif type_a in (int, float) and type_b in (int, float):
+            if a != b:
+                return False
+        elif type_a is not type_b or a != b:
+            return False
+    return True
+
+
+def escape_pointer_token(token: str) -> str:
+    """JSON Pointer 路径片段转义：~ -> ~0，/ -> ~1"""
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """解析JSON Pointer，返回各级路径片段（空字符串表示整个文档）"""
+    if not isinstance(pointer, str):
+        raise JsonPatchError(f"路径必须是字符串: {pointer!r}")
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"路径必须以 / 开头: {pointer}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+# ---- diff ----
+
+def diff_json(source: Any, target: Any) -> List[Dict[str, Any]]:
+    """
+    生成把source变为target的RFC 6902补丁
+
+    对象：键集合求差得到 remove/add，共同键的值不同时递归比较；
+    数组：去掉首尾相同的元素后，以两侧都只出现一次的元素指纹为锚点，
+    取锚点下标的最长递增子序列作为保持不动的元素，锚点之间的区间递归处理，
+    剩余的元素按位置配对（同为容器时递归比较，否则 replace），多出的 remove/add
+    """
+    ops: List[Dict[str, Any]] = []
+    try:
+        _diff_value(source, target, "", ops)
+    except RecursionError:
+        raise JsonPatchError("文档嵌套过深")
+    return ops
+
+
+def _diff_value(source: Any, target: Any, path: str, ops: List[Dict[str, Any]]):
+    if type(source) is dict and type(target) is dict:
+        _diff_object(source, target, path, ops)
+    elif type(source) is list and type(target) is list:
+        _diff_array(source, target, path, ops)
+    elif not json_identical(source, target):
+        ops.append({"op": "replace", "path": path, "value": target})
+
+
+def _diff_object(source: dict, target: dict, path: str, ops: List[Dict[str, Any]]):
+    if source == target and _fingerprint(source) == _fingerprint(target):
+        return
+    for key in source.keys() - target.keys():
+        ops.append({"op": "remove", "path": f"{path}/{escape_pointer_token(key)}"})
+    for key, value in target.items():
+        child = f"{path}/{escape_pointer_token(key)}"
+        if key not in source:
+            ops.append({"op": "add", "path": child, "value": value})
+        elif not json_identical(source[key], value):
+            _diff_value(source[key], value, child, ops)
+
+
+def _diff_array(source: list, target: list, path: str, ops: List[Dict[str, Any]]):
+    if source == target and _fingerprint(source) == _fingerprint(target):
+        return
+    source_keys = [_fingerprint(value) for value in source]
+    target_keys = [_fingerprint(value) for value in target]
+
+    # 对齐结果：按顺序排列的 (源下标或None, 目标下标或None)，
+    # 两者都有时表示同一位置（相同或需要递归比较），只有一侧时表示删除或插入
+    alignment = []
+    # 显式栈代替递归：("range", i0, i1, j0, j1) 待对齐的区间，("pair", i, j) 已确定的配对
+    stack = [("range", 0, len(source), 0, len(target))]
+    while stack:
+        item = stack.pop()
+        if item[0] == "pair":
+            alignment.append((item[1], item[2]))
+            continue
+        _, i0, i1, j0, j1 = item
+
+        # 首尾相同的元素
+        head = []
+        while i0 < i1 and j0 < j1 and source_keys[i0] == target_keys[j0]:
+            head.append((i0, j0))
+            i0 += 1
+            j0 += 1
+        tail = []
+        while i0 < i1 and j0 < j1 and source_keys[i1 - 1] == target_keys[j1 - 1]:
+            i1 -= 1
+            j1 -= 1
+            tail.append(("pair", i1, j1))
+        alignment.extend(head)
+
+        anchors = _unique_anchors(source_keys, target_keys, i0, i1, j0, j1)
+        pending = list(tail)
+        if anchors:
+            # 逆序入栈：锚点之间的区间和锚点本身按文档顺序弹出
+            prev_i, prev_j = i0, j0
+            pieces = []
+            for i, j in anchors:
+                pieces.append(("range", prev_i, i, prev_j, j))
+                pieces.append(("pair", i, j))
+                prev_i, prev_j = i + 1, j + 1
+            pieces.append(("range", prev_i, i1, prev_j, j1))
+            pending.extend(reversed(pieces))
+        else:
+            # 没有可用的锚点：按位置配对，多出的部分删除或插入
+            pieces = []
+            common = min(i1 - i0, j1 - j0)
+            for k in range(common):
+                pieces.append(("pair", i0 + k, j0 + k))
+            for i in range(i0 + common, i1):
+                pieces.append(("pair", i, None))
+            for j in range(j0 + common, j1):
+                pieces.append(("pair", None, j))
+            pending.extend(reversed(pieces))
+        stack.extend(pending)
+
+    # 按对齐结果生成操作，position 是已应用前面的操作后当前元素在数组中的位置
+    position = 0
+    for i, j in alignment:
+        if i is not None and j is not None:
+            if source_keys[i] != target_keys[j]:
+                _diff_value(source[i], target[j], f"{path}/{position}", ops)
+            position += 1
+        elif i is not None:
+            ops.append({"op": "remove", "path": f"{path}/{position}"})
+        else:
+            ops.append({"op": "add", "path": f"{path}/{position}", "value": target[j]})
+            position += 1
+
+
+def _unique_anchors(source_keys: List[str], target_keys: List[str],
+                    i0: int, i1: int, j0: int, j1: int) -> List[tuple]:
+    """
+    区间内两侧都只出现一次的指纹作为候选锚点，返回下标同时递增的最长锚点序列 [(i, j)]
+    （patience diff：最长递增子序列用二分法求，O(n log n)）
+    """
+    if i0 >= i1 or j0 >= j1:
+        return []
+    counts: Dict[str, list] = {}
+    for i in range(i0, i1):
+        entry = counts.get(source_keys[i])
+        if entry is None:
+            counts[source_keys[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(j0, j1):
+        entry = counts.get(target_keys[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+
+    # 按源下标排列的候选锚点，求目标下标的最长递增子序列
+    candidates = sorted((i, j) for count_i, i, count_j, j in counts.values() if count_i == 1 and count_j == 1)
+    if not candidates:
+        return []
+    tails: List[int] = []       # tails[k]: 长度为k+1的递增子序列的最小结尾目标下标
+    tail_index: List[int] = []  # 对应的候选下标
+    previous = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        k = bisect.bisect_left(tails, j)
+        if k:
+            previous[index] = tail_index[k - 1]
+        if k == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[k] = j
+            tail_index[k] = index
+
+    result = []
+    index = tail_index[-1]
+    while index >= 0:
+        result.append(candidates[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+# ---- patch ----
+
+def apply_patch(document: Any, patch: List[Dict[str, Any]]) -> Any:
+    """
+    按顺序应用RFC 6902补丁并返回结果文档
+
+    document会被原地修改（调用方传入刚解析出的对象即可，不需要额外复制）；
+    任何一步失败时抛出 JsonPatchError，错误信息包含出错的操作序号
+    """
+    if not isinstance(patch, list):
+        raise JsonPatchError("补丁必须是操作数组")
+    for number, operation in enumerate(patch):
+        try:
+            document = _apply_operation(document, operation)
+        except JsonPatchError as e:
+            raise JsonPatchError(f"第{number}个操作: {e}")
+    return document
+
+
+def _apply_operation(document: Any, operation: Dict[str, Any]) -> Any:
+    if not isinstance(operation, dict):
+        raise JsonPatchError("操作必须是对象")
+    op = operation.get("op")
+    if "path" not in operation:
+        raise JsonPatchError("缺少 path")
+    path = parse_pointer(operation["path"])
+
+    if op in ("add", "replace", "test"):
+        if "value" not in operation:
+            raise JsonPatchError(f"{op} 操作缺少 value")
+        value = operation["value"]
+    elif op in ("move", "copy"):
+        if "from" not in operation:
+            raise JsonPatchError(f"{op} 操作缺少 from")
+        source = parse_pointer(operation["from"])
+        if op == "move":
+            if path[:len(source)] == source and len(path) > len(source):
+                raise JsonPatchError("不能把值移动到它自己的子节点中")
+            value, document = _remove(document, source)
+        else:
+            # 复制的值与原位置的值不能共享（后续操作修改其中一个时另一个不受影响）
+            value = json.loads(json.dumps(_resolve(document, source)))
+        op = "add"
+    elif op != "remove":
+        raise JsonPatchError(f"不支持的操作: {op}")
+
+    if op == "add":
+        return _add(document, path, value)
+    if op == "remove":
+        return _remove(document, path)[1]
+    if op == "replace":
+        _resolve(document, path)
+        if not path:
+            return value
+        parent, token = _resolve(document, path[:-1]), path[-1]
+        if type(parent) is list:
+            parent[_array_index(parent, token)] = value
+        else:
+            parent[token] = value
+        return document
+    # test
+    if not json_equal(_resolve(document, path), value):
+        raise JsonPatchError(f"test 失败: {operation['path']} 的值与预期不一致")
+    return document
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    """按路径片段取值，路径不存在时抛出 JsonPatchError"""
+    node = document
+    for depth, token in enumerate(tokens):
+        if type(node) is dict:
+            if token not in node:
+                raise JsonPatchError(f"路径不存在: /{'/'.join(tokens[:depth + 1])}")
+            node = node[token]
+        elif type(node) is list:
+            node = node[_array_index(node, token)]
+        else:
+            raise JsonPatchError(f"路径不存在: /{'/'.join(tokens[:depth + 1])}")
+    return node
+
+
+def _array_index(array: list, token: str, allow_end: bool = False) -> int:
+    """解析数组下标：只允许不带前导零的非负整数，allow_end 时允许 - 或等于长度的下标（追加）"""
+    if token == "-" and allow_end:
+        return len(array)
+    if not (token.isascii() and token.isdigit()) or (len(token) > 1 and token[0] == "0"):
+        raise JsonPatchError(f"无效的数组下标: {token}")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not allow_end):
+        raise JsonPatchError(f"数组下标越界: {token}")
+    return index
+
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent, token = _resolve(document, tokens[:-1]), tokens[-1]
+    if type(parent) is dict:
+        parent[token] = value
+    elif type(parent) is list:
+        parent.insert(_array_index(parent, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"不能在标量值中添加成员: {token}")
+    return document
+
+
+def _remove(document: Any, tokens: List[str]) -> tuple:
+    """删除路径上的值，返回 (被删除的值, 文档)"""
+    if not tokens:
+        raise JsonPatchError("不能删除整个文档")
+    parent, token = _resolve(document, tokens[:-1]), tokens[-1]
+    if type(parent) is dict:
+        if token not in parent:
+            raise JsonPatchError(f"路径不存在: /{'/'.join(tokens)}")
+        return parent.pop(token), document
+    if type(parent) is list:
+        return parent.pop(_array_index(parent, token)), document
+    raise JsonPatchError(f"路径不存在: /{'/'.join(tokens)}")
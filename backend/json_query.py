@@ -0,0 +1,768 @@
+"""
+JSON路径查询
+支持JSONPath风格的表达式（$.store.book[?(@.price < 10)].title），按表达式文本缓存编译结果；
+既可以在已解析的对象上求值，也可以流式扫描大文件，只物化与查询路径相关的部分
+"""
+import codecs
+import json
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable
+from .json_patch import json_equal
+
+
+MAX_QUERY_LENGTH = 2000
+QUERY_CACHE_SIZE = 256
+# 流式查询每次读取的字节数
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# 跳过容器时期望的下一个词法单元
+_SKIP_VALUE, _SKIP_VALUE_OR_END, _SKIP_KEY, _SKIP_KEY_OR_END, _SKIP_COLON, _SKIP_COMMA_OR_END = range(6)
+
+# 路径中没有匹配值（与JSON的null区分）
+_NOTHING = object()
+
+_NAME_RE = re.compile(r"[^\W\d][\w$-]*")
+_SLICE_RE = re.compile(r"(-?\d+)?\s*(?::\s*(-?\d+)?\s*(?::\s*(-?\d+)?)?)?")
+_NUMBER_RE = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+_LITERAL_RE = re.compile(r"(true|false|null)\b")
+_COMPARE_RE = re.compile(r"==|!=|<=|>=|<|>|=~")
+_WHITESPACE_RE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]*")
+_SINGLE_QUOTED_RE = re.compile(r"'((?:[^'\\]|\\.)*)'")
+_DOUBLE_QUOTED_RE = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+class JsonQueryError(ValueError):
+    """查询表达式错误"""
+
+
+class JsonSyntaxError(ValueError):
+    """流式查询时遇到的JSON语法错误，包含出错的行号和列号"""
+
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"第{line}行第{column}列: {message}")
+        self.line = line
+        self.column = column
+
+
+# ---- 路径步骤 ----
+# 每个步骤的 select(node, root) 返回该步骤在node上选中的子节点列表；
+# streamable 的步骤可以在流式扫描时只根据键名或下标判断是否进入子节点
+
+class _NameStep:
+    streamable = True
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def select(self, node, root):
+        if type(node) is dict and self.name in node:
+            return [node[self.name]]
+        return []
+
+    def match_member(self, key: str) -> bool:
+        return key == self.name
+
+    def match_index(self, index: int) -> bool:
+        return False
+
+
+class _WildcardStep:
+    streamable = True
+
+    def select(self, node, root):
+        if type(node) is dict:
+            return list(node.values())
+        if type(node) is list:
+            return node
+        return []
+
+    def match_member(self, key: str) -> bool:
+        return True
+
+    def match_index(self, index: int) -> bool:
+        return True
+
+
+class _IndexStep:
+    def __init__(self, index: int):
+        self.index = index
+        # 负数下标需要知道数组长度，流式扫描时无法提前判断
+        self.streamable = index >= 0
+
+    def select(self, node, root):
+        if type(node) is list and -len(node) <= self.index < len(node):
+            return [node[self.index]]
+        return []
+
+    def match_member(self, key: str) -> bool:
+        return False
+
+    def match_index(self, index: int) -> bool:
+        return index == self.index
+
+
+class _SliceStep:
+    def __init__(self, start: Optional[int], stop: Optional[int], step: Optional[int]):
+        self.slice = slice(start, stop, step)
+        self.start = start or 0
+        self.stop = stop
+        self.step = 1 if step is None else step
+        self.streamable = self.start >= 0 and (stop is None or stop >= 0) and self.step > 0
+
+    def select(self, node, root):
+        if type(node) is list and self.step != 0:
+            return node[self.slice]
+        return []
+
+    def match_member(self, key: str) -> bool:
+        return False
+
+    def match_index(self, index: int) -> bool:
+        return index >= self.start and (self.stop is None or index < self.stop) \
+            and (index - self.start) % self.step == 0
+
+
+class _UnionStep:
+    """[a, b, 0] 形式的并集，结果按列出的顺序排列（流式扫描只能按文档顺序，因此不可流式）"""
+    streamable = False
+
+    def __init__(self, selectors: list):
+        self.selectors = selectors
+
+    def select(self, node, root):
+        result = []
+        for selector in self.selectors:
+            result.extend(selector.select(node, root))
+        return result
+
+
+class _FilterStep:
+    """[?(...)] 过滤，选中使条件成立的子元素"""
+
+    def __init__(self, predicate: Callable, uses_root: bool):
+        self.predicate = predicate
+        # 条件中引用了 $ 时需要整个文档，无法流式求值
+        self.streamable = not uses_root
+
+    def select(self, node, root):
+        predicate = self.predicate
+        if type(node) is dict:
+            return [value for value in node.values() if predicate(value, root)]
+        if type(node) is list:
+            return [value for value in node if predicate(value, root)]
+        return []
+
+    def match_member(self, key: str) -> bool:
+        return True
+
+    def match_index(self, index: int) -> bool:
+        return True
+
+
+class _DescendantStep:
+    """..name 递归下降：在节点自身及其所有后代上应用内层选择器（先序，按文档顺序）"""
+    streamable = False
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def select(self, node, root):
+        result = []
+        select = self.inner.select
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            result.extend(select(current, root))
+            if type(current) is dict:
+                stack.extend(reversed(list(current.values())))
+            elif type(current) is list:
+                stack.extend(reversed(current))
+        return result
+
+
+# ---- 过滤条件 ----
+
+def _comparable(a, b) -> bool:
+    """大小比较只在两个数字或两个字符串之间进行"""
+    a_type, b_type = type(a), type(b)
+    if a_type is str or b_type is str:
+        return a_type is b_type
+    return a_type in (int, float) and b_type in (int, float)
+
+
+def _make_comparison(op: str, left: Callable, right: Callable, pattern=None) -> Callable:
+    """生成比较条件；left/right 为 (node, root) -> 值 的取值函数"""
+    if op == "==":
+        return lambda node, root: json_equal(left(node, root), right(node, root))
+    if op == "!=":
+        return lambda node, root: not json_equal(left(node, root), right(node, root))
+    if op == "=~":
+        def regex_match(node, root):
+            value = left(node, root)
+            return type(value) is str and pattern.search(value) is not None
+        return regex_match
+
+    compare = {
+        "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+        ">": lambda a, b: a > b, ">=": lambda a, b: a >= b
+    }[op]
+
+    def ordered(node, root):
+        a, b = left(node, root), right(node, root)
+        return _comparable(a, b) and compare(a, b)
+    return ordered
+
+
+class _QueryParser:
+    """查询表达式的递归下降解析器"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.uses_root = False
+
+    def error(self, message: str):
+        raise JsonQueryError(f"查询表达式第{self.pos + 1}个字符处: {message}")
+
+    def skip_whitespace(self):
+        self.pos = _WHITESPACE_RE.match(self.text, self.pos).end()
+
+    def peek(self, length: int = 1) -> str:
+        return self.text[self.pos:self.pos + length]
+
+    def parse(self) -> list:
+        self.skip_whitespace()
+        if self.peek() == "$":
+            self.pos += 1
+        steps = self.parse_steps()
+        self.skip_whitespace()
+        if self.pos != len(self.text):
+            self.error("无法识别的内容")
+        return steps
+
+    def parse_steps(self) -> list:
+        steps = []
+        while True:
+            if self.peek(2) == "..":
+                self.pos += 2
+                inner = self.parse_bracket() if self.peek() == "[" else self.parse_member()
+                steps.append(_DescendantStep(inner))
+            elif self.peek() == ".":
+                self.pos += 1
+                steps.append(self.parse_member())
+            elif self.peek() == "[":
+                steps.append(self.parse_bracket())
+            else:
+                return steps
+
+    def parse_member(self):
+        if self.peek() == "*":
+            self.pos += 1
+            return _WildcardStep()
+        match = _NAME_RE.match(self.text, self.pos)
+        if not match:
+            self.error("缺少成员名")
+        self.pos = match.end()
+        return _NameStep(match.group())
+
+    def parse_bracket(self):
+        self.pos += 1
+        self.skip_whitespace()
+        if self.peek() == "?":
+            self.pos += 1
+            outer_uses_root = self.uses_root
+            self.uses_root = False
+            predicate = self.parse_or()
+            step = _FilterStep(predicate, self.uses_root)
+            self.uses_root = self.uses_root or outer_uses_root
+            self.expect("]")
+            return step
+
+        selectors = [self.parse_selector()]
+        while True:
+            self.skip_whitespace()
+            if self.peek() != ",":
+                break
+            self.pos += 1
+            selectors.append(self.parse_selector())
+        self.expect("]")
+        return selectors[0] if len(selectors) == 1 else _UnionStep(selectors)
+
+    def parse_selector(self):
+        self.skip_whitespace()
+        char = self.peek()
+        if char == "*":
+            self.pos += 1
+            return _WildcardStep()
+        if char in ("'", '"'):
+            return _NameStep(self.parse_string())
+        match = _SLICE_RE.match(self.text, self.pos)
+        if not match.group():
+            self.error("需要成员名、下标、切片或 *")
+        self.pos = match.end()
+        start, stop, step = (int(value) if value is not None else None for value in match.groups())
+        if ":" not in match.group():
+            return _IndexStep(start)
+        return _SliceStep(start, stop, step)
+
+    def parse_string(self) -> str:
+        if self.peek() == '"':
+            match = _DOUBLE_QUOTED_RE.match(self.text, self.pos)
+            if not match:
+                self.error("字符串缺少结束引号")
+            try:
+                value = json.loads(match.group())
+            except ValueError:
+                self.error("字符串中有无效的转义")
+        else:
+            match = _SINGLE_QUOTED_RE.match(self.text, self.pos)
+            if not match:
+                self.error("字符串缺少结束引号")
+            try:
+                value = json.loads('"' + match.group(1).replace("\\'", "'").replace('"', '\\"') + '"')
+            except ValueError:
+                self.error("字符串中有无效的转义")
+        self.pos = match.end()
+        return value
+
+    def expect(self, char: str):
+        self.skip_whitespace()
+        if self.peek() != char:
+            self.error(f"缺少 {char}")
+        self.pos += 1
+
+    # 条件表达式：or -> and -> not -> 比较 -> 操作数
+
+    def parse_or(self) -> Callable:
+        left = self.parse_and()
+        while True:
+            self.skip_whitespace()
+            if self.peek(2) != "||":
+                return left
+            self.pos += 2
+            right = self.parse_and()
+            left = (lambda a, b: lambda node, root: a(node, root) or b(node, root))(left, right)
+
+    def parse_and(self) -> Callable:
+        left = self.parse_not()
+        while True:
+            self.skip_whitespace()
+            if self.peek(2) != "&&":
+                return left
+            self.pos += 2
+            right = self.parse_not()
+            left = (lambda a, b: lambda node, root: a(node, root) and b(node, root))(left, right)
+
+    def parse_not(self) -> Callable:
+        self.skip_whitespace()
+        if self.peek() == "!" and self.peek(2) != "!=":
+            self.pos += 1
+            operand = self.parse_not()
+            return lambda node, root: not operand(node, root)
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> Callable:
+        kind, left = self.parse_operand()
+        self.skip_whitespace()
+        match = _COMPARE_RE.match(self.text, self.pos)
+        if not match:
+            if kind == "literal":
+                self.error("字面量不能单独作为条件")
+            if kind == "path":
+                # 单独的路径表示存在性判断
+                return lambda node, root: left(node, root) is not _NOTHING
+            return left
+        op = match.group()
+        self.pos = match.end()
+        right_kind, right = self.parse_operand()
+        if kind == "test" or right_kind == "test":
+            self.error("比较运算的两侧必须是路径或字面量")
+
+        pattern = None
+        if op == "=~":
+            if right_kind != "literal" or type(right(None, None)) is not str:
+                self.error("=~ 右侧必须是正则表达式字符串")
+            try:
+                pattern = re.compile(right(None, None))
+            except re.error as e:
+                self.error(f"无效的正则表达式: {e}")
+        return _make_comparison(op, left, right, pattern)
+
+    def parse_operand(self):
+        """返回 (类型, 函数)：path/literal 的函数取值，test 的函数返回条件是否成立"""
+        self.skip_whitespace()
+        char = self.peek()
+        if char == "(":
+            self.pos += 1
+            test = self.parse_or()
+            self.expect(")")
+            return "test", test
+        if char in ("@", "$"):
+            self.pos += 1
+            steps = self.parse_steps()
+            if char == "$":
+                self.uses_root = True
+            query = JsonQuery(self.text, steps)
+            if char == "$":
+                return "path", lambda node, root: query.first(root)
+            return "path", lambda node, root: query.first(node, root)
+        if char in ("'", '"'):
+            value = self.parse_string()
+            return "literal", lambda node, root: value
+        match = _NUMBER_RE.match(self.text, self.pos) or _LITERAL_RE.match(self.text, self.pos)
+        if not match:
+            self.error("需要路径、字符串、数字、true/false/null 或括号")
+        self.pos = match.end()
+        value = json.loads(match.group())
+        return "literal", lambda node, root: value
+
+
+class _JsonReader:
+    """
+    流式读取JSON文本：标量和需要物化的子树交给C实现的 json 解码器，
+    容器的边界由读取器自己跟踪，缓冲区只保留尚未处理的内容
+    """
+
+    def __init__(self, f, progress_callback=None):
+        self.f = f
+        self.progress_callback = progress_callback
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.raw_decode = json.JSONDecoder(parse_constant=self._reject_constant).raw_decode
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+        # 行号跟踪：buf[0] 之前的行数和最后一行开头在buf[0]之前的字符数
+        self.line = 1
+        self.column_offset = 0
+
+    @staticmethod
+    def _reject_constant(name: str):
+        raise ValueError(f"不支持的常量: {name}")
+
+    def error(self, message: str, at: int = None):
+        at = self.pos if at is None else at
+        newlines = self.buf.count("\n", 0, at)
+        if newlines:
+            column = at - self.buf.rfind("\n", 0, at)
+        else:
+            column = self.column_offset + at + 1
+        return JsonSyntaxError(message, self.line + newlines, column)
+
+    def fill(self, min_size: int = 0):
+        """丢弃已处理的内容并读取下一块"""
+        consumed = self.buf[:self.pos]
+        newlines = consumed.count("\n")
+        if newlines:
+            self.line += newlines
+            self.column_offset = len(consumed) - consumed.rfind("\n") - 1
+        else:
+            self.column_offset += len(consumed)
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+        raw = self.f.read(max(STREAM_CHUNK_SIZE, min_size))
+        self.bytes_read += len(raw)
+        try:
+            self.buf += self.decoder.decode(raw, final=not raw)
+        except UnicodeDecodeError:
+            raise self.error("文件不是有效的UTF-8编码", len(self.buf))
+        self.eof = not raw
+        if self.progress_callback and self.progress_callback(self.bytes_read):
+            raise InterruptedError("处理已取消")
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符（文件结束时返回空字符串）"""
+        while True:
+            self.pos = _WHITESPACE_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self.fill()
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise self.error(f"缺少 {char}")
+        self.pos += 1
+
+    def value(self):
+        """解码下一个完整的JSON值，缓冲区中内容不完整时读取更多（每次至少翻倍）"""
+        if not self.peek():
+            raise self.error("JSON内容不完整")
+        return self._decode(grow=True)
+
+    def _decode(self, grow: bool):
+        """
+        从当前位置解码一个值；grow为False时不读取更多内容，
+        值跨越缓冲区末尾时返回 _NOTHING 且不移动位置
+        """
+        while True:
+            try:
+                value, end = self.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                # 字符串未结束、或错误位于缓冲区末尾附近时，可能只是内容被读取边界截断
+                truncated = e.msg.startswith("Unterminated string") or len(self.buf) - e.pos <= 16
+                if truncated and not self.eof:
+                    if not grow:
+                        return _NOTHING
+                    self.fill(len(self.buf) - self.pos)
+                    continue
+                raise self.error(e.msg, e.pos)
+            except (ValueError, RecursionError) as e:
+                raise self.error(str(e))
+            # 数字之后直到缓冲区末尾都是数字字符时，数字可能被读取边界截断（如 "8." 后面还有 "95"）
+            if not self.eof and type(value) in (int, float) and _NUMBER_TAIL_RE.fullmatch(self.buf, end):
+                if not grow:
+                    return _NOTHING
+                self.fill(len(self.buf) - self.pos)
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """
+        跳过下一个值：完整位于当前缓冲区内的子树直接交给C解码器解析后丢弃，
+        跨越缓冲区边界的容器才逐个词法单元进入，因此内存占用不超过一个缓冲区
+        """
+        closers = []
+        state = _SKIP_VALUE
+        while True:
+            char = self.peek()
+            if char == "{" or char == "[":
+                if state != _SKIP_VALUE and state != _SKIP_VALUE_OR_END:
+                    raise self.error(f"意外的 {char}")
+                if self._decode(grow=False) is not _NOTHING:
+                    if not closers:
+                        return
+                    state = _SKIP_COMMA_OR_END
+                    continue
+                closers.append("}" if char == "{" else "]")
+                state = _SKIP_KEY_OR_END if char == "{" else _SKIP_VALUE_OR_END
+            elif char == "}" or char == "]":
+                empty_state = _SKIP_KEY_OR_END if char == "}" else _SKIP_VALUE_OR_END
+                if not closers or closers[-1] != char or (state != _SKIP_COMMA_OR_END and state != empty_state):
+                    raise self.error(f"意外的 {char}")
+                closers.pop()
+                self.pos += 1
+                if not closers:
+                    return
+                state = _SKIP_COMMA_OR_END
+                continue
+            elif char == ",":
+                if state != _SKIP_COMMA_OR_END or not closers:
+                    raise self.error("意外的逗号")
+                state = _SKIP_KEY if closers[-1] == "}" else _SKIP_VALUE
+            elif char == ":":
+                if state != _SKIP_COLON:
+                    raise self.error("意外的冒号")
+                state = _SKIP_VALUE
+            elif not char:
+                raise self.error("JSON内容不完整")
+            elif state == _SKIP_KEY or state == _SKIP_KEY_OR_END:
+                if char != '"':
+                    raise self.error("对象的键必须是字符串")
+                self.value()
+                state = _SKIP_COLON
+                continue
+            elif state == _SKIP_VALUE or state == _SKIP_VALUE_OR_END:
+                self.value()
+                if not closers:
+                    return
+                state = _SKIP_COMMA_OR_END
+                continue
+            else:
+                raise self.error("缺少 , 或 :")
+            self.pos += 1
+
+
+class JsonQuery:
+    """编译后的查询"""
+
+    def __init__(self, expression: str, steps: list, uses_root: bool = False):
+        self.expression = expression
+        self.steps = steps
+        self.uses_root = uses_root
+        # 流式扫描时可以只根据键名/下标逐层进入的前缀步骤数，过滤步骤之后的部分在物化的子元素上求值；
+        # 过滤条件引用 $ 时需要整个文档
+        depth = 0
+        for step in steps if not uses_root else ():
+            if not step.streamable:
+                break
+            depth += 1
+            if isinstance(step, _FilterStep):
+                break
+        self.stream_depth = depth
+
+    @property
+    def record_wise(self) -> bool:
+        """
+        能否把记录序列（如NDJSON的各行）视为一个数组、逐条记录求值：
+        第一步不能按下标、切片或并集选择记录，过滤条件不能引用 $
+        """
+        if self.uses_root:
+            return False
+        return not self.steps or not isinstance(self.steps[0], (_IndexStep, _SliceStep, _UnionStep))
+
+    def apply_record(self, record) -> List[Any]:
+        """把record当作记录数组中的一个元素求值（需要 record_wise 为True），$ 单独使用时返回记录本身"""
+        if not self.steps:
+            return [record]
+        return self.apply([record])
+
+    def apply(self, root, start: int = 0, document=_NOTHING) -> List[Any]:
+        """
+        在已解析的对象上求值，返回所有匹配值（按文档顺序）
+
+        Args:
+            root: 求值的起点
+            start: 从第几个步骤开始（流式扫描时前缀步骤已经处理过）
+            document: 过滤条件中 $ 指向的文档根，默认与root相同
+        """
+        if document is _NOTHING:
+            document = root
+        nodes = [root]
+        for step in self.steps[start:]:
+            select = step.select
+            nodes = [child for node in nodes for child in select(node, document)]
+            if not nodes:
+                break
+        return nodes
+
+    def first(self, root, document=_NOTHING):
+        """第一个匹配值，没有匹配时返回内部的缺失标记"""
+        nodes = self.apply(root, 0, document)
+        return nodes[0] if nodes else _NOTHING
+
+    def stream(self, f, emit: Callable[[Any], None], progress_callback=None) -> int:
+        """
+        流式扫描二进制文件对象f中的JSON文档，对每个匹配值调用 emit(值)
+
+        沿可流式的前缀步骤逐层进入，只有匹配路径上的子树会被解码，
+        其余部分跳过；查询以递归下降、并集或负数下标开头时需要解码整个文档
+
+        Returns:
+            已读取的字节数
+        """
+        reader = _JsonReader(f, progress_callback)
+        if not reader.peek():
+            raise reader.error("JSON内容为空")
+        self._walk(reader, 0, emit)
+        if reader.peek():
+            raise reader.error("JSON值之后有多余的内容")
+        return reader.bytes_read
+
+    def _walk(self, reader: _JsonReader, index: int, emit: Callable[[Any], None]):
+        if index >= self.stream_depth:
+            for value in self.apply(reader.value(), index):
+                emit(value)
+            return
+
+        step = self.steps[index]
+        char = reader.peek()
+        if char == "{":
+            reader.pos += 1
+            if reader.peek() == "}":
+                reader.pos += 1
+                return
+            while True:
+                if reader.peek() != '"':
+                    raise reader.error("对象的键必须是字符串")
+                key = reader.value()
+                reader.expect(":")
+                if step.match_member(key):
+                    self._walk_child(reader, index, emit)
+                else:
+                    reader.skip()
+                char = reader.peek()
+                reader.pos += 1
+                if char == "}":
+                    return
+                if char != ",":
+                    reader.pos -= 1
+                    raise reader.error("缺少 , 或 }")
+        elif char == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+                return
+            position = 0
+            while True:
+                if step.match_index(position):
+                    self._walk_child(reader, index, emit)
+                else:
+                    reader.skip()
+                position += 1
+                char = reader.peek()
+                reader.pos += 1
+                if char == "]":
+                    return
+                if char != ",":
+                    reader.pos -= 1
+                    raise reader.error("缺少 , 或 ]")
+        else:
+            # 标量没有子元素
+            reader.value()
+
+    def _walk_child(self, reader: _JsonReader, index: int, emit: Callable[[Any], None]):
+        step = self.steps[index]
+        if isinstance(step, _FilterStep):
+            value = reader.value()
+            if step.predicate(value, None):
+                for match in self.apply(value, index + 1):
+                    emit(match)
+        else:
+            self._walk(reader, index + 1, emit)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(expression: str) -> JsonQuery:
+    """
+    解析并编译查询表达式，按表达式文本缓存
+
+    语法：$ 表示根（可省略），.name 或 ['name'] 取成员，[0]/[-1] 取下标，[start:stop:step] 切片，
+    * 通配，..name 递归下降，['a','b'] 并集，[?(@.price < 10 && @.tag == 'x')] 过滤
+    （支持 == != < <= > >= =~ && || ! 和括号，单独的路径表示存在性判断）
+    """
+    if not isinstance(expression, str) or not expression.strip():
+        raise JsonQueryError("查询表达式不能为空")
+    if len(expression) > MAX_QUERY_LENGTH:
+        raise JsonQueryError(f"查询表达式过长，最多 {MAX_QUERY_LENGTH} 个字符")
+    parser = _QueryParser(expression)
+    try:
+        steps = parser.parse()
+    except RecursionError:
+        raise JsonQueryError("查询表达式嵌套过深")
+    return JsonQuery(expression, steps, parser.uses_root)
+
+
+def compile_projection(projection: Dict[str, str]) -> Callable[[Any], Dict[str, Any]]:
+    """
+    编译投影：{输出字段名: 相对路径}，路径以 @ 开头或直接写成员名（如 "@.user.id"、"user.id"），
+    每个字段取第一个匹配值，没有匹配时为null
+
+    Returns:
+        把一个匹配值转换为投影对象的函数
+    """
+    if not isinstance(projection, dict) or not projection:
+        raise JsonQueryError("projection 必须是非空对象 {字段名: 路径}")
+    fields = []
+    for name, path in projection.items():
+        if not isinstance(path, str) or not path.strip():
+            raise JsonQueryError(f"投影字段 {name} 的路径必须是非空字符串")
+        path = path.strip()
+        if path.startswith("@"):
+            path = "$" + path[1:]
+        elif not path.startswith(("$", ".", "[")):
+            path = "$." + path
+        fields.append((name, compile_query(path)))
+
+    def project(value):
+        result = {}
+        for name, query in fields:
+            matched = query.first(value)
+            result[name] = None if matched is _NOTHING else matched
+        return result
+    return project
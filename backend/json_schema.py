@@ -0,0 +1,577 @@
+"""
+JSON Schema 校验
+把模式编译为由闭包组成的校验函数树，编译结果按模式的规范化哈希缓存，
+同一模式重复校验时只付出逐个关键字检查的开销；错误位置以JSON Pointer表示
+
+支持 draft-07 / 2020-12 中常用的关键字：type、enum、const、数值/字符串/数组/对象约束、
+properties/patternProperties/additionalProperties、items/prefixItems、contains、
+allOf/anyOf/oneOf/not、if/then/else、dependentRequired、propertyNames 和文档内部的 $ref；
+未知关键字按规范忽略，format 只作为注解不做校验
+"""
+import hashlib
+import json
+import math
+import operator
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Callable, Optional
+from .json_patch import json_equal
+
+
+SCHEMA_CACHE_SIZE = 128
+
+_TYPE_CHECKS = {
+    "null": lambda value: value is None,
+    "boolean": lambda value: type(value) is bool,
+    "string": lambda value: type(value) is str,
+    "array": lambda value: type(value) is list,
+    "object": lambda value: type(value) is dict,
+    "number": lambda value: type(value) in (int, float),
+    "integer": lambda value: type(value) is int or (type(value) is float and value.is_integer()),
+}
+
+# draft-04 中布尔形式的 exclusiveMinimum/exclusiveMaximum 修饰的关键字
+_DRAFT4_EXCLUSIVE = {"minimum": "exclusiveMinimum", "maximum": "exclusiveMaximum"}
+
+
+class JsonSchemaError(ValueError):
+    """模式本身无效"""
+
+
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def pointer(path) -> str:
+    """把校验时的路径链 (父路径, 片段) 转换为JSON Pointer"""
+    tokens = []
+    while path:
+        path, token = path
+        tokens.append(_escape(token))
+    return "".join("/" + token for token in reversed(tokens))
+
+
+def _unique_key(value) -> str:
+    """uniqueItems 分桶用的键：整数值的浮点数（包括嵌套的）按整数写出，json_equal 相等的值键一定相同"""
+    def normalize(item):
+        if type(item) is float and item.is_integer():
+            return int(item)
+        if type(item) is list:
+            return [normalize(child) for child in item]
+        if type(item) is dict:
+            return {key: normalize(child) for key, child in item.items()}
+        return item
+    return json.dumps(normalize(value), sort_keys=True, separators=(",", ":"))
+
+
+def _short(value) -> str:
+    """错误信息中引用的值（过长时截断）"""
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+
+class SchemaValidator:
+    """编译后的模式"""
+
+    def __init__(self, schema: Any, schema_hash: str):
+        self.schema = schema
+        self.schema_hash = schema_hash
+        self._refs: Dict[str, list] = {}
+        self._validate = self._compile(schema, "#")
+
+    def validate(self, instance: Any, max_errors: int = 0) -> List[Dict[str, Any]]:
+        """
+        校验文档，返回错误列表（空列表表示通过）
+
+        Args:
+            max_errors: 最多返回的错误数，0表示不限制
+        """
+        errors: List[Dict[str, Any]] = []
+        try:
+            self._validate(instance, None, errors)
+        except RecursionError:
+            errors.append({"pointer": "", "schema_path": "#", "keyword": "$ref",
+                           "message": "文档或模式的递归引用嵌套过深"})
+        return errors[:max_errors] if max_errors else errors
+
+    def is_valid(self, instance: Any) -> bool:
+        return not self.validate(instance, 1)
+
+    # ---- 编译 ----
+    # 每个校验函数的签名为 (值, 路径链, 错误列表) -> 是否通过，
+    # 路径链是 (父路径链, 片段) 组成的元组，只有出错时才转换为JSON Pointer
+
+    def _compile(self, schema: Any, location: str) -> Callable:
+        if schema is True or schema == {}:
+            return lambda value, path, errors: True
+        if schema is False:
+            def reject(value, path, errors):
+                errors.append({"pointer": pointer(path), "schema_path": location,
+                               "keyword": "false", "message": "模式不允许任何值"})
+                return False
+            return reject
+        if not isinstance(schema, dict):
+            raise JsonSchemaError(f"{location}: 模式必须是对象或布尔值")
+
+        if "$ref" in schema:
+            # draft-07 中 $ref 会忽略同级的其他关键字，2020-12 中会同时生效；这里按后者处理
+            checks = [self._compile_ref(schema["$ref"], location)]
+        else:
+            checks = []
+        for keyword, method in self._KEYWORDS:
+            if keyword in schema:
+                check = getattr(self, method)(schema, location, keyword)
+                if check is not None:
+                    checks.append(check)
+        if any(keyword in schema for keyword in ("properties", "patternProperties", "additionalProperties")):
+            # 额外属性取决于 properties 和 patternProperties，三者一起编译
+            checks.append(self._compile_properties(schema, location))
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value, path, errors):
+            valid = True
+            for check in checks:
+                if not check(value, path, errors):
+                    valid = False
+            return valid
+        return check_all
+
+    def _error(self, path, location: str, keyword: str, message: str) -> Dict[str, Any]:
+        return {"pointer": pointer(path), "schema_path": f"{location}/{keyword}",
+                "keyword": keyword, "message": message}
+
+    def _simple(self, location: str, keyword: str, test: Callable, message: Callable) -> Callable:
+        """生成单个条件的校验函数：test(值)不成立时记录 message(值) 的错误"""
+        def check(value, path, errors):
+            if test(value):
+                return True
+            errors.append(self._error(path, location, keyword, message(value)))
+            return False
+        return check
+
+    def _compile_ref(self, ref: str, location: str) -> Callable:
+        if not isinstance(ref, str) or not ref.startswith("#"):
+            raise JsonSchemaError(f"{location}: 只支持文档内部的引用（以 # 开头）: {ref}")
+        holder = self._refs.get(ref)
+        if holder is None:
+            # 先登记再编译，递归引用自身时直接使用登记的占位
+            holder = self._refs[ref] = [None]
+            holder[0] = self._compile(self._resolve_ref(ref), ref)
+        return lambda value, path, errors: holder[0](value, path, errors)
+
+    def _resolve_ref(self, ref: str) -> Any:
+        node = self.schema
+        fragment = ref[1:]
+        if not fragment:
+            return node
+        if not fragment.startswith("/"):
+            raise JsonSchemaError(f"不支持的引用（只支持JSON Pointer形式）: {ref}")
+        for token in fragment[1:].split("/"):
+            token = token.replace("~1", "/").replace("~0", "~")
+            if isinstance(node, dict) and token in node:
+                node = node[token]
+            elif isinstance(node, list) and token.isdigit() and int(token) < len(node):
+                node = node[int(token)]
+            else:
+                raise JsonSchemaError(f"引用的位置不存在: {ref}")
+        return node
+
+    # 通用
+
+    def _compile_type(self, schema: dict, location: str, keyword: str) -> Callable:
+        types = schema["type"]
+        types = [types] if isinstance(types, str) else types
+        if not isinstance(types, list) or not all(t in _TYPE_CHECKS for t in types):
+            raise JsonSchemaError(f"{location}/type: 无效的类型 {types!r}")
+        tests = [_TYPE_CHECKS[t] for t in types]
+        expected = " 或 ".join(types)
+        return self._simple(location, "type", lambda value: any(test(value) for test in tests),
+                            lambda value: f"类型应为 {expected}，实际为 {_short(value)}")
+
+    def _compile_enum(self, schema: dict, location: str, keyword: str) -> Callable:
+        options = schema["enum"]
+        if not isinstance(options, list):
+            raise JsonSchemaError(f"{location}/enum: 必须是数组")
+        return self._simple(location, "enum", lambda value: any(json_equal(value, option) for option in options),
+                            lambda value: f"{_short(value)} 不在允许的取值中")
+
+    def _compile_const(self, schema: dict, location: str, keyword: str) -> Callable:
+        expected = schema["const"]
+        return self._simple(location, "const", lambda value: json_equal(value, expected),
+                            lambda value: f"应为 {_short(expected)}")
+
+    # 数值
+
+    def _compile_bound(self, schema: dict, location: str, keyword: str) -> Optional[Callable]:
+        limit = schema[keyword]
+        if type(limit) is bool:
+            # draft-04 的 exclusiveMinimum/exclusiveMaximum 是布尔值，修饰 minimum/maximum
+            return None
+        if type(limit) not in (int, float):
+            raise JsonSchemaError(f"{location}/{keyword}: 必须是数字")
+        compare, text = self._BOUNDS[keyword]
+        if schema.get(_DRAFT4_EXCLUSIVE.get(keyword)) is True:
+            compare, text = self._BOUNDS[_DRAFT4_EXCLUSIVE[keyword]]
+        return self._simple(location, keyword,
+                            lambda value: type(value) not in (int, float) or compare(value, limit),
+                            lambda value: f"{value} {text} {limit}")
+
+    def _compile_multiple_of(self, schema: dict, location: str, keyword: str) -> Callable:
+        divisor = schema["multipleOf"]
+        if type(divisor) not in (int, float) or divisor <= 0:
+            raise JsonSchemaError(f"{location}/multipleOf: 必须是正数")
+
+        def test(value):
+            if type(value) not in (int, float):
+                return True
+            if type(value) is int and type(divisor) is int:
+                return value % divisor == 0
+            quotient = value / divisor
+            return math.isfinite(quotient) and abs(quotient - round(quotient)) < 1e-9
+        return self._simple(location, "multipleOf", test, lambda value: f"{value} 不是 {divisor} 的倍数")
+
+    # 字符串
+
+    def _compile_length(self, schema: dict, location: str, keyword: str) -> Callable:
+        limit = self._non_negative(schema, keyword, location)
+        compare, value_type, text = self._LENGTHS[keyword]
+        return self._simple(location, keyword,
+                            lambda value: type(value) is not value_type or compare(len(value), limit),
+                            lambda value: f"{text} {len(value)}，{'最少' if compare is operator.ge else '最多'}允许 {limit}")
+
+    def _compile_pattern(self, schema: dict, location: str, keyword: str) -> Callable:
+        regex = self._regex(schema["pattern"], f"{location}/pattern")
+        return self._simple(location, "pattern",
+                            lambda value: type(value) is not str or regex.search(value) is not None,
+                            lambda value: f"{_short(value)} 不匹配模式 {regex.pattern}")
+
+    # 数组
+
+    def _compile_unique_items(self, schema: dict, location: str, keyword: str) -> Optional[Callable]:
+        if schema["uniqueItems"] is not True:
+            return None
+
+        def test(value):
+            if type(value) is not list:
+                return True
+            # 先按规范化的JSON文本分桶，桶内再用 json_equal 确认（1.0 与 1 重复，true 与 1 不重复）
+            buckets = {}
+            for item in value:
+                bucket = buckets.setdefault(_unique_key(item), [])
+                if any(json_equal(item, other) for other in bucket):
+                    return False
+                bucket.append(item)
+            return True
+        return self._simple(location, "uniqueItems", test, lambda value: "数组中有重复的元素")
+
+    def _compile_items(self, schema: dict, location: str, keyword: str) -> Callable:
+        items = schema["items"]
+        if isinstance(items, list):
+            # draft-07 的元组形式，与 prefixItems 相同
+            return self._tuple_items(items, schema.get("additionalItems", True), location, "items")
+        if "prefixItems" in schema:
+            # 2020-12：items 只作用于 prefixItems 之后的元素，由 prefixItems 一并处理
+            return None
+        check_item = self._compile(items, f"{location}/items")
+
+        def check(value, path, errors):
+            if type(value) is not list:
+                return True
+            valid = True
+            for index, item in enumerate(value):
+                if not check_item(item, (path, index), errors):
+                    valid = False
+            return valid
+        return check
+
+    def _compile_prefix_items(self, schema: dict, location: str, keyword: str) -> Callable:
+        return self._tuple_items(schema["prefixItems"], schema.get("items", True), location, "prefixItems")
+
+    def _tuple_items(self, prefix: list, rest: Any, location: str, keyword: str) -> Callable:
+        if not isinstance(prefix, list):
+            raise JsonSchemaError(f"{location}/{keyword}: 必须是数组")
+        checks = [self._compile(item, f"{location}/{keyword}/{index}") for index, item in enumerate(prefix)]
+        check_rest = self._compile(rest, f"{location}/items")
+
+        def check(value, path, errors):
+            if type(value) is not list:
+                return True
+            valid = True
+            for index, item in enumerate(value):
+                item_check = checks[index] if index < len(checks) else check_rest
+                if not item_check(item, (path, index), errors):
+                    valid = False
+            return valid
+        return check
+
+    def _compile_contains(self, schema: dict, location: str, keyword: str) -> Callable:
+        check_item = self._compile(schema["contains"], f"{location}/contains")
+        minimum = schema.get("minContains", 1)
+        maximum = schema.get("maxContains")
+
+        def check(value, path, errors):
+            if type(value) is not list:
+                return True
+            matched = sum(1 for index, item in enumerate(value) if check_item(item, (path, index), []))
+            if matched < minimum:
+                errors.append(self._error(path, location, "contains", f"满足 contains 的元素有 {matched} 个，至少需要 {minimum} 个"))
+                return False
+            if maximum is not None and matched > maximum:
+                errors.append(self._error(path, location, "maxContains", f"满足 contains 的元素有 {matched} 个，最多允许 {maximum} 个"))
+                return False
+            return True
+        return check
+
+    # 对象
+
+    def _compile_required(self, schema: dict, location: str, keyword: str) -> Callable:
+        required = schema["required"]
+        if not isinstance(required, list) or not all(isinstance(name, str) for name in required):
+            raise JsonSchemaError(f"{location}/required: 必须是字符串数组")
+
+        def check(value, path, errors):
+            if type(value) is not dict:
+                return True
+            valid = True
+            for name in required:
+                if name not in value:
+                    errors.append(self._error(path, location, "required", f"缺少必需的属性 {name}"))
+                    valid = False
+            return valid
+        return check
+
+    def _compile_properties(self, schema: dict, location: str) -> Callable:
+        """properties、patternProperties 和 additionalProperties 一起编译（额外属性取决于前两者）"""
+        properties = schema.get("properties", {})
+        patterns = schema.get("patternProperties", {})
+        additional = schema.get("additionalProperties", True)
+        if not isinstance(properties, dict) or not isinstance(patterns, dict):
+            raise JsonSchemaError(f"{location}: properties 和 patternProperties 必须是对象")
+
+        property_checks = {name: self._compile(sub, f"{location}/properties/{_escape(name)}")
+                           for name, sub in properties.items()}
+        pattern_checks = [(self._regex(pattern, f"{location}/patternProperties"),
+                           self._compile(sub, f"{location}/patternProperties/{_escape(pattern)}"))
+                          for pattern, sub in patterns.items()]
+        additional_check = None if additional is True else \
+            self._compile(additional, f"{location}/additionalProperties")
+        # 额外属性不允许时给出更直接的错误信息
+        forbid_additional = additional is False
+
+        def check(value, path, errors):
+            if type(value) is not dict:
+                return True
+            valid = True
+            for name, item in value.items():
+                matched = False
+                property_check = property_checks.get(name)
+                if property_check is not None:
+                    matched = True
+                    if not property_check(item, (path, name), errors):
+                        valid = False
+                for regex, pattern_check in pattern_checks:
+                    if regex.search(name):
+                        matched = True
+                        if not pattern_check(item, (path, name), errors):
+                            valid = False
+                if not matched and additional_check is not None:
+                    if forbid_additional:
+                        errors.append(self._error(path, location, "additionalProperties", f"不允许额外的属性 {name}"))
+                        valid = False
+                    elif not additional_check(item, (path, name), errors):
+                        valid = False
+            return valid
+        return check
+
+    def _compile_property_names(self, schema: dict, location: str, keyword: str) -> Callable:
+        check_name = self._compile(schema["propertyNames"], f"{location}/propertyNames")
+
+        def check(value, path, errors):
+            if type(value) is not dict:
+                return True
+            valid = True
+            for name in value:
+                if not check_name(name, (path, name), errors):
+                    valid = False
+            return valid
+        return check
+
+    def _compile_dependent_required(self, schema: dict, location: str, keyword: str) -> Callable:
+        dependencies = schema["dependentRequired"]
+        if not isinstance(dependencies, dict):
+            raise JsonSchemaError(f"{location}/dependentRequired: 必须是对象")
+
+        def check(value, path, errors):
+            if type(value) is not dict:
+                return True
+            valid = True
+            for name, required in dependencies.items():
+                if name in value:
+                    for other in required:
+                        if other not in value:
+                            errors.append(self._error(path, location, "dependentRequired",
+                                                      f"存在属性 {name} 时必须同时存在 {other}"))
+                            valid = False
+            return valid
+        return check
+
+    # 组合
+
+    def _compile_all_of(self, schema: dict, location: str, keyword: str) -> Callable:
+        checks = self._subschemas(schema, "allOf", location)
+
+        def check(value, path, errors):
+            valid = True
+            for sub in checks:
+                if not sub(value, path, errors):
+                    valid = False
+            return valid
+        return check
+
+    def _compile_any_of(self, schema: dict, location: str, keyword: str) -> Callable:
+        checks = self._subschemas(schema, "anyOf", location)
+
+        def check(value, path, errors):
+            for sub in checks:
+                if sub(value, path, []):
+                    return True
+            errors.append(self._error(path, location, "anyOf", "不满足 anyOf 中的任何一个模式"))
+            return False
+        return check
+
+    def _compile_one_of(self, schema: dict, location: str, keyword: str) -> Callable:
+        checks = self._subschemas(schema, "oneOf", location)
+
+        def check(value, path, errors):
+            matched = sum(1 for sub in checks if sub(value, path, []))
+            if matched == 1:
+                return True
+            message = "不满足 oneOf 中的任何一个模式" if not matched else f"同时满足 oneOf 中的 {matched} 个模式"
+            errors.append(self._error(path, location, "oneOf", message))
+            return False
+        return check
+
+    def _compile_not(self, schema: dict, location: str, keyword: str) -> Callable:
+        sub = self._compile(schema["not"], f"{location}/not")
+
+        def check(value, path, errors):
+            if not sub(value, path, []):
+                return True
+            errors.append(self._error(path, location, "not", "不应满足 not 中的模式"))
+            return False
+        return check
+
+    def _compile_if(self, schema: dict, location: str, keyword: str) -> Optional[Callable]:
+        if "then" not in schema and "else" not in schema:
+            return None
+        condition = self._compile(schema["if"], f"{location}/if")
+        then_check = self._compile(schema.get("then", True), f"{location}/then")
+        else_check = self._compile(schema.get("else", True), f"{location}/else")
+
+        def check(value, path, errors):
+            if condition(value, path, []):
+                return then_check(value, path, errors)
+            return else_check(value, path, errors)
+        return check
+
+    # 辅助
+
+    def _subschemas(self, schema: dict, keyword: str, location: str) -> List[Callable]:
+        subschemas = schema[keyword]
+        if not isinstance(subschemas, list) or not subschemas:
+            raise JsonSchemaError(f"{location}/{keyword}: 必须是非空数组")
+        return [self._compile(sub, f"{location}/{keyword}/{index}") for index, sub in enumerate(subschemas)]
+
+    @staticmethod
+    def _non_negative(schema: dict, keyword: str, location: str) -> int:
+        limit = schema[keyword]
+        if type(limit) is float and limit.is_integer():
+            limit = int(limit)
+        if type(limit) is not int or limit < 0:
+            raise JsonSchemaError(f"{location}/{keyword}: 必须是非负整数")
+        return limit
+
+    @staticmethod
+    def _regex(pattern: Any, location: str):
+        if not isinstance(pattern, str):
+            raise JsonSchemaError(f"{location}: 正则表达式必须是字符串")
+        try:
+            return re.compile(pattern)
+        except re.error as e:
+            raise JsonSchemaError(f"{location}: 无效的正则表达式 {pattern}: {e}")
+
+    _BOUNDS = {
+        "minimum": (operator.ge, "小于最小值"),
+        "maximum": (operator.le, "大于最大值"),
+        "exclusiveMinimum": (operator.gt, "不大于"),
+        "exclusiveMaximum": (operator.lt, "不小于"),
+    }
+    _LENGTHS = {
+        "minLength": (operator.ge, str, "字符串长度"),
+        "maxLength": (operator.le, str, "字符串长度"),
+        "minItems": (operator.ge, list, "元素数"),
+        "maxItems": (operator.le, list, "元素数"),
+        "minProperties": (operator.ge, dict, "属性数"),
+        "maxProperties": (operator.le, dict, "属性数"),
+    }
+    # 关键字及其编译方法，按此顺序检查（类型错误最先报告）；
+    # properties/patternProperties/additionalProperties 在 _compile 中单独处理
+    _KEYWORDS = [
+        ("type", "_compile_type"),
+        ("enum", "_compile_enum"),
+        ("const", "_compile_const"),
+        ("minimum", "_compile_bound"),
+        ("maximum", "_compile_bound"),
+        ("exclusiveMinimum", "_compile_bound"),
+        ("exclusiveMaximum", "_compile_bound"),
+        ("multipleOf", "_compile_multiple_of"),
+        ("minLength", "_compile_length"),
+        ("maxLength", "_compile_length"),
+        ("pattern", "_compile_pattern"),
+        ("minItems", "_compile_length"),
+        ("maxItems", "_compile_length"),
+        ("uniqueItems", "_compile_unique_items"),
+        ("prefixItems", "_compile_prefix_items"),
+        ("items", "_compile_items"),
+        ("contains", "_compile_contains"),
+        ("required", "_compile_required"),
+        ("minProperties", "_compile_length"),
+        ("maxProperties", "_compile_length"),
+        ("propertyNames", "_compile_property_names"),
+        ("dependentRequired", "_compile_dependent_required"),
+        ("allOf", "_compile_all_of"),
+        ("anyOf", "_compile_any_of"),
+        ("oneOf", "_compile_one_of"),
+        ("not", "_compile_not"),
+        ("if", "_compile_if"),
+    ]
+
+
+def _canonical(schema: Any) -> str:
+    """模式的规范化文本：键排序后的紧凑JSON，键顺序和空白不同的相同模式文本相同"""
+    try:
+        return json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        raise JsonSchemaError(f"模式不是有效的JSON值: {e}")
+
+
+def schema_hash(schema: Any) -> str:
+    """模式的规范化哈希（SHA-256）"""
+    return hashlib.sha256(_canonical(schema).encode("utf-8")).hexdigest()
+
+
+def compile_schema(schema: Any) -> SchemaValidator:
+    """编译模式，相同的模式（按规范化哈希）复用已编译的校验器；模式无效时抛出 JsonSchemaError"""
+    text = _canonical(schema)
+    return _compile_cached(hashlib.sha256(text.encode("utf-8")).hexdigest(), text)
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _compile_cached(key: str, text: str) -> SchemaValidator:
+    # 校验器持有从规范化文本重新解析的模式，调用方之后修改传入的对象不影响缓存
+    try:
+        return SchemaValidator(json.loads(text), key)
+    except RecursionError:
+        raise JsonSchemaError("模式嵌套过深")
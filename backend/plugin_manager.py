@@ -3,10 +3,14 @@
 负责插件的加载、管理和执行
 """
 import os
+import sys
 import importlib.util
 import logging
-from typing import Dict, List, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from .base_plugin import BasePlugin
+from .result_cache import ResultCache, make_cache_key, CACHE_HIT, CACHE_MISS, CACHE_BYPASS
 
 
 logger = logging.getLogger(__name__)
@@ -15,9 +19,15 @@ logger = logging.getLogger(__name__)
 class PluginManager:
     """插件管理器"""
     
-    def __init__(self, plugin_dir: str = "plugins"):
+    def __init__(self, plugin_dir: str = "plugins", result_cache: Optional[ResultCache] = None):
+        """
+        Args:
+            plugin_dir: 插件目录
+            result_cache: 结果缓存，为None时不缓存（插件通过 get_cache_policy 声明可缓存的调用）
+        """
         self.plugin_dir = plugin_dir
         self.plugins: Dict[str, BasePlugin] = {}
+        self.result_cache = result_cache
         
     def load_plugins(self):
         """加载所有插件"""
@@ -37,12 +47,18 @@ class PluginManager:
         """加载单个插件"""
         try:
             plugin_path = os.path.join(self.plugin_dir, filename)
-            module_name = filename[:-3]  # 去掉.py后缀
+            module_name = self._module_name(filename[:-3])  # 去掉.py后缀
             
             # 动态加载模块
             spec = importlib.util.spec_from_file_location(module_name, plugin_path)
             module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            # 注册到sys.modules，使插件中的模块级函数可以被pickle，供多进程任务使用
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except Exception:
+                del sys.modules[module_name]
+                raise
             
             # 查找BasePlugin的子类
             for attr_name in dir(module):
@@ -60,6 +76,13 @@ class PluginManager:
         except Exception as e:
             logger.error(f"加载插件 {filename} 失败: {str(e)}")
     
+    def _module_name(self, name: str) -> str:
+        """插件模块名：插件目录是Python包时使用完整包路径（如plugins.calculator），子进程可以直接导入"""
+        package = os.path.basename(os.path.normpath(self.plugin_dir))
+        if package.isidentifier() and os.path.exists(os.path.join(self.plugin_dir, '__init__.py')):
+            return f"{package}.{name}"
+        return name
+    
     def get_plugin(self, plugin_name: str) -> BasePlugin:
         """获取指定插件"""
         return self.plugins.get(plugin_name)
@@ -109,7 +132,91 @@ class PluginManager:
                 "message": f"执行错误: {str(e)}"
             }
     
+    def execute_plugin_cached(self, plugin_name: str,
+                              params: Dict[str, Any] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        执行插件，插件声明可缓存的调用优先返回缓存结果
+
+        Returns:
+            (执行结果, 缓存状态 HIT/MISS/BYPASS)
+        """
+        params = params or {}
+        plugin = self.get_plugin(plugin_name)
+        policy = None
+        if plugin and self.result_cache is not None:
+            try:
+                policy = plugin.get_cache_policy(params)
+            except Exception as e:
+                logger.warning(f"插件 {plugin_name} 缓存策略获取失败: {str(e)}")
+
+        key = None
+        if policy is not None:
+            key = make_cache_key(plugin_name, plugin.version, params, policy.get("file_params"))
+        if key is None:
+            return self.execute_plugin(plugin_name, params), CACHE_BYPASS
+
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached, CACHE_HIT
+
+        result = self.execute_plugin(plugin_name, params)
+        # 只缓存成功的结果，失败可能是暂时性的（如文件正在写入）
+        if isinstance(result, dict) and result.get("success"):
+            self.result_cache.put(key, result, policy.get("ttl"))
+        return result, CACHE_MISS
+    
+    def execute_batch(self, items: List[Dict[str, Any]], max_workers: int = 1) -> Iterator[Dict[str, Any]]:
+        """
+        批量执行插件，按输入顺序逐条产出结果
+
+        单条失败不影响其他条目。并行执行时最多同时提交 max_workers 的4倍条目，
+        结果边执行边产出，大批量时内存占用与批量大小无关
+
+        Args:
+            items: 条目列表，格式: [{"plugin": "插件名", "params": {...}}]
+            max_workers: 并行线程数，1表示在当前线程中顺序执行
+
+        Yields:
+            {"index": 序号, "plugin": 插件名, "cache": 缓存状态, "result": 执行结果}
+        """
+        if max_workers <= 1:
+            for index, item in enumerate(items):
+                yield self._execute_batch_item(index, item)
+            return
+
+        window = max_workers * 4
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+            pending = deque()
+            for index, item in enumerate(items):
+                pending.append(executor.submit(self._execute_batch_item, index, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _execute_batch_item(self, index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        """执行批量中的单个条目，条目格式错误时返回该条目的错误结果"""
+        plugin_name = item.get("plugin") if isinstance(item, dict) else None
+        params = item.get("params", {}) if isinstance(item, dict) else None
+        if not plugin_name or not isinstance(params, dict):
+            return {
+                "index": index,
+                "plugin": plugin_name,
+                "cache": CACHE_BYPASS,
+                "result": {
+                    "success": False,
+                    "data": None,
+                    "message": "条目格式错误，应为 {\"plugin\": \"插件名\", \"params\": {...}}"
+                }
+            }
+
+        result, cache_status = self.execute_plugin_cached(plugin_name, params)
+        return {"index": index, "plugin": plugin_name, "cache": cache_status, "result": result}
+    
     def reload_plugins(self):
         """重新加载所有插件"""
         self.plugins.clear()
+        # 插件代码可能已变化，旧结果全部作废
+        if self.result_cache is not None:
+            self.result_cache.clear()
         self.load_plugins()
@@ -0,0 +1,295 @@
+"""
+插件结果缓存
+缓存确定性插件调用的结果：键由插件名、版本和规范化后的参数生成，
+依赖文件的操作额外加入文件的大小和修改时间，文件变化后自动失效。
+内存中按LRU保留，超出容量的条目可溢出到磁盘
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+
+logger = logging.getLogger(__name__)
+
+# 缓存状态（作为 X-Cache 响应头返回）
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+CACHE_BYPASS = "BYPASS"
+
+
+def make_cache_key(plugin_name: str, version: str, params: Dict[str, Any],
+                   file_params: List[str] = None) -> Optional[str]:
+    """
+    生成缓存键
+
+    Args:
+        plugin_name: 插件名称
+        version: 插件版本，升级插件后旧结果自动失效
+        params: 执行参数
+        file_params: 值为文件路径的参数名，文件的大小和修改时间参与生成键
+
+    Returns:
+        缓存键；文件不存在时返回None（不缓存）
+    """
+    files = {}
+    for name in file_params or []:
+        path = params.get(name)
+        if not path:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        files[name] = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+    canonical = json.dumps(
+        {"plugin": plugin_name, "version": version, "params": params, "files": files},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU结果缓存，可选磁盘溢出"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 spill_dir: str = None, spill_max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            max_entries: 内存中的最大条目数
+            max_bytes: 内存中结果（序列化后）的总字节数上限
+            spill_dir: 磁盘溢出目录，为空时淘汰的条目直接丢弃
+            spill_max_bytes: 磁盘溢出总字节数上限，超出后删除最早写入的文件
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.spill_max_bytes = spill_max_bytes
+
+        # {key: (序列化的结果, 过期时间或None)}
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._spill_bytes = None  # 首次溢出时统计
+        self._lock = threading.Lock()  # 只保护内存状态和计数，磁盘读写都在锁外进行
+        self._prune_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，未命中或已过期返回None（每次返回新的结果对象，调用方可以自由修改）"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                data, expires = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return json.loads(data)
+                self._remove_locked(key)
+
+        entry = self._read_spill(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            self._remove_spill(key)
+            entry = None
+        spills = []
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._hits += 1
+            # 磁盘命中后重新放回内存（超过内存上限的条目留在磁盘）
+            promoted = len(entry[0].encode("utf-8")) <= self.max_bytes
+            if promoted:
+                spills = self._put_locked(key, entry[0], entry[1])
+        if promoted:
+            self._remove_spill(key)
+        self._write_spills(spills)
+        return json.loads(entry[0])
+
+    def put(self, key: str, result: Dict[str, Any], ttl: float = None):
+        """保存结果；无法序列化为JSON的结果不缓存"""
+        try:
+            data = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            spills = self._put_locked(key, data, expires)
+        self._write_spills(spills)
+
+    def clear(self):
+        """清空内存和磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.spill_dir:
+            for path in self._spill_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            with self._lock:
+                self._spill_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 4) if total else 0.0,
+                "spill_bytes": self._spill_bytes or 0
+            }
+
+    def _put_locked(self, key: str, data: str, expires: Optional[float]) -> List[tuple]:
+        """
+        写入内存，超出容量时淘汰最久未使用的条目
+
+        Returns:
+            需要溢出到磁盘的条目 [(key, data, expires)]，由调用方释放锁后交给 _write_spills 写入
+        """
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return [(key, data, expires)]
+
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = (data, expires)
+        self._bytes += size
+
+        spills = []
+        now = time.time()
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            old_key, (old_data, old_expires) = self._entries.popitem(last=False)
+            self._bytes -= len(old_data.encode("utf-8"))
+            if old_expires is None or old_expires > now:
+                spills.append((old_key, old_data, old_expires))
+        return spills
+
+    def _remove_locked(self, key: str):
+        data, _ = self._entries.pop(key)
+        self._bytes -= len(data.encode("utf-8"))
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, key[:2], f"{key}.json")
+
+    def _spill_files(self) -> List[str]:
+        paths = []
+        for root, _, files in os.walk(self.spill_dir):
+            paths.extend(os.path.join(root, name) for name in files if name.endswith(".json"))
+        return paths
+
+    def _spill_total(self) -> int:
+        total = 0
+        for path in self._spill_files():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _write_spills(self, spills: List[tuple]):
+        """把内存淘汰的条目写入磁盘（不持有锁时调用），超出磁盘配额时删除最早写入的文件"""
+        if not self.spill_dir or not spills:
+            return
+        delta = 0
+        for key, data, expires in spills:
+            delta += self._write_spill(key, data, expires)
+
+        total = self._spill_total() if self._spill_bytes is None else None
+        with self._lock:
+            if self._spill_bytes is None:
+                self._spill_bytes = total
+            else:
+                self._spill_bytes += delta
+            over = self._spill_bytes > self.spill_max_bytes
+        if over:
+            self._prune_spill()
+
+    def _write_spill(self, key: str, data: str, expires: Optional[float]) -> int:
+        """把条目写入磁盘（原子写入），返回磁盘占用的变化量（覆盖已有文件时扣除旧文件大小）"""
+        path = self._spill_path(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires": expires, "data": data}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            return os.path.getsize(path) - old_size
+        except OSError as e:
+            logger.warning(f"结果缓存写入磁盘失败: {str(e)}")
+            return 0
+
+    def _read_spill(self, key: str) -> Optional[tuple]:
+        """从磁盘读取条目"""
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._spill_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry["data"], entry["expires"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _remove_spill(self, key: str):
+        """删除磁盘条目（已放回内存或已过期）"""
+        path = self._spill_path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._spill_bytes is not None:
+                self._spill_bytes = max(self._spill_bytes - size, 0)
+
+    def _prune_spill(self):
+        """删除最早写入的磁盘条目，直到总大小降到配额的90%以下（同一时间只有一个线程清理）"""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            files = []
+            for path in self._spill_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            files.sort()
+
+            total = sum(size for _, size, _ in files)
+            target = int(self.spill_max_bytes * 0.9)
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            with self._lock:
+                self._spill_bytes = total
+        finally:
+            self._prune_lock.release()
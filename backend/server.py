@@ -0,0 +1,116 @@
+"""
+生产环境HTTP服务
+POSIX系统使用gunicorn（默认单个工作进程 + 多线程，可配置多进程），
+Windows或未安装gunicorn时退回waitress（单进程多线程）
+"""
+import logging
+import os
+import time
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_production(server_factory: Callable, host: str, port: int):
+    """
+    以生产模式启动服务
+
+    Args:
+        server_factory: 创建 APIServer 的函数；gunicorn下在每个工作进程中各调用一次，
+                        使插件、线程池和后台线程都在工作进程内创建
+        host: 监听地址
+        port: 监听端口
+    """
+    if os.name != "nt":
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            logger.warning("未安装gunicorn，使用waitress单进程多线程模式")
+        else:
+            _run_gunicorn(server_factory, host, port)
+            return
+
+    _run_waitress(server_factory, host, port)
+
+
+def _run_gunicorn(server_factory: Callable, host: str, port: int):
+    """使用gunicorn的gthread工作模式启动"""
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.workers.gthread import ThreadWorker
+    import config
+
+    drain_timeout = getattr(config, 'SERVER_JOB_DRAIN_TIMEOUT', 600)
+
+    class _JobAwareWorker(ThreadWorker):
+        """停止接收请求后，先等待本进程中的后台任务结束再退出
+        （worker因max_requests重启时，正在执行的任务不会被中断；等待期间持续发送心跳，避免被主进程强制结束）"""
+
+        def run(self):
+            super().run()
+
+            api_server = getattr(self.app, "api_server", None)
+            if api_server is None:
+                return
+
+            job_manager = api_server.job_manager
+            deadline = time.time() + drain_timeout
+            while job_manager.stats()["running"] and time.time() < deadline:
+                self.notify()
+                time.sleep(1)
+            job_manager.shutdown()
+
+    options = {
+        "bind": f"{host}:{port}",
+        "worker_class": _JobAwareWorker,
+        "workers": max(1, getattr(config, 'SERVER_WORKERS', 1)),
+        "threads": getattr(config, 'SERVER_THREADS', 16),
+        "timeout": getattr(config, 'SERVER_TIMEOUT', 120),
+        "graceful_timeout": getattr(config, 'SERVER_GRACEFUL_TIMEOUT', 30),
+        "keepalive": getattr(config, 'SERVER_KEEPALIVE', 5),
+        "max_requests": getattr(config, 'SERVER_MAX_REQUESTS', 0),
+        "max_requests_jitter": getattr(config, 'SERVER_MAX_REQUESTS_JITTER', 100),
+        # 不预加载应用：每个工作进程独立创建插件和线程池（线程在fork后不会被继承）
+        "preload_app": False
+    }
+
+    class _Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            self.api_server = server_factory()
+            return self.api_server.app
+
+    if options["workers"] > 1:
+        logger.warning(
+            "SERVER_WORKERS > 1：插件内部进度（电子书翻译 get_progress、/video/progress）只存在于执行任务的进程，"
+            "JOB_MAX_WORKERS 和 JOB_PLUGIN_CONCURRENCY 按进程分别计算；请通过 /jobs 接口提交任务并查询进度"
+        )
+    logger.info(
+        f"启动gunicorn: http://{host}:{port} "
+        f"({options['workers']} 个工作进程 x {options['threads']} 线程)"
+    )
+    _Application().run()
+
+
+def _run_waitress(server_factory: Callable, host: str, port: int):
+    """使用waitress启动（单进程，所有线程共享插件和任务状态）"""
+    from waitress import serve
+    import config
+
+    api_server = server_factory()
+    threads = getattr(config, 'SERVER_THREADS', 16)
+    logger.info(f"启动waitress: http://{host}:{port} ({threads} 线程)")
+    try:
+        serve(
+            api_server.app,
+            host=host,
+            port=port,
+            threads=threads,
+            channel_timeout=getattr(config, 'SERVER_KEEPALIVE', 5),
+            connection_limit=getattr(config, 'SERVER_CONNECTION_LIMIT', 1000)
+        )
+    finally:
+        api_server.job_manager.shutdown()
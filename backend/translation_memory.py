@@ -0,0 +1,152 @@
+"""
+翻译记忆库
+以 (翻译服务, 模型, 目标语言, 规范化原文哈希) 为键，把段落译文持久化到SQLite，
+重复翻译同一本书或内容重叠的文档时直接复用已有译文
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_segment(text: str) -> str:
+    """规范化原文：合并连续空白并去除首尾空白，使排版差异不影响命中"""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class TranslationMemory:
+    """基于SQLite的翻译记忆库，按总字节数做LRU淘汰"""
+
+    def __init__(self, db_path: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            db_path: SQLite数据库文件路径
+            max_bytes: 译文与原文总字节数上限，超出后淘汰最久未使用的条目
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM translations"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(provider: str, model: str, target_language: str, segment: str) -> str:
+        """生成记忆库键"""
+        digest = hashlib.sha256(normalize_segment(segment).encode("utf-8")).hexdigest()
+        return f"{provider}|{model}|{target_language}|{digest}"
+
+    def get(self, provider: str, model: str, target_language: str, segment: str) -> Optional[str]:
+        """查询译文，未命中返回None"""
+        key = self.make_key(provider, model, target_language, segment)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return row[0]
+
+    def put(self, provider: str, model: str, target_language: str, segment: str, translation: str):
+        """保存译文"""
+        key = self.make_key(provider, model, target_language, segment)
+        size = len(segment.encode("utf-8")) + len(translation.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(key, provider, model, target_language, translation, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, target_language, translation, size, time.time())
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict_locked()
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """记忆库统计信息"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        return {
+            "entries": entries,
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    def clear(self):
+        """清空记忆库"""
+        with self._lock:
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def _evict_locked(self):
+        """淘汰最久未使用的条目，直到总大小降到上限的90%以下"""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        cursor = self._conn.execute("SELECT key, size FROM translations ORDER BY last_used ASC")
+        keys = []
+        for key, size in cursor:
+            if self._total_bytes <= target:
+                break
+            keys.append((key,))
+            self._total_bytes -= size
+            evicted += 1
+        self._conn.executemany("DELETE FROM translations WHERE key = ?", keys)
+        logger.info(f"翻译记忆库淘汰 {evicted} 条记录")
+
+
+_memory: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> TranslationMemory:
+    """获取进程内共享的翻译记忆库实例（按config.py配置延迟创建）"""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                import config
+                _memory = TranslationMemory(
+                    getattr(config, 'TRANSLATION_MEMORY_PATH', 'cache/translation_memory.db'),
+                    getattr(config, 'TRANSLATION_MEMORY_MAX_BYTES', 512 * 1024 * 1024)
+                )
+    return _memory
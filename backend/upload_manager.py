@@ -0,0 +1,324 @@
+"""
+分块上传管理器
+可断点续传的上传协议：创建上传会话 → 按偏移量逐块写入 → 完成上传。
+数据块直接从请求流写入磁盘，写入同时增量计算SHA-256；
+完成后存入内容寻址文件存储，相同内容的文件只保存一份
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, BinaryIO
+from werkzeug.utils import secure_filename
+from .blob_store import BlobStore
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 下只有单进程的 waitress，进程内的线程锁即可
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# 从请求流读取数据的缓冲区大小
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """上传协议错误，status_code 为对应的HTTP状态码"""
+
+    def __init__(self, message: str, status_code: int = 400, **details):
+        super().__init__(message)
+        self.status_code = status_code
+        self.details = details
+
+
+class UploadManager:
+    """分块上传管理器
+
+    会话元数据和未完成的数据保存在 <upload_folder>/.sessions/ 下，
+    服务重启或请求落到其他工作进程时都可以继续上传；同一会话的写入通过 .part 文件上的 flock 在进程间互斥
+    """
+
+    def __init__(self, upload_folder: str, blob_store: BlobStore, max_size: int = 10 * 1024 * 1024 * 1024,
+                 session_ttl: int = 24 * 3600):
+        """
+        Args:
+            upload_folder: 上传目录，未完成的分块保存在其下的 .sessions/ 中
+            blob_store: 完成后的文件存入的内容寻址存储（命名空间 uploads）
+            max_size: 单个文件大小上限（字节）
+            session_ttl: 未完成的上传会话保留时间（秒），超时后被清理
+        """
+        self.upload_folder = upload_folder
+        self.blob_store = blob_store
+        self.max_size = max_size
+        self.session_ttl = session_ttl
+        self.session_dir = os.path.join(upload_folder, ".sessions")
+        os.makedirs(self.session_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._session_locks: Dict[str, threading.Lock] = {}
+        # 增量哈希状态 {upload_id: (hasher, 已计算到的偏移量)}，只存在于接收分块的进程中
+        self._hashers: Dict[str, tuple] = {}
+
+    def init_upload(self, filename: str, size: int, sha256: str = None) -> Dict[str, Any]:
+        """
+        创建上传会话
+
+        Args:
+            filename: 原始文件名
+            size: 文件总大小（字节）
+            sha256: 客户端预先计算的SHA-256（可选），已有相同内容的文件时直接返回，无需上传
+
+        Returns:
+            会话信息；秒传命中时 complete 为 True 并包含 filepath
+        """
+        self._cleanup_expired()
+
+        name = secure_filename(filename or "")
+        if not name:
+            raise UploadError("无效的文件名")
+        if not isinstance(size, int) or size < 0:
+            raise UploadError("无效的文件大小")
+        if size > self.max_size:
+            raise UploadError(f"文件太大，最大支持 {self.max_size // 1024 // 1024} MB", 413)
+
+        if sha256:
+            sha256 = sha256.lower()
+            blob = self.blob_store.link(sha256, name, "uploads")
+            if blob:
+                logger.info(f"秒传命中: {name} -> {blob['path']}")
+                return self._completed_info(blob)
+
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "filename": name,
+            "size": size,
+            "sha256": sha256,
+            "created_at": time.time(),
+            "updated_at": time.time()
+        }
+        self._write_session(session)
+        open(self._part_path(upload_id), "wb").close()
+        return self._session_info(session, 0)
+
+    def get_status(self, upload_id: str) -> Dict[str, Any]:
+        """获取上传会话状态（断点续传时用于确定下一个分块的偏移量）"""
+        session = self._read_session(upload_id)
+        return self._session_info(session, os.path.getsize(self._part_path(upload_id)))
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO,
+                    length: Optional[int] = None) -> Dict[str, Any]:
+        """
+        把请求流中的数据写入指定偏移量
+
+        只允许从当前已接收的末尾继续写入（offset 必须等于已接收的字节数），
+        不一致时返回409和服务端的实际偏移量，客户端据此续传；
+        同一会话正在被另一个请求写入时返回409并带 busy 标记，客户端应稍等后再查询偏移量
+        """
+        session = self._read_session(upload_id)
+        part_path = self._part_path(upload_id)
+
+        with self._session_lock(upload_id, blocking=False):
+            current = os.path.getsize(part_path)
+            if offset != current:
+                raise UploadError(f"偏移量不匹配，服务端已接收 {current} 字节", 409, offset=current)
+
+            hasher, hashed_offset = self._hashers.get(upload_id, (None, 0))
+            if hasher is None and current == 0:
+                hasher = hashlib.sha256()
+            # 哈希状态与文件不一致（例如前面的分块由其他进程接收），完成时再补算
+            incremental = hasher is not None and hashed_offset == current
+
+            remaining = session["size"] - current
+            written = 0
+            try:
+                with open(part_path, "r+b") as f:
+                    f.seek(current)
+                    while True:
+                        to_read = _COPY_BUFFER_SIZE if length is None else min(_COPY_BUFFER_SIZE, length - written)
+                        if to_read <= 0:
+                            break
+                        data = stream.read(to_read)
+                        if not data:
+                            break
+                        if written + len(data) > remaining:
+                            raise UploadError("数据超出声明的文件大小", 400, offset=current)
+                        f.write(data)
+                        if incremental:
+                            hasher.update(data)
+                        written += len(data)
+            except UploadError:
+                # 丢弃本块已写入的部分；哈希状态已包含这部分数据，作废后在完成时补算
+                with open(part_path, "r+b") as f:
+                    f.truncate(current)
+                self._hashers.pop(upload_id, None)
+                raise
+            except Exception:
+                # 连接中断：保留已完整写入的数据，客户端按 get_status 返回的偏移量续传
+                if incremental:
+                    self._hashers[upload_id] = (hasher, current + written)
+                raise
+
+            if incremental:
+                self._hashers[upload_id] = (hasher, current + written)
+
+            session["updated_at"] = time.time()
+            self._write_session(session)
+            return self._session_info(session, current + written)
+
+    def finalize(self, upload_id: str) -> Dict[str, Any]:
+        """完成上传：校验大小和哈希，按内容去重后移动到上传目录"""
+        session = self._read_session(upload_id)
+        part_path = self._part_path(upload_id)
+
+        with self._session_lock(upload_id):
+            received = os.path.getsize(part_path)
+            if received != session["size"]:
+                raise UploadError(
+                    f"上传未完成: 已接收 {received} / {session['size']} 字节", 409, offset=received
+                )
+
+            digest = self._finish_hash(upload_id, part_path)
+            if session.get("sha256") and session["sha256"] != digest:
+                self.abort(upload_id)
+                raise UploadError("文件校验失败: SHA-256不一致，请重新上传", 422)
+
+            blob = self.blob_store.put_file(part_path, session["filename"], "uploads", digest)
+            self._remove_session(upload_id)
+            logger.info(f"上传完成: {session['filename']} ({received} 字节){'，内容重复已去重' if blob['deduplicated'] else ''}")
+            return self._completed_info(blob)
+
+    def abort(self, upload_id: str):
+        """取消上传并删除已接收的数据"""
+        self._read_session(upload_id)
+        for path in (self._part_path(upload_id), self._session_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._hashers.pop(upload_id, None)
+        self._session_locks.pop(upload_id, None)
+
+    def _finish_hash(self, upload_id: str, part_path: str) -> str:
+        """取得完整文件的SHA-256，增量状态缺失的部分从磁盘补算"""
+        hasher, hashed_offset = self._hashers.pop(upload_id, (None, 0))
+        if hasher is None:
+            hasher, hashed_offset = hashlib.sha256(), 0
+
+        with open(part_path, "rb") as f:
+            f.seek(hashed_offset)
+            for block in iter(lambda: f.read(_COPY_BUFFER_SIZE), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _cleanup_expired(self):
+        """清理超时未完成的上传会话"""
+        now = time.time()
+        for name in os.listdir(self.session_dir):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                session = self._read_session(upload_id)
+            except UploadError:
+                continue
+            if now - session.get("updated_at", 0) > self.session_ttl:
+                logger.info(f"清理过期上传会话: {upload_id} ({session.get('filename')})")
+                self.abort(upload_id)
+
+    @contextmanager
+    def _session_lock(self, upload_id: str, blocking: bool = True):
+        """
+        同一会话的分块写入和完成操作串行执行，跨线程也跨工作进程：
+        先取进程内的线程锁，再对 .part 文件加 flock（文件关闭时自动释放，进程崩溃也不会残留）
+
+        blocking 为 False 时不等待：另一个请求（例如客户端重试落到了其他工作进程，而原请求仍在写入）
+        正持有锁时立即返回409，客户端稍后按 get_status 的偏移量续传
+        """
+        with self._lock:
+            thread_lock = self._session_locks.setdefault(upload_id, threading.Lock())
+        if not thread_lock.acquire(blocking):
+            raise UploadError("该上传会话正在被另一个请求写入，请稍后续传", 409,
+                              offset=self._received_size(upload_id), busy=True)
+        try:
+            try:
+                fd = os.open(self._part_path(upload_id), os.O_RDWR)
+            except FileNotFoundError:
+                raise UploadError(f"上传会话不存在: {upload_id}", 404)
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                    except BlockingIOError:
+                        raise UploadError("该上传会话正在被另一个请求写入，请稍后续传", 409,
+                                          offset=os.fstat(fd).st_size, busy=True)
+                yield
+            finally:
+                os.close(fd)
+        finally:
+            thread_lock.release()
+
+    def _received_size(self, upload_id: str) -> int:
+        try:
+            return os.path.getsize(self._part_path(upload_id))
+        except OSError:
+            return 0
+
+    def _session_path(self, upload_id: str) -> str:
+        return os.path.join(self.session_dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.session_dir, f"{upload_id}.part")
+
+    def _read_session(self, upload_id: str) -> Dict[str, Any]:
+        """读取会话元数据，会话不存在时抛出404"""
+        if not upload_id or not upload_id.isalnum():
+            raise UploadError(f"上传会话不存在: {upload_id}", 404)
+        try:
+            with open(self._session_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError(f"上传会话不存在: {upload_id}", 404)
+
+    def _write_session(self, session: Dict[str, Any]):
+        """原子写入会话元数据"""
+        path = self._session_path(session["upload_id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(session, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _remove_session(self, upload_id: str):
+        """删除会话元数据"""
+        path = self._session_path(upload_id)
+        if os.path.exists(path):
+            os.remove(path)
+        self._session_locks.pop(upload_id, None)
+
+    @staticmethod
+    def _session_info(session: Dict[str, Any], offset: int) -> Dict[str, Any]:
+        """会话状态"""
+        return {
+            "upload_id": session["upload_id"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "offset": offset,
+            "complete": False
+        }
+
+    @staticmethod
+    def _completed_info(blob: Dict[str, Any]) -> Dict[str, Any]:
+        """完成后的文件信息（与 /upload 的返回字段保持一致）"""
+        return {
+            "complete": True,
+            "filepath": blob["path"],
+            "filename": blob["name"],
+            "size": blob["size"],
+            "sha256": blob["hash"],
+            "deduplicated": blob["deduplicated"]
+        }
@@ -0,0 +1,140 @@
+"""
+JSON结构化差异基准测试
+在合成的多MB配置快照（大对象）和记录导出（大数组）上测量 diff_json 的耗时、补丁大小，
+校验 apply_patch 能把源文档还原为目标文档；并在较小的数组上与逐对比较的二次LCS对照
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_json_diff.py --keys 50000 --records 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.json_patch import diff_json, apply_patch, json_identical
+
+
+# ---- 合成数据 ----
+
+def make_config(count: int, rng: random.Random) -> dict:
+    """大对象：按服务名组织的配置快照"""
+    return {
+        f"service_{i}": {
+            "enabled": rng.random() < 0.8,
+            "port": 8000 + i % 1000,
+            "replicas": rng.randint(1, 10),
+            "tags": [rng.choice(["api", "db", "cache", "web", "batch"]) for _ in range(rng.randint(0, 4))],
+            "limits": {"cpu": round(rng.random() * 4, 2), "memory": f"{rng.randint(1, 16)}Gi"}
+        }
+        for i in range(count)
+    }
+
+
+def make_records(count: int, rng: random.Random) -> list:
+    """大数组：带唯一ID的记录导出"""
+    return [
+        {"id": i, "user": f"user{i}", "score": rng.randint(0, 1000), "active": rng.random() < 0.5,
+         "path": ["a", "b", str(i % 97)]}
+        for i in range(count)
+    ]
+
+
+def mutate_config(config: dict, rng: random.Random) -> dict:
+    """约1%的服务修改字段，0.5%删除，新增0.5%"""
+    result = json.loads(json.dumps(config))
+    names = list(result)
+    for name in rng.sample(names, len(names) // 100):
+        result[name]["replicas"] += 1
+        result[name]["tags"].append("canary")
+    for name in rng.sample(names, len(names) // 200):
+        result.pop(name, None)
+    for i in range(len(names) // 200):
+        result[f"new_service_{i}"] = {"enabled": True, "port": 9000 + i}
+    return result
+
+
+def mutate_records(records: list, rng: random.Random) -> list:
+    """约1%的记录修改，0.5%删除，0.5%插入，并把一段连续的记录移到末尾"""
+    result = json.loads(json.dumps(records))
+    for index in rng.sample(range(len(result)), len(result) // 100):
+        result[index]["score"] += 1
+    for index in sorted(rng.sample(range(len(result)), len(result) // 200), reverse=True):
+        del result[index]
+    for i in range(len(records) // 200):
+        result.insert(rng.randrange(len(result)), {"id": -i, "user": "inserted"})
+    block = len(result) // 3
+    result.extend(result[block:block + 100])
+    del result[block:block + 100]
+    return result
+
+
+# ---- 对照：逐对比较的最长公共子序列（O(n*m)） ----
+
+def naive_lcs_length(source: list, target: list) -> int:
+    previous = [0] * (len(target) + 1)
+    for a in source:
+        current = [0]
+        for j, b in enumerate(target):
+            current.append(previous[j] + 1 if a == b else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def size_mb(value) -> float:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8")) / 1024 / 1024
+
+
+def run_case(name: str, source, target):
+    source_text = json.dumps(source, ensure_ascii=False)
+    start = time.perf_counter()
+    patch = diff_json(source, target)
+    diff_time = time.perf_counter() - start
+
+    patch_size = len(json.dumps(patch, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+    counts = {}
+    for op in patch:
+        counts[op["op"]] = counts.get(op["op"], 0) + 1
+
+    document = json.loads(source_text)
+    start = time.perf_counter()
+    result = apply_patch(document, patch)
+    patch_time = time.perf_counter() - start
+    assert json_identical(result, target), f"{name}: 应用补丁后与目标文档不一致"
+
+    print(f"\n[{name}] 源 {size_mb(source):.1f} MB / 目标 {size_mb(target):.1f} MB")
+    print(f"  diff:  {diff_time:.3f}s，{len(patch)} 个操作 {counts}，补丁 {patch_size / 1024:.1f} KB")
+    print(f"  patch: {patch_time:.3f}s，结果与目标一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量结构化JSON差异和补丁在大文档上的耗时")
+    parser.add_argument("--keys", type=int, default=50000, help="配置快照中的服务数")
+    parser.add_argument("--records", type=int, default=100000, help="记录导出的记录数")
+    parser.add_argument("--naive-size", type=int, default=2000, help="与二次LCS对照的数组长度")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    config = make_config(args.keys, rng)
+    run_case("大对象（配置快照）", config, mutate_config(config, rng))
+
+    records = make_records(args.records, rng)
+    run_case("大数组（记录导出）", records, mutate_records(records, rng))
+
+    small = make_records(args.naive_size, rng)
+    small_target = mutate_records(small, rng)
+    start = time.perf_counter()
+    diff_json(small, small_target)
+    hashed = time.perf_counter() - start
+    start = time.perf_counter()
+    naive_lcs_length(small, small_target)
+    naive = time.perf_counter() - start
+    print(f"\n[{args.naive_size} 条记录的数组] 指纹匹配 {hashed:.3f}s，逐对比较LCS {naive:.3f}s，"
+          f"加速比 {naive / hashed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+JSON统计基准测试
+在合成的大型JSON文档上比较原来的三次递归遍历（_count_keys、_get_depth、_analyze_structure）
+与单遍迭代统计 analyze_json 的耗时，并校验两者的键数和深度一致
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_json_stats.py --records 200000 --repeat 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plugins.json_formatter import analyze_json
+
+
+# ---- 原实现（三次递归遍历），作为对照 ----
+
+def legacy_count_keys(obj, count=0):
+    if isinstance(obj, dict):
+        count += len(obj)
+        for value in obj.values():
+            count = legacy_count_keys(value, count)
+    elif isinstance(obj, list):
+        for item in obj:
+            count = legacy_count_keys(item, count)
+    return count
+
+
+def legacy_get_depth(obj, current_depth=0):
+    if isinstance(obj, dict):
+        if not obj:
+            return current_depth
+        return max(legacy_get_depth(v, current_depth + 1) for v in obj.values())
+    elif isinstance(obj, list):
+        if not obj:
+            return current_depth
+        return max(legacy_get_depth(item, current_depth + 1) for item in obj)
+    return current_depth
+
+
+def legacy_analyze_structure(obj):
+    structure = {"objects": 0, "arrays": 0, "strings": 0, "numbers": 0, "booleans": 0, "nulls": 0}
+
+    def analyze(item):
+        if isinstance(item, dict):
+            structure["objects"] += 1
+            for value in item.values():
+                analyze(value)
+        elif isinstance(item, list):
+            structure["arrays"] += 1
+            for element in item:
+                analyze(element)
+        elif isinstance(item, str):
+            structure["strings"] += 1
+        elif isinstance(item, (int, float)):
+            structure["numbers"] += 1
+        elif isinstance(item, bool):
+            structure["booleans"] += 1
+        elif item is None:
+            structure["nulls"] += 1
+
+    analyze(obj)
+    return structure
+
+
+def legacy_stats(obj):
+    return {
+        "keys_count": legacy_count_keys(obj),
+        "depth": legacy_get_depth(obj),
+        "structure": legacy_analyze_structure(obj)
+    }
+
+
+# ---- 合成数据 ----
+
+def make_records(count: int, seed: int = 0) -> list:
+    """宽而浅的文档：类似日志导出的记录数组"""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "user": f"user{i}",
+            "score": rng.random() * 100,
+            "active": i % 3 == 0,
+            "tags": [rng.choice("abcdef") for _ in range(rng.randint(0, 6))],
+            "meta": {"region": "cn-北京", "parent": None, "path": [1, 2, {"leaf": "x" * rng.randint(0, 20)}]}
+        }
+        for i in range(count)
+    ]
+
+
+def make_deep(depth: int) -> dict:
+    """窄而深的文档：深度超过默认递归上限时原实现会失败"""
+    node = {"value": 1}
+    for i in range(depth):
+        node = {"level": i, "child": node, "items": [i, str(i)]}
+    return node
+
+
+def bench(fn, obj, repeat: int) -> float:
+    """返回多次执行中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(obj)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较三次递归遍历与单遍迭代JSON统计的耗时")
+    parser.add_argument("--records", type=int, default=200000, help="宽文档的记录数")
+    parser.add_argument("--deep", type=int, default=5000, help="深文档的嵌套层数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    print(f"生成合成文档: {args.records} 条记录 ...")
+    wide = make_records(args.records)
+    size_mb = len(json.dumps(wide, ensure_ascii=False).encode("utf-8")) / 1024 / 1024
+    print(f"文档大小: {size_mb:.1f} MB")
+
+    legacy = legacy_stats(wide)
+    single = analyze_json(wide)
+    assert legacy["keys_count"] == single["keys_count"], "键数不一致"
+    assert legacy["depth"] == single["depth"], "深度不一致"
+
+    legacy_time = bench(legacy_stats, wide, args.repeat)
+    single_time = bench(analyze_json, wide, args.repeat)
+    print(f"{'实现':<20}{'耗时(s)':>10}")
+    print(f"{'三次递归遍历':<20}{legacy_time:>10.3f}")
+    print(f"{'单遍迭代':<20}{single_time:>10.3f}")
+    print(f"加速比: {legacy_time / single_time:.2f}x")
+    # 原实现把布尔值计入了numbers（bool是int的子类），单遍统计单独计数
+    print(f"原实现 structure: {legacy['structure']}")
+    print(f"单遍 structure:   {single['structure']}")
+
+    print(f"\n深层文档: {args.deep} 层")
+    deep = make_deep(args.deep)
+    try:
+        legacy_stats(deep)
+        print("三次递归遍历: 成功")
+    except RecursionError:
+        print("三次递归遍历: RecursionError")
+    result = analyze_json(deep)
+    print(f"单遍迭代: 成功，depth={result['depth']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+视频分段并行压缩基准测试
+在本地用ffmpeg生成合成测试视频，分别用单进程模式和分段模式压缩，比较耗时
+
+用法（在项目根目录执行）:
+    python benchmarks/bench_video_segmented.py --duration 120 --resolution 1280x720
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.plugin_manager import PluginManager
+
+
+def make_test_clip(path: str, duration: int, resolution: str, fps: int):
+    """用lavfi生成带音频的合成测试视频（testsrc2画面 + 正弦波音频）"""
+    subprocess.run(
+        [
+            "ffmpeg", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size={resolution}:rate={fps}",
+            "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+            "-t", str(duration),
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", str(fps * 2),
+            "-c:a", "aac",
+            "-y", path
+        ],
+        check=True
+    )
+
+
+def run(plugin, params: dict) -> tuple:
+    """执行一次压缩，返回 (耗时秒数, 结果)"""
+    start = time.perf_counter()
+    result = plugin.execute(params)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较单进程与分段并行视频压缩的耗时")
+    parser.add_argument("--duration", type=int, default=60, help="测试视频时长（秒）")
+    parser.add_argument("--resolution", default="1280x720", help="测试视频分辨率")
+    parser.add_argument("--fps", type=int, default=30, help="测试视频帧率")
+    parser.add_argument("--segment-seconds", type=int, default=10, help="分段模式每段时长（秒）")
+    parser.add_argument("--workers", type=int, default=0, help="分段模式并发数，0表示使用配置")
+    parser.add_argument("--preset", default="medium", help="x264编码预设")
+    args = parser.parse_args()
+
+    plugin_manager = PluginManager("plugins")
+    plugin_manager.load_plugins()
+    plugin = plugin_manager.get_plugin("VideoCompressor")
+
+    with tempfile.TemporaryDirectory(prefix="bench_video_") as work_dir:
+        clip = os.path.join(work_dir, "input.mp4")
+        print(f"生成测试视频: {args.duration}s {args.resolution}@{args.fps}fps ...")
+        make_test_clip(clip, args.duration, args.resolution, args.fps)
+
+        common = {
+            "action": "compress",
+            "input_file": clip,
+            "encoder": "libx264",
+            "preset": args.preset,
+            "bitrate": "2M"
+        }
+
+        single_time, single = run(plugin, {**common, "output_file": os.path.join(work_dir, "single.mp4")})
+        if not single.get("success"):
+            print(f"单进程模式失败: {single.get('error')}")
+            return 1
+
+        segmented_params = {
+            **common,
+            "mode": "segmented",
+            "segment_seconds": args.segment_seconds,
+            "output_file": os.path.join(work_dir, "segmented.mp4")
+        }
+        if args.workers:
+            segmented_params["workers"] = args.workers
+        segmented_time, segmented = run(plugin, segmented_params)
+        if not segmented.get("success"):
+            print(f"分段模式失败: {segmented.get('error')}")
+            return 1
+
+        info = segmented["result"]
+        print(f"CPU核心数: {os.cpu_count()}")
+        print(f"单进程模式: {single_time:8.2f}s  输出 {single['result']['output_size'] / 1024 / 1024:.2f} MB")
+        print(f"分段模式:   {segmented_time:8.2f}s  输出 {info['output_size'] / 1024 / 1024:.2f} MB"
+              f"  ({info['segments']} 段, {info['workers']} 并发, 每段 {info['threads_per_segment']} 线程)")
+        print(f"加速比: {single_time / segmented_time:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,9 +6,46 @@
 HOST = '0.0.0.0'  # 监听所有网络接口
 PORT = 18787
 
+# 服务模式：development（Flask开发服务器），production（POSIX下使用gunicorn，Windows下使用waitress）
+SERVER_MODE = 'development'
+# 工作进程数（仅gunicorn）。默认1个进程、多个线程：插件内部状态（电子书翻译进度、视频压缩进度及其SSE）
+# 和 JOB_MAX_WORKERS / JOB_PLUGIN_CONCURRENCY 的并发上限都只在单个进程内有效，多进程时轮询会落到其他进程、
+# 上限按进程数成倍放大。只有异步任务状态通过JOB_STORE_PATH在进程间共享，确认只使用 /jobs 接口时才建议调大
+SERVER_WORKERS = 1
+SERVER_THREADS = 16  # 每个工作进程的请求处理线程数
+SERVER_TIMEOUT = 120  # 工作进程无心跳超过该时间（秒）后被重启（仅gunicorn）
+SERVER_GRACEFUL_TIMEOUT = 30  # 收到停止信号后等待处理中请求完成的时间（秒）
+SERVER_KEEPALIVE = 5  # 空闲长连接保持时间（秒）
+SERVER_MAX_REQUESTS = 0  # 每个工作进程处理该数量的请求后自动重启，0表示不重启（仅gunicorn；单进程时重启会丢失插件进度并暂停服务）
+SERVER_MAX_REQUESTS_JITTER = 100  # 重启阈值的随机抖动，避免所有进程同时重启
+SERVER_JOB_DRAIN_TIMEOUT = 600  # 工作进程重启前等待其后台任务结束的最长时间（秒）
+JOB_STORE_PATH = 'cache/jobs.db'  # 生产模式下的任务存储（SQLite）
+
 # 插件目录
 PLUGIN_DIR = 'plugins'
 
+# 插件结果缓存配置（只缓存插件声明为确定性的调用，如计算器、文本工具、文件信息查询）
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_MAX_ENTRIES = 1024  # 内存中的最大条目数
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 内存中缓存结果的总大小上限（字节）
+RESULT_CACHE_SPILL_DIR = 'cache/results'  # 从内存淘汰的条目写入该目录，留空则直接丢弃
+RESULT_CACHE_SPILL_MAX_BYTES = 512 * 1024 * 1024  # 磁盘缓存总大小上限（字节）
+
+# 计算器配置
+CALCULATOR_MAX_RESULT_DIGITS = 4000  # 阶乘精确结果的最大位数，超出后返回科学计数法近似值（不超过Python的4300位限制）
+
+# 批量执行配置（/batch 和 /plugins/<name>/batch）
+BATCH_MAX_ITEMS = 10000  # 单次批量请求的最大条目数
+BATCH_MAX_WORKERS = 8  # 单次批量请求的最大并行线程数
+
+# JSON Lines（NDJSON）文件处理配置
+JSON_NDJSON_WORKERS = 0  # 并行处理的进程数，0表示使用CPU核心数
+JSON_NDJSON_CHUNK_BYTES = 8 * 1024 * 1024  # 每个进程任务处理的字节数（按行边界对齐）
+JSON_NDJSON_MAX_ERRORS = 1000  # 结果中最多列出的无效记录数（无效记录总数始终完整统计）
+JSON_QUERY_MAX_INLINE = 1000  # 文件查询时直接在结果中返回的匹配数，全部匹配写入outputs目录
+JSON_PATCH_MAX_INLINE_OPS = 1000  # 文件比较时直接在结果中返回的补丁操作数，完整补丁写入outputs目录
+JSON_SCHEMA_MAX_ERRORS = 100  # schema_validate 每个文档最多报告的错误数
+
 # 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -18,8 +55,72 @@ LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 OLLAMA_BASE_URL = 'http://localhost:11434'  # Ollama服务地址
 OLLAMA_API_TIMEOUT = 300  # Ollama API请求超时时间（秒），建议300-600秒用于长文本翻译
 OLLAMA_MAX_SEGMENT_LENGTH = 1000  # 每段最大字符数（默认2000，减小可提高稳定性但增加请求次数）
+EBOOK_MAX_PARAGRAPH_LENGTH = 4000  # 提取文本时没有空行分隔的文本超过此字符数即按换行断开为段落，避免整本书拼成一个段落
 
 # DeepSeek配置
 DEEPSEEK_API_KEY = ''  # DeepSeek API密钥，留空则从环境变量DEEPSEEK_API_KEY读取
 DEEPSEEK_BASE_URL = 'https://api.deepseek.com/v1'  # DeepSeek API地址
 DEEPSEEK_API_TIMEOUT = 120  # DeepSeek API请求超时时间（秒）
+
+# 异步任务配置
+JOB_MAX_WORKERS = 4  # 同时执行的后台任务总数上限
+JOB_MAX_QUEUED = 100  # 排队任务数上限，超过后拒绝提交
+JOB_HISTORY_LIMIT = 200  # 保留的已结束任务数量
+# 每个插件的并发上限，未列出的插件只受JOB_MAX_WORKERS限制
+JOB_PLUGIN_CONCURRENCY = {
+    'EbookConverter': 2,
+    'VideoCompressor': 1
+}
+
+# 翻译并发配置
+# 每个翻译服务同时在途的请求数（本地Ollama通常受显卡限制，建议保持较小）；
+# 同一进程内的所有翻译任务共享该上限，失败或取消后仍在途的请求结束前也计入
+TRANSLATE_CONCURRENCY = {
+    'ollama': 1,
+    'deepseek': 8
+}
+# 每个翻译服务每秒最多发起的请求数，0表示不限制
+TRANSLATE_RATE_LIMIT = {
+    'ollama': 0,
+    'deepseek': 10
+}
+TRANSLATE_MAX_RETRIES = 2  # 单个段落的最大重试次数
+TRANSLATE_RETRY_BACKOFF = 2  # 重试退避基数（秒），第n次重试等待 backoff * 2^(n-1) 秒
+
+# 翻译记忆库配置
+TRANSLATION_MEMORY_PATH = 'cache/translation_memory.db'  # SQLite数据库路径
+TRANSLATION_MEMORY_MAX_BYTES = 512 * 1024 * 1024  # 记忆库大小上限，超出后淘汰最久未使用的条目
+TRANSLATION_CHECKPOINT_DIR = 'cache/checkpoints'  # 翻译断点目录，失败后可通过resume操作继续
+
+# PDF文本提取配置
+PDF_EXTRACT_WORKERS = 0  # 并行提取PDF文本的进程数，0表示使用CPU核心数
+PDF_EXTRACT_PAGES_PER_TASK = 16  # 每个进程任务提取的页数
+
+# 分块OCR配置（ocr_mode=chunked）
+OCR_LANGUAGE = 'chi_sim+eng'  # OCR识别语言
+OCR_CHUNK_PAGES = 20  # 每个分块的页数
+OCR_CHUNK_WORKERS = 2  # 同时处理的分块数
+OCR_PROCESS_BUDGET = 0  # 所有分块合计使用的OCR进程数上限，0表示使用CPU核心数
+OCR_CHUNK_TIMEOUT = 600  # 单个分块的超时时间（秒）
+OCR_WORK_DIR = 'cache/ocr'  # 分块中间结果目录，失败重试时复用
+
+# 视频分段并行压缩配置（mode=segmented）
+VIDEO_SEGMENT_SECONDS = 30  # 每段的目标时长（秒），实际在关键帧处切分
+VIDEO_SEGMENT_WORKERS = 0  # 同时编码的分段数，0表示线程预算的一半
+VIDEO_THREAD_BUDGET = 0  # 所有分段编码合计使用的线程数上限，0表示使用CPU核心数
+
+# 硬件与编码器能力探测配置
+CAPABILITY_TTL = 300  # ffmpeg编码器列表和显卡信息的缓存有效期（秒），到期后在后台刷新
+CAPABILITY_PROBE_AT_STARTUP = True  # 启动时在后台预先探测，避免首个请求等待
+
+# 分块上传配置（/uploads，支持断点续传）
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 建议的分块大小（字节），返回给客户端
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024 * 1024  # 单个文件大小上限（字节）
+UPLOAD_SESSION_TTL = 24 * 3600  # 未完成的上传会话保留时间（秒）
+
+# 文件存储配置（上传文件和视频压缩输出按内容哈希保存，相同内容只保存一份）
+BLOB_STORE_DIR = 'uploads/blobs'  # 存储目录（包含索引数据库）
+BLOB_GC_INTERVAL = 600  # 垃圾回收间隔（秒）
+BLOB_GC_MAX_AGE = 7 * 24 * 3600  # 超过该时间未被访问的文件被清理（秒）
+BLOB_GC_MAX_BYTES = 50 * 1024 * 1024 * 1024  # 存储总大小上限，超出时清理最久未访问的文件，0表示不限制
+BLOB_GC_GRACE = 3600  # 最近该时间内（秒）创建或访问过的文件不会被清理，避免删除正在被任务读取的文件
@@ -2,13 +2,18 @@
 前台HTTP API服务
 提供RESTful API接口
 """
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
+import json
 import logging
 import os
 import tempfile
+import time
 from typing import Dict, Any
 from backend.plugin_manager import PluginManager
+from backend.job_manager import JobManager
+from backend.upload_manager import UploadManager, UploadError
+from backend.blob_store import get_blob_store
 from werkzeug.utils import secure_filename
 
 
@@ -18,10 +23,12 @@ logger = logging.getLogger(__name__)
 class APIServer:
     """API服务器"""
     
-    def __init__(self, plugin_manager: PluginManager, host: str = '0.0.0.0', port: int = 8080):
+    def __init__(self, plugin_manager: PluginManager, host: str = '0.0.0.0', port: int = 8080,
+                 job_manager: JobManager = None):
         self.app = Flask(__name__)
         CORS(self.app)  # 允许跨域请求
         self.plugin_manager = plugin_manager
+        self.job_manager = job_manager or JobManager(plugin_manager)
         self.host = host
         self.port = port
         
@@ -39,6 +46,23 @@ class APIServer:
         self.app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024 * 1024  # 2GB 最大上传
         self.app.config['UPLOAD_FOLDER'] = self.upload_folder
         
+        # 上传文件和视频压缩输出保存在内容寻址存储中，相同内容只保存一份，同名文件不会互相覆盖
+        self.blob_store = get_blob_store()
+        
+        # 分块上传（断点续传），单个分块仍受MAX_CONTENT_LENGTH限制，文件总大小不受限
+        import config
+        self.upload_manager = UploadManager(
+            self.upload_folder,
+            self.blob_store,
+            max_size=getattr(config, 'UPLOAD_MAX_SIZE', 10 * 1024 * 1024 * 1024),
+            session_ttl=getattr(config, 'UPLOAD_SESSION_TTL', 24 * 3600)
+        )
+        self.upload_chunk_size = getattr(config, 'UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+        
+        # 批量执行限制
+        self.batch_max_items = getattr(config, 'BATCH_MAX_ITEMS', 10000)
+        self.batch_max_workers = getattr(config, 'BATCH_MAX_WORKERS', 8)
+        
         # 注册路由
         self._register_routes()
     
@@ -87,7 +111,19 @@ class APIServer:
                     "GET /plugins": "获取所有插件列表",
                     "GET /plugins/<name>": "获取指定插件信息",
                     "POST /plugins/<name>/execute": "执行指定插件",
-                    "POST /plugins/reload": "重新加载所有插件"
+                    "POST /plugins/reload": "重新加载所有插件",
+                    "POST /plugins/<name>/jobs": "提交异步任务（立即返回任务ID）",
+                    "GET /jobs": "获取任务列表",
+                    "GET /jobs/<id>": "获取任务状态和结果",
+                    "POST /jobs/<id>/cancel": "取消任务",
+                    "POST /upload": "上传文件（单次请求）",
+                    "POST /uploads": "创建分块上传会话（可断点续传）",
+                    "GET /uploads/<id>": "获取分块上传进度",
+                    "PUT /uploads/<id>?offset=N": "上传分块",
+                    "POST /uploads/<id>/finalize": "完成分块上传",
+                    "DELETE /uploads/<id>": "取消分块上传",
+                    "GET /video/progress/<task_id>": "获取视频压缩进度",
+                    "GET /video/progress/<task_id>/stream": "视频压缩进度事件流（SSE）"
                 }
             })
         
@@ -270,13 +306,13 @@ class APIServer:
             """执行指定插件"""
             try:
                 # 获取请求参数
-                params = request.get_json() if request.is_json else {}
+                params = self._with_original_filenames(request.get_json() if request.is_json else {})
                 
-                # 执行插件
-                result = self.plugin_manager.execute_plugin(plugin_name, params)
+                # 执行插件（插件声明可缓存的调用直接返回缓存结果）
+                result, cache_status = self.plugin_manager.execute_plugin_cached(plugin_name, params)
                 
                 status_code = 200 if result.get("success") else 400
-                return jsonify(result), status_code
+                return jsonify(result), status_code, {'X-Cache': cache_status}
                 
             except Exception as e:
                 logger.error(f"执行插件失败: {str(e)}")
@@ -285,6 +321,28 @@ class APIServer:
                     "message": str(e)
                 }), 500
         
+        @self.app.route('/plugins/<plugin_name>/batch', methods=['POST'])
+        def execute_plugin_batch(plugin_name: str):
+            """批量执行同一个插件，请求体为参数列表或 {"items": [参数, ...], "workers": n, "stream": bool}"""
+            if not self.plugin_manager.get_plugin(plugin_name):
+                return jsonify({
+                    "success": False,
+                    "message": f"插件不存在: {plugin_name}"
+                }), 404
+            
+            body = request.get_json(silent=True)
+            items = body if isinstance(body, list) else (body or {}).get("items")
+            if isinstance(items, list):
+                items = [{"plugin": plugin_name, "params": params} for params in items]
+            return self._batch_response(items, body)
+        
+        @self.app.route('/batch', methods=['POST'])
+        def execute_batch():
+            """批量执行多个插件，请求体为 [{"plugin": 插件名, "params": {...}}, ...] 或 {"items": [...], "workers": n, "stream": bool}"""
+            body = request.get_json(silent=True)
+            items = body if isinstance(body, list) else (body or {}).get("items")
+            return self._batch_response(items, body)
+        
         @self.app.route('/plugins/reload', methods=['POST'])
         def reload_plugins():
             """重新加载所有插件"""
@@ -302,6 +360,101 @@ class APIServer:
                     "message": str(e)
                 }), 500
         
+        @self.app.route('/cache/stats', methods=['GET'])
+        def cache_stats():
+            """获取插件结果缓存的统计信息"""
+            cache = self.plugin_manager.result_cache
+            return jsonify({
+                "success": True,
+                "data": {"enabled": cache is not None, **(cache.stats() if cache else {})}
+            })
+        
+        @self.app.route('/plugins/<plugin_name>/jobs', methods=['POST'])
+        def submit_job(plugin_name: str):
+            """提交异步任务"""
+            try:
+                params = self._with_original_filenames(request.get_json() if request.is_json else {})
+                
+                ok, job = self.job_manager.submit(plugin_name, params)
+                if not ok:
+                    status_code = 404 if not self.plugin_manager.get_plugin(plugin_name) else 400
+                    return jsonify({
+                        "success": False,
+                        "message": job
+                    }), status_code
+                
+                return jsonify({
+                    "success": True,
+                    "data": job.to_dict(include_result=False),
+                    "message": "任务已提交"
+                }), 202
+                
+            except Exception as e:
+                logger.error(f"提交任务失败: {str(e)}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), 500
+        
+        @self.app.route('/jobs', methods=['GET'])
+        def list_jobs():
+            """获取任务列表"""
+            try:
+                jobs = self.job_manager.list_jobs(
+                    status=request.args.get('status'),
+                    plugin_name=request.args.get('plugin')
+                )
+                return jsonify({
+                    "success": True,
+                    "data": jobs,
+                    "count": len(jobs),
+                    "stats": self.job_manager.stats()
+                })
+            except Exception as e:
+                logger.error(f"获取任务列表失败: {str(e)}")
+                return jsonify({
+                    "success": False,
+                    "message": str(e)
+                }), 500
+        
+        @self.app.route('/jobs/<job_id>', methods=['GET'])
+        def get_job(job_id: str):
+            """获取任务状态和结果"""
+            job = self.job_manager.get_job(job_id)
+            if not job:
+                return jsonify({
+                    "success": False,
+                    "message": f"任务不存在: {job_id}"
+                }), 404
+            
+            return jsonify({
+                "success": True,
+                "data": job.to_dict()
+            })
+        
+        @self.app.route('/jobs/<job_id>/cancel', methods=['POST'])
+        def cancel_job(job_id: str):
+            """取消任务"""
+            job = self.job_manager.get_job(job_id)
+            if not job:
+                return jsonify({
+                    "success": False,
+                    "message": f"任务不存在: {job_id}"
+                }), 404
+            
+            ok, message = self.job_manager.cancel(job_id)
+            if not ok:
+                return jsonify({
+                    "success": False,
+                    "message": message
+                }), 409
+            
+            return jsonify({
+                "success": True,
+                "data": job.to_dict(include_result=False),
+                "message": message
+            })
+        
         @self.app.route('/upload', methods=['POST'])
         def upload_file():
             """上传文件"""
@@ -319,16 +472,19 @@ class APIServer:
                         "error": "未选择文件"
                     }), 400
                 
-                # 保存文件
+                # 保存文件（先写入临时文件，完成后按内容哈希存入存储）
                 filename = secure_filename(file.filename)
-                filepath = os.path.join(self.upload_folder, filename)
-                file.save(filepath)
+                temp_path = self.blob_store.new_temp_path()
+                file.save(temp_path)
+                blob = self.blob_store.put_file(temp_path, filename, "uploads")
                 
                 return jsonify({
                     "success": True,
-                    "filepath": filepath,
+                    "filepath": blob["path"],
                     "filename": filename,
-                    "size": os.path.getsize(filepath)
+                    "size": blob["size"],
+                    "sha256": blob["hash"],
+                    "deduplicated": blob["deduplicated"]
                 })
             
             except Exception as e:
@@ -338,6 +494,81 @@ class APIServer:
                     "error": str(e)
                 }), 500
         
+        @self.app.route('/uploads', methods=['POST'])
+        def init_upload():
+            """创建分块上传会话"""
+            try:
+                data = request.get_json() or {}
+                info = self.upload_manager.init_upload(
+                    data.get('filename'), data.get('size'), data.get('sha256')
+                )
+                if info["complete"]:
+                    return jsonify({"success": True, **info}), 200
+                return jsonify({"success": True, "chunk_size": self.upload_chunk_size, **info}), 201
+            except UploadError as e:
+                return jsonify({"success": False, "error": str(e), **e.details}), e.status_code
+            except Exception as e:
+                logger.error(f"创建上传会话失败: {str(e)}")
+                return jsonify({
+                    "success": False,
+                    "error": str(e)
+                }), 500
+        
+        @self.app.route('/uploads/<upload_id>', methods=['GET'])
+        def get_upload_status(upload_id: str):
+            """获取上传进度（断点续传时从返回的offset继续）"""
+            try:
+                return jsonify({"success": True, **self.upload_manager.get_status(upload_id)})
+            except UploadError as e:
+                return jsonify({"success": False, "error": str(e), **e.details}), e.status_code
+        
+        @self.app.route('/uploads/<upload_id>', methods=['PUT'])
+        def upload_chunk(upload_id: str):
+            """上传一个分块：请求体为原始二进制数据，偏移量由查询参数offset或Upload-Offset请求头指定"""
+            try:
+                offset = request.args.get('offset', type=int)
+                if offset is None:
+                    offset = request.headers.get('Upload-Offset', type=int)
+                if offset is None:
+                    return jsonify({"success": False, "error": "缺少偏移量offset"}), 400
+                
+                # 直接读取请求流，不经过表单解析，数据不会先缓存到临时文件
+                info = self.upload_manager.write_chunk(
+                    upload_id, offset, request.stream, request.content_length
+                )
+                return jsonify({"success": True, **info})
+            except UploadError as e:
+                return jsonify({"success": False, "error": str(e), **e.details}), e.status_code
+            except Exception as e:
+                logger.error(f"分块上传失败: {str(e)}")
+                return jsonify({
+                    "success": False,
+                    "error": str(e)
+                }), 500
+        
+        @self.app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+        def finalize_upload(upload_id: str):
+            """完成分块上传"""
+            try:
+                return jsonify({"success": True, **self.upload_manager.finalize(upload_id)})
+            except UploadError as e:
+                return jsonify({"success": False, "error": str(e), **e.details}), e.status_code
+            except Exception as e:
+                logger.error(f"完成上传失败: {str(e)}")
+                return jsonify({
+                    "success": False,
+                    "error": str(e)
+                }), 500
+        
+        @self.app.route('/uploads/<upload_id>', methods=['DELETE'])
+        def abort_upload(upload_id: str):
+            """取消分块上传"""
+            try:
+                self.upload_manager.abort(upload_id)
+                return jsonify({"success": True, "message": "上传已取消"})
+            except UploadError as e:
+                return jsonify({"success": False, "error": str(e), **e.details}), e.status_code
+        
         @self.app.route('/video/info', methods=['POST'])
         def get_video_info():
             """获取视频信息"""
@@ -351,12 +582,12 @@ class APIServer:
                         "error": "文件不存在"
                     }), 400
                 
-                result = self.plugin_manager.execute_plugin('VideoCompressor', {
+                result, cache_status = self.plugin_manager.execute_plugin_cached('VideoCompressor', {
                     'action': 'get_info',
                     'input_file': filepath
                 })
                 
-                return jsonify(result)
+                return jsonify(result), 200, {'X-Cache': cache_status}
             
             except Exception as e:
                 logger.error(f"获取视频信息失败: {str(e)}")
@@ -379,8 +610,15 @@ class APIServer:
                         "error": "输入文件不存在"
                     }), 400
                 
-                # 构建输出文件路径
-                output_file = os.path.join(self.output_folder, output_filename)
+                output_filename = secure_filename(output_filename)
+                if not output_filename:
+                    return jsonify({
+                        "success": False,
+                        "error": "无效的输出文件名"
+                    }), 400
+                
+                # 输出到临时文件，完成后存入存储，避免并发压缩的同名输出互相覆盖
+                output_file = self.blob_store.new_temp_path(os.path.splitext(output_filename)[1])
                 
                 # 执行压缩
                 result = self.plugin_manager.execute_plugin('VideoCompressor', {
@@ -391,9 +629,20 @@ class APIServer:
                     'resolution': data.get('resolution', 'original'),
                     'bitrate': data.get('bitrate', '2M'),
                     'preset': data.get('preset', 'medium'),
-                    'crf': data.get('crf', 23)
+                    'crf': data.get('crf', 23),
+                    'mode': data.get('mode', 'single'),
+                    'segment_seconds': data.get('segment_seconds'),
+                    'workers': data.get('workers'),
+                    'task_id': data.get('task_id')
                 })
                 
+                if result.get("success"):
+                    blob = self.blob_store.put_file(output_file, output_filename, "outputs")
+                    result["result"]["output_file"] = blob["path"]
+                    result["result"]["output_filename"] = output_filename
+                elif os.path.exists(output_file):
+                    os.remove(output_file)
+                
                 return jsonify(result)
             
             except Exception as e:
@@ -403,11 +652,58 @@ class APIServer:
                     "error": str(e)
                 }), 500
         
+        @self.app.route('/video/progress/<task_id>', methods=['GET'])
+        def get_video_progress(task_id):
+            """获取视频压缩进度"""
+            result = self.plugin_manager.execute_plugin('VideoCompressor', {
+                'action': 'get_progress',
+                'task_id': task_id
+            })
+            return jsonify(result), (200 if result.get("success") else 404)
+        
+        @self.app.route('/video/progress/<task_id>/stream', methods=['GET'])
+        def stream_video_progress(task_id):
+            """以SSE事件流推送视频压缩进度，压缩结束后关闭"""
+            interval = min(max(request.args.get('interval', 1.0, type=float), 0.2), 10.0)
+            
+            def generate():
+                last_update = None
+                waited = 0.0
+                while True:
+                    result = self.plugin_manager.execute_plugin('VideoCompressor', {
+                        'action': 'get_progress',
+                        'task_id': task_id
+                    })
+                    if not result.get("success"):
+                        # 任务可能尚未开始，等待一段时间后放弃
+                        if waited >= 30:
+                            yield f"event: error\ndata: {json.dumps(result, ensure_ascii=False)}\n\n"
+                            return
+                        waited += interval
+                    else:
+                        progress = result["progress"]
+                        if progress.get("updated_at") != last_update:
+                            last_update = progress.get("updated_at")
+                            yield f"data: {json.dumps(progress, ensure_ascii=False)}\n\n"
+                        if progress.get("status") != "running":
+                            yield f"event: end\ndata: {json.dumps(progress, ensure_ascii=False)}\n\n"
+                            return
+                    time.sleep(interval)
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         @self.app.route('/download/<filename>', methods=['GET'])
         def download_file(filename):
             """下载文件"""
             try:
-                filepath = os.path.join(self.output_folder, secure_filename(filename))
+                # 优先查找存储中的输出文件，其次是插件直接写入输出目录的文件
+                filepath = self.blob_store.resolve(secure_filename(filename), "outputs")
+                if filepath is None:
+                    filepath = os.path.join(self.output_folder, secure_filename(filename))
                 if not os.path.exists(filepath):
                     return jsonify({
                         "success": False,
@@ -447,6 +743,86 @@ class APIServer:
                 "message": "服务器内部错误"
             }), 500
     
+    def _with_original_filenames(self, params):
+        """
+        上传的文件按内容哈希保存，插件生成输出文件名、按扩展名判断格式时需要上传时的文件名：
+        对每个 *_file 参数从文件存储中查出原始文件名，作为对应的 *_filename 参数传入（调用方已提供时不覆盖）
+        """
+        if not isinstance(params, dict):
+            return params
+        names = {}
+        for key, value in params.items():
+            if not key.endswith("_file") or not isinstance(value, str) or not value:
+                continue
+            name_key = key[:-len("_file")] + "_filename"
+            if params.get(name_key):
+                continue
+            name = self.blob_store.name_for_path(value)
+            if name:
+                names[name_key] = name
+        return {**params, **names} if names else params
+    
+    def _batch_response(self, items, body):
+        """
+        执行批量请求并返回响应
+
+        请求 stream 为true或 Accept 为 application/x-ndjson 时以NDJSON流式返回：
+        每行一个条目的结果（按输入顺序），最后一行为汇总 {"done": true, ...}
+        """
+        if not isinstance(items, list):
+            return jsonify({
+                "success": False,
+                "message": "请求体应为条目列表或包含 items 列表的对象"
+            }), 400
+        if len(items) > self.batch_max_items:
+            return jsonify({
+                "success": False,
+                "message": f"条目过多，单次最多 {self.batch_max_items} 条"
+            }), 413
+        
+        items = [{**item, "params": self._with_original_filenames(item.get("params"))}
+                 if isinstance(item, dict) else item for item in items]
+        options = body if isinstance(body, dict) else {}
+        try:
+            workers = int(options.get("workers", 1))
+        except (TypeError, ValueError):
+            workers = 1
+        workers = min(max(workers, 1), self.batch_max_workers)
+        stream = bool(options.get("stream")) or \
+            request.accept_mimetypes.best == 'application/x-ndjson'
+        
+        results = self.plugin_manager.execute_batch(items, workers)
+        
+        if stream:
+            def generate():
+                succeeded = 0
+                for entry in results:
+                    if entry["result"].get("success"):
+                        succeeded += 1
+                    yield json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+                yield json.dumps({
+                    "done": True,
+                    "count": len(items),
+                    "succeeded": succeeded,
+                    "failed": len(items) - succeeded
+                }) + "\n"
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        data = list(results)
+        succeeded = sum(1 for entry in data if entry["result"].get("success"))
+        return jsonify({
+            "success": True,
+            "data": data,
+            "count": len(data),
+            "succeeded": succeeded,
+            "failed": len(data) - succeeded
+        })
+    
     def run(self, debug: bool = False):
         """启动服务器"""
         logger.info(f"启动API服务器: http://{self.host}:{self.port}")
@@ -4,6 +4,11 @@
 import logging
 import sys
 from backend.plugin_manager import PluginManager
+from backend.job_manager import JobManager
+from backend.job_store import JobStore
+from backend.capabilities import get_capability_registry
+from backend.blob_store import get_blob_store
+from backend.result_cache import ResultCache
 from frontend.api_server import APIServer
 import config
 
@@ -16,34 +21,83 @@ def setup_logging():
     )
 
 
+def create_api_server() -> APIServer:
+    """创建插件管理器、任务管理器和API服务器
+    生产模式下由每个工作进程各调用一次，任务状态通过任务存储在进程间共享
+    """
+    logger = logging.getLogger(__name__)
+    
+    # 初始化插件管理器
+    logger.info("初始化插件管理器...")
+    result_cache = None
+    if getattr(config, 'RESULT_CACHE_ENABLED', True):
+        result_cache = ResultCache(
+            max_entries=getattr(config, 'RESULT_CACHE_MAX_ENTRIES', 1024),
+            max_bytes=getattr(config, 'RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+            spill_dir=getattr(config, 'RESULT_CACHE_SPILL_DIR', None) or None,
+            spill_max_bytes=getattr(config, 'RESULT_CACHE_SPILL_MAX_BYTES', 512 * 1024 * 1024)
+        )
+    plugin_manager = PluginManager(config.PLUGIN_DIR, result_cache)
+    
+    # 加载所有插件
+    plugin_manager.load_plugins()
+    
+    # 在后台探测ffmpeg编码器和显卡信息，之后按TTL定期刷新
+    if getattr(config, 'CAPABILITY_PROBE_AT_STARTUP', True):
+        get_capability_registry().start()
+    
+    # 定期清理文件存储中不再使用的上传和输出文件
+    get_blob_store().start_gc(
+        getattr(config, 'BLOB_GC_INTERVAL', 600),
+        max_age=getattr(config, 'BLOB_GC_MAX_AGE', 7 * 24 * 3600),
+        max_bytes=getattr(config, 'BLOB_GC_MAX_BYTES', 0),
+        grace=getattr(config, 'BLOB_GC_GRACE', 3600)
+    )
+    
+    # 初始化任务管理器
+    logger.info("初始化任务管理器...")
+    store = None
+    if getattr(config, 'SERVER_MODE', 'development') == 'production':
+        store = JobStore(getattr(config, 'JOB_STORE_PATH', 'cache/jobs.db'))
+    job_manager = JobManager(
+        plugin_manager,
+        max_workers=config.JOB_MAX_WORKERS,
+        max_queued=config.JOB_MAX_QUEUED,
+        plugin_limits=config.JOB_PLUGIN_CONCURRENCY,
+        history_limit=config.JOB_HISTORY_LIMIT,
+        store=store
+    )
+    
+    # 初始化API服务器
+    logger.info("初始化API服务器...")
+    return APIServer(plugin_manager, config.HOST, config.PORT, job_manager)
+
+
 def main():
     """主函数"""
     # 配置日志
     setup_logging()
     logger = logging.getLogger(__name__)
+    api_server = None
     
     try:
         logger.info("="*50)
         logger.info("MiniTools - 统一工具管理平台")
         logger.info("="*50)
         
-        # 初始化插件管理器
-        logger.info("初始化插件管理器...")
-        plugin_manager = PluginManager(config.PLUGIN_DIR)
-        
-        # 加载所有插件
-        plugin_manager.load_plugins()
-        
-        # 初始化API服务器
-        logger.info("初始化API服务器...")
-        api_server = APIServer(plugin_manager, config.HOST, config.PORT)
-        
         # 启动服务器
-        logger.info("="*50)
-        api_server.run(debug=False)
+        if getattr(config, 'SERVER_MODE', 'development') == 'production':
+            from backend.server import run_production
+            run_production(create_api_server, config.HOST, config.PORT)
+        else:
+            api_server = create_api_server()
+            logger.info("="*50)
+            api_server.run(debug=False)
         
     except KeyboardInterrupt:
         logger.info("\n正在关闭服务...")
+        if api_server:
+            api_server.job_manager.shutdown()
         sys.exit(0)
     except Exception as e:
         logger.error(f"启动失败: {str(e)}")
@@ -2,8 +2,386 @@
 示例插件 - 计算器工具
 """
 from backend.base_plugin import BasePlugin
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+import ast
 import math
+import re
+import sys
+from functools import lru_cache
+import config
+
+# 需要两个操作数的运算
+BINARY_OPERATIONS = {"add", "sub", "mul", "div", "pow"}
+# 只需要一个操作数的运算
+UNARY_OPERATIONS = {"sqrt", "square", "sin", "cos", "tan", "log", "ln", "abs", "factorial"}
+# float64能表示的最大阶乘参数（171!溢出）
+MAX_FLOAT_FACTORIAL = 170
+# 结果输出方式：auto(位数不超过上限时精确输出，否则科学计数法), exact(精确), scientific(科学计数法), digits(只返回位数)
+OUTPUT_MODES = ("auto", "exact", "scientific", "digits")
+# 精确结果的默认位数上限（Python默认禁止把超过4300位的整数转换为字符串）
+DEFAULT_MAX_RESULT_DIGITS = 4000
+_LN10 = math.log(10)
+
+# 列形式的数字输入（逗号、空白或换行分隔）
+_COLUMN_SEPARATOR = re.compile(r"[,\s;]+")
+
+# 表达式中可用的函数及参数个数（与单步运算一致，三角函数使用角度）
+EXPRESSION_FUNCTIONS = {
+    "sqrt": 1, "square": 1, "sin": 1, "cos": 1, "tan": 1,
+    "log": 1, "ln": 1, "abs": 1, "factorial": 1, "pow": 2
+}
+# 表达式中可用的常量
+EXPRESSION_CONSTANTS = {"pi": math.pi, "e": math.e}
+# 表达式运算符对应的内部函数
+_EXPRESSION_OPERATORS = {
+    ast.Add: "_add", ast.Sub: "_sub", ast.Mult: "_mul", ast.Div: "_div", ast.Pow: "_pow"
+}
+MAX_EXPRESSION_LENGTH = 2000
+EXPRESSION_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=1)
+def _factorial_table() -> tuple:
+    """0!到170!的精确值表，小参数的阶乘直接查表"""
+    table = [1]
+    for n in range(1, MAX_FLOAT_FACTORIAL + 1):
+        table.append(table[-1] * n)
+    return tuple(table)
+
+
+@lru_cache(maxsize=1)
+def _float_factorial_table() -> tuple:
+    """0!到170!的浮点数表，批量阶乘直接查表"""
+    return tuple(float(value) for value in _factorial_table())
+
+
+@lru_cache(maxsize=128)
+def _exact_factorial(n: int) -> int:
+    """精确阶乘（math.factorial 使用分治乘法），调用方负责限制n的大小"""
+    if n <= MAX_FLOAT_FACTORIAL:
+        return _factorial_table()[n]
+    return math.factorial(n)
+
+
+def _factorial_log10(n: int) -> float:
+    """log10(n!)，基于lgamma，任意大小的n都是常数时间"""
+    if n <= MAX_FLOAT_FACTORIAL:
+        return math.log10(_float_factorial_table()[n])
+    return math.lgamma(n + 1) / _LN10
+
+
+def _scientific(log10_value: float, negative: bool = False) -> Dict[str, Any]:
+    """
+    由以10为底的对数得到科学计数法表示
+
+    有效数字随数量级减少：log10值本身只有约15位精度，数量级越大尾数越不准确
+    """
+    exponent = math.floor(log10_value)
+    precision = 15 - len(str(abs(exponent)))
+    if precision < 2:
+        # 数量级本身已用尽浮点精度，尾数没有有效数字，只返回数量级
+        return {
+            "result": f"10^{log10_value:.15g}",
+            "mantissa": None,
+            "exponent": exponent,
+            "approximate": True
+        }
+    mantissa = round(10 ** (log10_value - exponent), precision - 1)
+    if mantissa >= 10:
+        mantissa, exponent = mantissa / 10, exponent + 1
+    if negative:
+        mantissa = -mantissa
+    return {
+        "result": f"{mantissa}e{exponent:+d}",
+        "mantissa": mantissa,
+        "exponent": exponent,
+        "approximate": True
+    }
+
+
+def _short_number(text: str, limit: int = 60) -> str:
+    """过长的数字只显示首尾"""
+    if len(text) <= limit:
+        return text
+    return f"{text[:25]}...{text[-10:]}（共{len(text)}位）"
+
+
+class _ExpressionCompiler(ast.NodeTransformer):
+    """校验表达式语法树并改写为内部函数调用
+
+    只允许数字、变量、常量、四则运算、幂运算和白名单函数，其他语法一律拒绝；
+    运算符改写为 _add/_div 等函数调用，使标量和批量计算可以共用同一份编译结果
+    """
+
+    def __init__(self):
+        self.variables: List[str] = []
+
+    def visit(self, node):
+        visitor = getattr(self, f"visit_{node.__class__.__name__}", None)
+        if visitor is None:
+            raise ValueError(f"表达式中不支持该语法: {node.__class__.__name__}")
+        return visitor(node)
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"表达式中不支持该常量: {node.value!r}")
+        try:
+            return ast.Constant(float(node.value))
+        except OverflowError:
+            raise ValueError(f"数字过大: {node.value}")
+
+    def visit_Name(self, node):
+        name = node.id
+        if name in EXPRESSION_CONSTANTS:
+            return ast.Constant(EXPRESSION_CONSTANTS[name])
+        if name in EXPRESSION_FUNCTIONS:
+            raise ValueError(f"函数 {name} 需要以调用形式使用，如 {name}(x)")
+        if name.startswith("_"):
+            raise ValueError(f"变量名不能以下划线开头: {name}")
+        if name not in self.variables:
+            self.variables.append(name)
+        return node
+
+    def visit_BinOp(self, node):
+        helper = _EXPRESSION_OPERATORS.get(type(node.op))
+        if helper is None:
+            raise ValueError(f"表达式中不支持该运算符: {node.op.__class__.__name__}")
+        return ast.Call(ast.Name(helper, ast.Load()), [self.visit(node.left), self.visit(node.right)], [])
+
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.UAdd):
+            return self.visit(node.operand)
+        if isinstance(node.op, ast.USub):
+            return ast.Call(ast.Name("_neg", ast.Load()), [self.visit(node.operand)], [])
+        raise ValueError(f"表达式中不支持该运算符: {node.op.__class__.__name__}")
+
+    def visit_Call(self, node):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in EXPRESSION_FUNCTIONS:
+            raise ValueError(f"不支持的函数: {name or ast.unparse(node.func)}")
+        if node.keywords or len(node.args) != EXPRESSION_FUNCTIONS[name]:
+            raise ValueError(f"函数 {name} 需要 {EXPRESSION_FUNCTIONS[name]} 个参数")
+        return ast.Call(ast.Name(name, ast.Load()), [self.visit(arg) for arg in node.args], [])
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compile_expression(text: str) -> Tuple[Any, Tuple[str, ...]]:
+    """
+    解析并编译表达式，按表达式文本缓存，重复使用的公式不再重新解析
+
+    Returns:
+        (编译后的代码对象, 表达式中的变量名)
+    """
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"表达式过长，最多 {MAX_EXPRESSION_LENGTH} 个字符")
+    try:
+        # ^ 表示幂运算，替换为 ** 以获得正确的优先级和右结合性
+        tree = ast.parse(text.strip().replace("^", "**"), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"表达式语法错误: {e.msg}")
+    except (RecursionError, MemoryError):
+        raise ValueError("表达式嵌套过深")
+
+    compiler = _ExpressionCompiler()
+    try:
+        tree = ast.fix_missing_locations(compiler.visit(tree))
+        code = compile(tree, "<expression>", "eval")
+    except RecursionError:
+        raise ValueError("表达式嵌套过深")
+    return code, tuple(compiler.variables)
+
+
+class _ScalarOps:
+    """标量运算，定义域错误抛出ValueError"""
+
+    @staticmethod
+    def add(a, b):
+        return a + b
+
+    @staticmethod
+    def sub(a, b):
+        return a - b
+
+    @staticmethod
+    def mul(a, b):
+        return a * b
+
+    @staticmethod
+    def div(a, b):
+        if b == 0:
+            raise ValueError("除数不能为0")
+        return a / b
+
+    @staticmethod
+    def pow(a, b):
+        if a < 0 and b != math.floor(b):
+            raise ValueError("负数的非整数次幂无实数结果")
+        if a == 0 and b < 0:
+            raise ValueError("0的负数次幂无定义")
+        return math.pow(a, b)
+
+    @staticmethod
+    def neg(a):
+        return -a
+
+    @staticmethod
+    def sqrt(a):
+        if a < 0:
+            raise ValueError("不能对负数开平方根")
+        return math.sqrt(a)
+
+    @staticmethod
+    def square(a):
+        return a * a
+
+    @staticmethod
+    def sin(a):
+        return math.sin(math.radians(a))
+
+    @staticmethod
+    def cos(a):
+        return math.cos(math.radians(a))
+
+    @staticmethod
+    def tan(a):
+        return math.tan(math.radians(a))
+
+    @staticmethod
+    def log(a):
+        if a <= 0:
+            raise ValueError("对数的真数必须大于0")
+        return math.log10(a)
+
+    @staticmethod
+    def ln(a):
+        if a <= 0:
+            raise ValueError("自然对数的真数必须大于0")
+        return math.log(a)
+
+    @staticmethod
+    def abs(a):
+        return abs(a)
+
+    @staticmethod
+    def factorial(a):
+        if a < 0 or a != math.floor(a):
+            raise ValueError("阶乘只能计算非负整数")
+        if a > MAX_FLOAT_FACTORIAL:
+            raise OverflowError
+        return _float_factorial_table()[int(a)]
+
+
+class _VectorOps:
+    """NumPy逐元素运算，定义域错误记录为掩码而不是抛出异常"""
+
+    def __init__(self, np):
+        self.np = np
+        # [(条件数组, 错误原因)]，按记录顺序，先记录的原因优先
+        self.marks: List[Tuple[Any, str]] = []
+
+    def mark(self, condition, reason: str):
+        if self.np.any(condition):
+            self.marks.append((condition, reason))
+
+    def add(self, a, b):
+        return self.np.add(a, b)
+
+    def sub(self, a, b):
+        return self.np.subtract(a, b)
+
+    def mul(self, a, b):
+        return self.np.multiply(a, b)
+
+    def div(self, a, b):
+        self.mark(self.np.equal(b, 0), "除数不能为0")
+        return self.np.divide(a, b)
+
+    def pow(self, a, b):
+        np = self.np
+        self.mark(np.less(a, 0) & np.not_equal(b, np.floor(b)), "负数的非整数次幂无实数结果")
+        self.mark(np.equal(a, 0) & np.less(b, 0), "0的负数次幂无定义")
+        return np.power(np.asarray(a, dtype=np.float64), b)
+
+    def neg(self, a):
+        return self.np.negative(a)
+
+    def sqrt(self, a):
+        self.mark(self.np.less(a, 0), "不能对负数开平方根")
+        return self.np.sqrt(a)
+
+    def square(self, a):
+        return self.np.multiply(a, a)
+
+    def sin(self, a):
+        return self.np.sin(self.np.radians(a))
+
+    def cos(self, a):
+        return self.np.cos(self.np.radians(a))
+
+    def tan(self, a):
+        return self.np.tan(self.np.radians(a))
+
+    def log(self, a):
+        self.mark(self.np.less_equal(a, 0), "对数的真数必须大于0")
+        return self.np.log10(a)
+
+    def ln(self, a):
+        self.mark(self.np.less_equal(a, 0), "自然对数的真数必须大于0")
+        return self.np.log(a)
+
+    def abs(self, a):
+        return self.np.abs(a)
+
+    def factorial(self, a):
+        np = self.np
+        a = np.asarray(a, dtype=np.float64)
+        bad = (a < 0) | (a != np.floor(a)) | ~np.isfinite(a)
+        self.mark(bad, "阶乘只能计算非负整数")
+        self.mark(~bad & (a > MAX_FLOAT_FACTORIAL), f"阶乘参数超过{MAX_FLOAT_FACTORIAL}，结果溢出")
+        indices = np.where(bad | (a > MAX_FLOAT_FACTORIAL), 0, a).astype(np.int64)
+        result = np.asarray(_float_factorial_table(), dtype=np.float64)[indices]
+        # 溢出的元素置为inf，后续运算中保持无效
+        return np.where(a > MAX_FLOAT_FACTORIAL, np.inf, result)
+
+    def finish(self, result, inputs: List[Any]) -> Tuple[Any, Any, Any]:
+        """
+        汇总错误掩码
+
+        Returns:
+            (结果数组, 无效元素掩码, 错误原因数组)
+        """
+        np = self.np
+        shape = np.broadcast_shapes(np.shape(result), *(np.shape(x) for x in inputs))
+        result = np.broadcast_to(np.asarray(result, dtype=np.float64), shape)
+        invalid = np.zeros(shape, dtype=bool)
+        reasons = np.full(shape, None, dtype=object)
+
+        inputs_finite = np.ones(shape, dtype=bool)
+        for x in inputs:
+            inputs_finite &= np.broadcast_to(np.isfinite(x), shape)
+        marks = self.marks + [
+            (~np.isfinite(result) & inputs_finite, "结果溢出"),
+            (~inputs_finite, "输入不是有限数字")
+        ]
+        for condition, reason in marks:
+            new = np.broadcast_to(condition, shape) & ~invalid
+            reasons[new] = reason
+            invalid |= new
+        return result, invalid, reasons
+
+
+def _expression_namespace(ops) -> Dict[str, Any]:
+    """表达式求值的命名空间（禁用内置函数）"""
+    namespace = {"__builtins__": {}}
+    for name in ("add", "sub", "mul", "div", "pow", "neg"):
+        namespace[f"_{name}"] = getattr(ops, name)
+    for name in EXPRESSION_FUNCTIONS:
+        namespace[name] = getattr(ops, name)
+    return namespace
 
 
 class CalculatorPlugin(BasePlugin):
@@ -12,7 +390,7 @@ class CalculatorPlugin(BasePlugin):
     def __init__(self):
         super().__init__()
         self.name = "Calculator"
-        self.version = "2.0.0"
+        self.version = "2.3.0"
         self.description = "提供基本数学计算和科学计算功能"
     
     def get_parameters(self) -> List[Dict[str, Any]]:
@@ -21,31 +399,62 @@ class CalculatorPlugin(BasePlugin):
             {
                 "name": "a",
                 "type": "float",
-                "required": True,
-                "description": "第一个数字"
+                "required": False,
+                "description": "第一个数字；也可以是数字数组或以逗号/换行分隔的一列数字，此时批量计算"
             },
             {
                 "name": "b",
                 "type": "float",
                 "required": False,
-                "description": "第二个数字（某些操作不需要）"
+                "description": "第二个数字（某些操作不需要）；也可以是数组，与a按广播规则逐元素计算"
             },
             {
                 "name": "operation",
                 "type": "string",
                 "required": True,
-                "description": "操作类型: add(加), sub(减), mul(乘), div(除), pow(幂), sqrt(平方根), square(平方), sin(正弦), cos(余弦), tan(正切), log(对数), ln(自然对数), abs(绝对值), factorial(阶乘)"
+                "description": "操作类型: add(加), sub(减), mul(乘), div(除), pow(幂), sqrt(平方根), square(平方), sin(正弦), cos(余弦), tan(正切), log(对数), ln(自然对数), abs(绝对值), factorial(阶乘), expression(表达式)"
+            },
+            {
+                "name": "output",
+                "type": "string",
+                "required": False,
+                "description": "阶乘和幂运算的结果输出方式: auto(默认，位数过多时改用科学计数法), exact(精确), scientific(科学计数法), digits(只返回位数)",
+                "default": "auto"
+            },
+            {
+                "name": "expression",
+                "type": "string",
+                "required": False,
+                "description": "表达式（仅用于expression），如 sqrt(a^2+b^2)*sin(c)，支持 + - * / ^ 和上述函数，常量 pi、e"
+            },
+            {
+                "name": "variables",
+                "type": "object",
+                "required": False,
+                "description": "表达式变量（仅用于expression）：{\"c\": 30} 或数组值 {\"c\": [0, 30, 60]}，"
+                               "也可以是变量组列表 [{\"a\": 3, \"b\": 4}, ...] 批量求值；参数a、b也可直接在表达式中使用"
             }
         ]
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """计算结果只由参数决定，全部可缓存"""
+        return {}
+    
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行计算"""
         if params is None:
             params = {}
         
+        if params.get("operation", "").lower() == "expression":
+            return self._execute_expression(params)
+        
+        a_param = params.get("a", 0)
+        b_param = params.get("b")
+        if self._is_vector(a_param) or self._is_vector(b_param):
+            return self._execute_vectorized(a_param, b_param, params.get("operation", "").lower())
+        
         try:
-            a = float(params.get("a", 0))
-            b_param = params.get("b")
+            a = float(a_param)
             b = float(b_param) if b_param is not None else None
             operation = params.get("operation", "").lower()
             
@@ -80,8 +489,7 @@ class CalculatorPlugin(BasePlugin):
             elif operation == "pow":
                 if b is None:
                     return self._error("幂运算需要两个数字")
-                result = math.pow(a, b)
-                expression = f"{a}^{b} = {result}"
+                return self._pow(a, b, params.get("output", "auto"))
             
             # 科学运算 - 单个数
             elif operation == "sqrt":
@@ -123,10 +531,9 @@ class CalculatorPlugin(BasePlugin):
                 expression = f"|{a}| = {result}"
                 
             elif operation == "factorial":
-                if a < 0 or a != int(a):
+                if not math.isfinite(a) or a < 0 or a != int(a):
                     return self._error("阶乘只能计算非负整数")
-                result = math.factorial(int(a))
-                expression = f"{int(a)}! = {result}"
+                return self._factorial(int(a), params.get("output", "auto"))
             
             else:
                 return self._error(f"不支持的操作: {operation}")
@@ -145,6 +552,242 @@ class CalculatorPlugin(BasePlugin):
         except Exception as e:
             return self._error(f"计算失败: {str(e)}")
     
+    @staticmethod
+    def _max_result_digits() -> int:
+        """精确结果的位数上限，不超过Python整数转字符串的限制"""
+        limit = getattr(config, 'CALCULATOR_MAX_RESULT_DIGITS', DEFAULT_MAX_RESULT_DIGITS)
+        str_limit = sys.get_int_max_str_digits() if hasattr(sys, "get_int_max_str_digits") else 0
+        return min(limit, str_limit) if str_limit else limit
+    
+    def _factorial(self, n: int, output: str) -> Dict[str, Any]:
+        """
+        阶乘：先用lgamma估算位数（常数时间），位数在上限内才精确计算，
+        否则返回科学计数法近似值，任意大的参数都能立即返回
+        """
+        output = (output or "auto").lower()
+        if output not in OUTPUT_MODES:
+            return self._error(f"不支持的输出方式: {output}")
+        
+        try:
+            log10_value = _factorial_log10(n)
+        except OverflowError:
+            return self._error("阶乘参数过大")
+        digits = math.floor(log10_value) + 1
+        max_digits = self._max_result_digits()
+        
+        if output == "digits":
+            data = {"result": digits, "digits": digits, "expression": f"{n}! 共 {digits} 位"}
+        elif output == "exact" or (output == "auto" and digits <= max_digits):
+            if digits > max_digits:
+                return self._error(
+                    f"{n}! 有 {digits} 位，超过精确结果上限 {max_digits} 位，请使用 scientific 或 digits 输出"
+                )
+            result = _exact_factorial(n)
+            data = {
+                "result": result,
+                "digits": digits,
+                "expression": f"{n}! = {_short_number(str(result))}"
+            }
+        else:
+            data = _scientific(log10_value)
+            data["digits"] = digits
+            data["expression"] = f"{_short_number(str(n))}! ≈ {self._format_scientific(data)}"
+        
+        return {"success": True, "data": data, "message": "计算成功"}
+    
+    def _pow(self, a: float, b: float, output: str) -> Dict[str, Any]:
+        """幂运算：浮点数溢出时改为通过对数计算科学计数法结果，而不是直接失败"""
+        output = (output or "auto").lower()
+        if output not in OUTPUT_MODES:
+            return self._error(f"不支持的输出方式: {output}")
+        if a < 0 and b != math.floor(b):
+            return self._error("负数的非整数次幂无实数结果")
+        if a == 0 and b < 0:
+            return self._error("0的负数次幂无定义")
+        
+        try:
+            result = math.pow(a, b)
+        except OverflowError:
+            if output == "exact":
+                return self._error("结果超出浮点数范围，请使用 scientific 或 digits 输出")
+            result = None
+        
+        if result is not None and output in ("auto", "exact"):
+            return {
+                "success": True,
+                "data": {"result": result, "expression": f"{a}^{b} = {result}"},
+                "message": "计算成功"
+            }
+        
+        if a == 0:
+            data = {"result": "0.0e+0", "mantissa": 0.0, "exponent": 0, "approximate": False}
+        else:
+            log10_value = b * math.log10(abs(a))
+            if not math.isfinite(log10_value):
+                # 数量级本身也超出浮点数范围（如 1e308^1e308），科学计数法同样无法表示
+                return self._error("结果的数量级超出浮点数范围，无法计算")
+            negative = a < 0 and b % 2 == 1
+            data = _scientific(log10_value, negative)
+        data["digits"] = max(data["exponent"], 0) + 1
+        if output == "digits":
+            data = {"result": data["digits"], "digits": data["digits"],
+                    "expression": f"{a}^{b} 的整数部分共 {data['digits']} 位"}
+        else:
+            data["expression"] = f"{a}^{b} ≈ {self._format_scientific(data)}"
+        return {"success": True, "data": data, "message": "计算成功"}
+    
+    @staticmethod
+    def _format_scientific(data: Dict[str, Any]) -> str:
+        """科学计数法结果的显示文本"""
+        if data["mantissa"] is None:
+            return data["result"]
+        return f"{data['mantissa']} × 10^{data['exponent']}"
+    
+    @staticmethod
+    def _is_vector(value: Any) -> bool:
+        """参数是否为数组输入（列表，或包含分隔符的一列数字）"""
+        if isinstance(value, (list, tuple)):
+            return True
+        return isinstance(value, str) and _COLUMN_SEPARATOR.search(value.strip()) is not None
+    
+    @staticmethod
+    def _parse_vector(value: Any) -> Any:
+        """把一列数字的文本拆分为列表，其他输入原样返回"""
+        if isinstance(value, str):
+            return [item for item in _COLUMN_SEPARATOR.split(value.strip()) if item]
+        return value
+    
+    def _execute_vectorized(self, a_param: Any, b_param: Any, operation: str) -> Dict[str, Any]:
+        """
+        批量计算：a、b按NumPy广播规则逐元素计算
+        定义域错误（负数开方、对数真数≤0、除数为0、阶乘参数非法、结果溢出）只标记对应元素，
+        不影响其他元素；出错元素的结果为None
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return self._error("批量计算需要numpy，请先安装: pip install numpy")
+        
+        if operation not in BINARY_OPERATIONS and operation not in UNARY_OPERATIONS:
+            return self._error(f"不支持的操作: {operation}")
+        if operation in BINARY_OPERATIONS and b_param is None:
+            return self._error("该运算需要两个数字")
+        
+        try:
+            inputs = [np.asarray(self._parse_vector(a_param), dtype=np.float64)]
+            if operation in BINARY_OPERATIONS:
+                inputs.append(np.asarray(self._parse_vector(b_param), dtype=np.float64))
+        except (TypeError, ValueError) as e:
+            return self._error(f"参数格式错误: {str(e)}")
+        
+        try:
+            np.broadcast_shapes(*(x.shape for x in inputs))
+        except ValueError:
+            return self._error(f"a与b的形状不兼容: {inputs[0].shape} 和 {inputs[1].shape}")
+        
+        ops = _VectorOps(np)
+        with np.errstate(all="ignore"):
+            result = getattr(ops, operation)(*inputs)
+            return self._vector_result(ops, result, inputs, operation)
+    
+    def _execute_expression(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        表达式求值：表达式编译后按文本缓存；变量为数组或变量组列表时用NumPy批量求值，
+        逐元素的定义域错误与批量计算一样以掩码返回
+        """
+        text = params.get("expression")
+        if not isinstance(text, str) or not text.strip():
+            return self._error("expression操作需要提供表达式")
+        
+        try:
+            code, names = compile_expression(text.strip())
+        except ValueError as e:
+            return self._error(str(e))
+        
+        variables = params.get("variables")
+        if isinstance(variables, list):
+            # 变量组列表转换为按变量的列，缺少的值按无效输入处理
+            if not all(isinstance(row, dict) for row in variables):
+                return self._error("variables 列表中的每一项都应为变量对象")
+            bindings = {name: [row.get(name) for row in variables] for name in names}
+            vectorized = True
+        elif variables is None or isinstance(variables, dict):
+            bindings = {name: params[name] for name in ("a", "b") if params.get(name) is not None}
+            bindings.update(variables or {})
+            vectorized = any(self._is_vector(value) for value in bindings.values())
+        else:
+            return self._error("variables 应为对象或对象列表")
+        
+        missing = [name for name in names if name not in bindings]
+        if missing:
+            return self._error(f"缺少变量: {', '.join(missing)}")
+        
+        if not vectorized:
+            try:
+                values = {name: float(bindings[name]) for name in names}
+            except (TypeError, ValueError) as e:
+                return self._error(f"参数格式错误: {str(e)}")
+            try:
+                result = eval(code, _expression_namespace(_ScalarOps), values)
+            except OverflowError:
+                return self._error("计算结果溢出")
+            except (ValueError, ZeroDivisionError) as e:
+                return self._error(str(e))
+            if not math.isfinite(result):
+                return self._error("计算结果溢出")
+            return {
+                "success": True,
+                "data": {
+                    "result": result,
+                    "expression": f"{text.strip()} = {result}"
+                },
+                "message": "计算成功"
+            }
+        
+        try:
+            import numpy as np
+        except ImportError:
+            return self._error("批量计算需要numpy，请先安装: pip install numpy")
+        
+        try:
+            values = {name: np.asarray(self._parse_vector(bindings[name]), dtype=np.float64) for name in names}
+        except (TypeError, ValueError) as e:
+            return self._error(f"参数格式错误: {str(e)}")
+        try:
+            np.broadcast_shapes(*(x.shape for x in values.values()))
+        except ValueError:
+            shapes = ", ".join(f"{name}{tuple(x.shape)}" for name, x in values.items())
+            return self._error(f"变量的形状不兼容: {shapes}")
+        
+        ops = _VectorOps(np)
+        with np.errstate(all="ignore"):
+            result = eval(code, _expression_namespace(ops), values)
+            return self._vector_result(ops, result, list(values.values()), "expression")
+    
+    @staticmethod
+    def _vector_result(ops: "_VectorOps", result: Any, inputs: List[Any], operation: str) -> Dict[str, Any]:
+        """批量计算结果：出错元素的结果为None，valid为逐元素掩码，errors列出出错位置和原因"""
+        np = ops.np
+        result, invalid, reasons = ops.finish(result, inputs)
+        values = np.where(invalid, None, result.astype(object))
+        errors = [
+            {"index": index[0] if len(index) == 1 else list(index), "message": reasons[index]}
+            for index in map(tuple, np.argwhere(invalid).tolist())
+        ]
+        
+        return {
+            "success": True,
+            "data": {
+                "operation": operation,
+                "shape": list(result.shape),
+                "result": values.tolist(),
+                "valid": (~invalid).tolist(),
+                "errors": errors,
+                "error_count": len(errors)
+            },
+            "message": f"计算成功（{len(errors)} 个元素出错）" if errors else "计算成功"
+        }
+    
     def _error(self, message: str) -> Dict[str, Any]:
         """返回错误信息"""
         return {
@@ -4,18 +4,234 @@
 功能：格式转换、OCR识别、AI翻译
 """
 from backend.base_plugin import BasePlugin
-from typing import Dict, Any, List
+from backend.job_manager import get_current_job
+from backend.translation_memory import get_translation_memory
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
 import os
 import subprocess
 import json
+import hashlib
+import shutil
+import uuid
+import multiprocessing
+import threading
+import time
+import logging
 import requests
 from pathlib import Path
 import config
 
 
+logger = logging.getLogger(__name__)
+
+
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """在子进程中提取PDF第start到end-1页的文本（模块级函数，供进程池调用）"""
+    import PyPDF2
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [(pdf_reader.pages[i].extract_text() or "") + "\n" for i in range(start, end)]
+
+
+class _TranslationError(Exception):
+    """单个段落翻译失败，retryable表示是否值得重试（超时、限流、服务端错误）"""
+    
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class _RateLimiter:
+    """线程安全的请求限速器，保证每秒发起的请求数不超过rate（rate<=0表示不限速）"""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """等待直到允许发起下一个请求"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class _ConcurrencyLimiter:
+    """线程安全的在途请求数限制，上限在每次获取时传入"""
+    
+    def __init__(self):
+        self.in_use = 0
+        self._cond = threading.Condition()
+    
+    def acquire(self, limit: int, stop_event: threading.Event = None) -> bool:
+        """等待直到在途请求数小于limit；等待期间stop_event被设置时放弃并返回False"""
+        with self._cond:
+            while self.in_use >= limit:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._cond.wait(0.5)
+            self.in_use += 1
+            return True
+    
+    def release(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify_all()
+
+
+# 每个翻译服务共享的 (并发限制, 限速器)：失败或取消后被放弃的在途请求结束前仍占用名额，
+# 立即从断点恢复的新任务与它们合计也不会超出服务的并发上限
+_provider_limiters: Dict[str, tuple] = {}
+_provider_limiters_lock = threading.Lock()
+
+
+def _get_provider_limiters(provider: str, rate: float) -> tuple:
+    """获取翻译服务共享的 (_ConcurrencyLimiter, _RateLimiter)，限速配置变化时重建限速器"""
+    with _provider_limiters_lock:
+        slots, limiter = _provider_limiters.get(provider, (None, None))
+        if slots is None:
+            slots = _ConcurrencyLimiter()
+        if limiter is None or limiter.rate != rate:
+            limiter = _RateLimiter(rate)
+        _provider_limiters[provider] = (slots, limiter)
+        return slots, limiter
+
+
+class _TranslationCheckpoint:
+    """翻译断点：把已完成的段落译文增量追加到磁盘，失败或服务重启后可从断点继续
+
+    每个输入文件对应两个文件：
+        <key>.json  - 元数据（翻译参数、源文件签名、进度）
+        <key>.jsonl - 已完成的段落，每行 {"i": 段落序号, "h": 原文哈希, "t": 译文}
+    """
+    
+    def __init__(self, checkpoint_dir: str, input_file: str):
+        self.input_file = os.path.abspath(input_file)
+        key = hashlib.sha256(self.input_file.encode("utf-8")).hexdigest()[:24]
+        self.meta_path = os.path.join(checkpoint_dir, f"{key}.json")
+        self.data_path = os.path.join(checkpoint_dir, f"{key}.jsonl")
+        self.meta: Dict[str, Any] = {}
+        self.completed: Dict[int, tuple] = {}  # {segment_index: (segment_hash, translation)}
+        self._data_file = None
+        self._lock = threading.Lock()
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    
+    @staticmethod
+    def segment_hash(segment: str) -> str:
+        """原文哈希，恢复时用于确认段落没有错位"""
+        return hashlib.sha1(segment.encode("utf-8")).hexdigest()[:16]
+    
+    def file_signature(self) -> Dict[str, Any]:
+        """源文件签名（大小和修改时间）"""
+        stat = os.stat(self.input_file)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+    
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path)
+    
+    def start(self, settings: Dict[str, Any]):
+        """开始新的翻译，丢弃旧断点"""
+        self.remove()
+        self.meta = {
+            "input_file": self.input_file,
+            "file_name": os.path.basename(self.input_file),
+            "signature": self.file_signature(),
+            "settings": settings,
+            "current": 0,
+            "total": 0,
+            "status": "translating",
+            "updated_at": time.time()
+        }
+        self._write_meta()
+    
+    def load(self) -> tuple:
+        """加载已有断点
+        返回: (success, error_message)
+        """
+        if not self.exists():
+            return (False, "未找到可恢复的翻译断点，请使用translate重新开始翻译")
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get("signature") != self.file_signature():
+            return (False, "源文件在上次翻译后已被修改，无法从断点恢复，请使用translate重新开始翻译")
+        
+        self.completed = {}
+        if os.path.exists(self.data_path):
+            with open(self.data_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self.completed[record["i"]] = (record["h"], record["t"])
+                    except (ValueError, KeyError):
+                        # 进程中断时最后一行可能只写了一半
+                        continue
+        return (True, "")
+    
+    def get(self, index: int, segment: str):
+        """获取断点中已完成的译文，原文不一致时返回None"""
+        entry = self.completed.get(index)
+        if entry and entry[0] == self.segment_hash(segment):
+            return entry[1]
+        return None
+    
+    def record(self, index: int, segment: str, translation: str):
+        """追加一个已完成的段落"""
+        with self._lock:
+            if self._data_file is None:
+                self._data_file = open(self.data_path, 'a', encoding='utf-8')
+            self._data_file.write(json.dumps(
+                {"i": index, "h": self.segment_hash(segment), "t": translation},
+                ensure_ascii=False
+            ) + "\n")
+            self._data_file.flush()
+    
+    def update(self, **fields):
+        """更新元数据（进度、状态）"""
+        with self._lock:
+            self.meta.update(fields)
+            self.meta["updated_at"] = time.time()
+            self._write_meta()
+    
+    def close(self):
+        with self._lock:
+            if self._data_file is not None:
+                self._data_file.close()
+                self._data_file = None
+    
+    def remove(self):
+        """删除断点"""
+        self.close()
+        for path in (self.meta_path, self.data_path):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _write_meta(self):
+        # 先写临时文件再替换，避免中断时留下损坏的元数据
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False)
+        os.replace(temp_path, self.meta_path)
+
+
 class EbookConverterPlugin(BasePlugin):
     """电子书转换与翻译工具插件"""
     
+    # 目标语言代码与提示词中使用的语言名称
+    LANGUAGE_NAMES = {
+        "zh-CN": "简体中文",
+        "en": "English",
+        "ja": "日本語",
+        "ko": "한국어"
+    }
+    
     def __init__(self):
         super().__init__()
         self.name = "EbookConverter"
@@ -28,8 +244,8 @@ class EbookConverterPlugin(BasePlugin):
         # 翻译进度跟踪 {file_name: {current: int, total: int, status: str}}
         self.translation_progress = {}
         
-        # 翻译进度跟踪 {file_path: {current: int, total: int, status: str}}
-        self.translation_progress = {}
+        # 分块OCR进度跟踪 {file_name: {completed_chunks: int, total_chunks: int, status: str, chunks: [...]}}
+        self.ocr_progress = {}
     
     def get_parameters(self) -> List[Dict[str, Any]]:
         """定义插件参数"""
@@ -38,7 +254,7 @@ class EbookConverterPlugin(BasePlugin):
                 "name": "action",
                 "type": "string",
                 "required": True,
-                "description": "操作类型: check_dependencies(检查依赖), convert(格式转换), ocr(OCR识别), translate(翻译), info(获取信息)"
+                "description": "操作类型: check_dependencies(检查依赖), convert(格式转换), ocr(OCR识别), translate(翻译), resume(从断点继续翻译), get_progress(翻译进度), info(获取信息)"
             },
             {
                 "name": "input_file",
@@ -46,6 +262,12 @@ class EbookConverterPlugin(BasePlugin):
                 "required": False,
                 "description": "输入文件路径"
             },
+            {
+                "name": "input_filename",
+                "type": "string",
+                "required": False,
+                "description": "输入文件的原始文件名，用于生成输出文件名（通过API调用时由服务端根据上传记录自动填写）"
+            },
             {
                 "name": "output_format",
                 "type": "string",
@@ -64,6 +286,24 @@ class EbookConverterPlugin(BasePlugin):
                 "required": False,
                 "description": "是否使用OCR识别(针对扫描版PDF)"
             },
+            {
+                "name": "ocr_mode",
+                "type": "string",
+                "required": False,
+                "description": "OCR模式: full(整本一次处理，默认), chunked(按页分块并行处理，跳过已有文字层的页面，失败重试时复用已完成的分块)"
+            },
+            {
+                "name": "ocr_chunk_pages",
+                "type": "int",
+                "required": False,
+                "description": "分块OCR时每块的页数，默认使用config.py中OCR_CHUNK_PAGES的配置"
+            },
+            {
+                "name": "ocr_workers",
+                "type": "int",
+                "required": False,
+                "description": "分块OCR时同时处理的分块数，默认使用config.py中OCR_CHUNK_WORKERS的配置"
+            },
             {
                 "name": "translate_provider",
                 "type": "string",
@@ -87,9 +327,27 @@ class EbookConverterPlugin(BasePlugin):
                 "type": "boolean",
                 "required": False,
                 "description": "是否生成双语对照版本"
+            },
+            {
+                "name": "concurrency",
+                "type": "int",
+                "required": False,
+                "description": "翻译时同时在途的请求数，默认使用config.py中TRANSLATE_CONCURRENCY的配置"
+            },
+            {
+                "name": "use_translation_memory",
+                "type": "boolean",
+                "required": False,
+                "description": "是否使用翻译记忆库复用已翻译过的段落，默认true"
             }
         ]
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """文件信息查询只依赖文件内容，文件变化后缓存自动失效；其他操作不缓存"""
+        if str(params.get("action", "")).lower() == "info":
+            return {"file_params": ["input_file"]}
+        return None
+    
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行插件功能"""
         if params is None:
@@ -105,6 +363,8 @@ class EbookConverterPlugin(BasePlugin):
             return self._ocr_process(params)
         elif action == "translate":
             return self._translate_ebook(params)
+        elif action == "resume":
+            return self._translate_ebook(params, resume=True)
         elif action == "get_progress":
             return self._get_translation_progress(params)
         elif action == "info":
@@ -182,8 +442,7 @@ class EbookConverterPlugin(BasePlugin):
         
         # 生成输出文件名（使用原文件名）
         if not output_file:
-            input_path = Path(input_file)
-            output_file = f"{input_path.stem}.{output_format}"
+            output_file = f"{self._input_stem(params)}.{output_format}"
         
         output_path = os.path.join("outputs", output_file)
         os.makedirs("outputs", exist_ok=True)
@@ -234,6 +493,9 @@ class EbookConverterPlugin(BasePlugin):
     
     def _ocr_process(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """OCR处理扫描版PDF"""
+        if params.get("ocr_mode", "full") == "chunked":
+            return self._ocr_chunked(params)
+        
         input_file = params.get("input_file")
         output_format = params.get("output_format", "pdf")
         output_file = params.get("output_file")
@@ -244,8 +506,7 @@ class EbookConverterPlugin(BasePlugin):
         try:
             # 使用OCRmyPDF进行OCR处理
             if not output_file:
-                input_path = Path(input_file)
-                output_file = f"{input_path.stem}_ocr.pdf"
+                output_file = f"{self._input_stem(params)}_ocr.pdf"
             
             output_path = os.path.join("outputs", output_file)
             os.makedirs("outputs", exist_ok=True)
@@ -268,20 +529,7 @@ class EbookConverterPlugin(BasePlugin):
             )
             
             if result.returncode == 0:
-                # 如果需要转换为其他格式
-                if output_format != "pdf":
-                    return self._convert_format({
-                        "input_file": output_path,
-                        "output_format": output_format,
-                        "output_file": output_file.replace(".pdf", f".{output_format}")
-                    })
-                
-                return {
-                    "success": True,
-                    "output_file": output_file,
-                    "output_path": output_path,
-                    "message": "OCR处理成功"
-                }
+                return self._ocr_result(output_file, output_path, output_format)
             else:
                 return {
                     "success": False,
@@ -298,6 +546,218 @@ class EbookConverterPlugin(BasePlugin):
                 "error": f"OCR处理失败: {str(e)}"
             }
     
+    def _input_stem(self, params: Dict[str, Any]) -> str:
+        """输入文件的原始文件名（不含扩展名），用于生成输出文件名
+        上传的文件按内容哈希保存，上传时的文件名由API层以 input_filename 传入
+        """
+        return Path(params.get("input_filename") or params.get("input_file")).stem
+
+    def _ocr_result(self, output_file: str, output_path: str, output_format: str, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+        """OCR完成后按需转换输出格式并返回结果"""
+        # 如果需要转换为其他格式
+        if output_format != "pdf":
+            return self._convert_format({
+                "input_file": output_path,
+                "output_format": output_format,
+                "output_file": output_file.replace(".pdf", f".{output_format}")
+            })
+        
+        result = {
+            "success": True,
+            "output_file": output_file,
+            "output_path": output_path,
+            "message": "OCR处理成功"
+        }
+        if extra:
+            result.update(extra)
+        return result
+    
+    def _ocr_chunked(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """分块并行OCR
+        把PDF按页切分为若干分块，用有限的进程预算并发运行ocrmypdf，最后按页序拼接为一个PDF。
+        分块结果保存在以文件内容哈希命名的工作目录中，失败后重试会跳过已完成的分块；
+        已有文字层的页面不再识别（整块都有文字层时直接复制）
+        """
+        input_file = params.get("input_file")
+        output_format = params.get("output_format", "pdf")
+        output_file = params.get("output_file")
+        
+        if not input_file or not os.path.exists(input_file):
+            return {"success": False, "error": "输入文件不存在"}
+        
+        try:
+            import PyPDF2
+        except ImportError:
+            return {"success": False, "error": "分块OCR需要PyPDF2，请先安装: pip install PyPDF2"}
+        
+        chunk_pages = max(1, int(params.get("ocr_chunk_pages") or getattr(config, 'OCR_CHUNK_PAGES', 20)))
+        workers = max(1, int(params.get("ocr_workers") or getattr(config, 'OCR_CHUNK_WORKERS', 2)))
+        # 总进程预算平均分配给并发的分块，每个ocrmypdf最多使用jobs个进程
+        budget = getattr(config, 'OCR_PROCESS_BUDGET', 0) or os.cpu_count() or 1
+        jobs_per_chunk = max(1, budget // workers)
+        chunk_timeout = getattr(config, 'OCR_CHUNK_TIMEOUT', 600)
+        language = getattr(config, 'OCR_LANGUAGE', 'chi_sim+eng')
+        
+        if not output_file:
+            output_file = f"{self._input_stem(params)}_ocr.pdf"
+        output_path = os.path.join("outputs", output_file)
+        os.makedirs("outputs", exist_ok=True)
+        
+        # 工作目录以文件内容哈希命名，同一文件重试时复用已完成的分块
+        file_hash = hashlib.sha256()
+        with open(input_file, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                file_hash.update(block)
+        work_dir = os.path.join(
+            getattr(config, 'OCR_WORK_DIR', 'cache/ocr'),
+            f"{file_hash.hexdigest()[:24]}_{chunk_pages}"
+        )
+        os.makedirs(work_dir, exist_ok=True)
+        
+        with open(input_file, 'rb') as f:
+            page_count = len(PyPDF2.PdfReader(f).pages)
+        
+        chunks = []
+        for start in range(0, page_count, chunk_pages):
+            end = min(start + chunk_pages, page_count)
+            chunk_path = os.path.join(work_dir, f"chunk_{start:06d}_{end:06d}.pdf")
+            chunks.append({
+                "pages": f"{start + 1}-{end}",
+                "start": start,
+                "end": end,
+                "path": chunk_path,
+                "status": "done" if os.path.exists(chunk_path) else "pending",
+                "reused": os.path.exists(chunk_path)
+            })
+        
+        file_name = os.path.basename(input_file)
+        progress = {
+            "status": "running",
+            "total_chunks": len(chunks),
+            "completed_chunks": sum(1 for c in chunks if c["status"] == "done"),
+            "chunks": [{k: c[k] for k in ("pages", "status", "reused")} for c in chunks]
+        }
+        self.ocr_progress[file_name] = progress
+        job = get_current_job()
+        lock = threading.Lock()
+        
+        def set_chunk_status(index: int, status: str):
+            with lock:
+                chunks[index]["status"] = status
+                progress["chunks"][index]["status"] = status
+                if status in ("done", "copied"):
+                    progress["completed_chunks"] += 1
+                if job:
+                    job.update_progress(
+                        completed_chunks=progress["completed_chunks"],
+                        total_chunks=progress["total_chunks"]
+                    )
+        
+        def process_chunk(index: int):
+            chunk = chunks[index]
+            if job and job.cancel_requested:
+                raise RuntimeError("OCR已取消")
+            set_chunk_status(index, "running")
+            
+            # 提取分块页面，同时检查是否都已有文字层
+            with open(input_file, 'rb') as f:
+                reader = PyPDF2.PdfReader(f)
+                writer = PyPDF2.PdfWriter()
+                has_text = True
+                for i in range(chunk["start"], chunk["end"]):
+                    page = reader.pages[i]
+                    if has_text and not (page.extract_text() or "").strip():
+                        has_text = False
+                    writer.add_page(page)
+                chunk_input = chunk["path"][:-4] + "_in.pdf"
+                with open(chunk_input, 'wb') as out:
+                    writer.write(out)
+            
+            temp_output = chunk["path"] + ".tmp"
+            try:
+                if has_text:
+                    # 整块都有文字层，无需OCR
+                    os.replace(chunk_input, chunk["path"])
+                    set_chunk_status(index, "copied")
+                    return
+                
+                result = subprocess.run(
+                    [
+                        "ocrmypdf",
+                        "-l", language,
+                        "--skip-text",  # 跳过已有文字层的页面
+                        "--jobs", str(jobs_per_chunk),
+                        "--output-type", "pdf",
+                        chunk_input,
+                        temp_output
+                    ],
+                    capture_output=True,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    timeout=chunk_timeout
+                )
+                if result.returncode != 0:
+                    raise RuntimeError(f"第{chunk['pages']}页OCR失败: {result.stderr[-500:]}")
+                # 完成后再改名，中断时不会留下不完整的分块
+                os.replace(temp_output, chunk["path"])
+                set_chunk_status(index, "done")
+            except FileNotFoundError:
+                raise RuntimeError("未找到ocrmypdf工具，请先安装OCRmyPDF")
+            except subprocess.TimeoutExpired:
+                raise RuntimeError(f"第{chunk['pages']}页OCR超时（超过{chunk_timeout}秒）")
+            finally:
+                for path in (chunk_input, temp_output):
+                    if os.path.exists(path):
+                        os.remove(path)
+        
+        try:
+            todo = [i for i, c in enumerate(chunks) if c["status"] == "pending"]
+            errors = []
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as executor:
+                futures = {executor.submit(process_chunk, i): i for i in todo}
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        set_chunk_status(futures[future], "failed")
+                        errors.append(str(e))
+            
+            if errors:
+                progress["status"] = "failed"
+                return {
+                    "success": False,
+                    "error": f"OCR处理失败: {errors[0]}",
+                    "failed_chunks": len(errors),
+                    "completed_chunks": progress["completed_chunks"],
+                    "total_chunks": progress["total_chunks"],
+                    "message": "已完成的分块已保存，重新执行将跳过这些分块"
+                }
+            
+            # 按页序拼接分块
+            writer = PyPDF2.PdfWriter()
+            for chunk in chunks:
+                writer.append(chunk["path"])
+            temp_output = output_path + ".tmp"
+            with open(temp_output, 'wb') as out:
+                writer.write(out)
+            os.replace(temp_output, output_path)
+            
+            shutil.rmtree(work_dir, ignore_errors=True)
+            progress["status"] = "completed"
+            return self._ocr_result(output_file, output_path, output_format, {
+                "pages": page_count,
+                "total_chunks": len(chunks),
+                "reused_chunks": sum(1 for c in progress["chunks"] if c["reused"]),
+                "copied_chunks": sum(1 for c in progress["chunks"] if c["status"] == "copied")
+            })
+        except Exception as e:
+            progress["status"] = "failed"
+            return {
+                "success": False,
+                "error": f"OCR处理失败: {str(e)}"
+            }
+    
     def _get_translation_progress(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """获取翻译进度"""
         file_name = params.get("file_name")
@@ -309,79 +769,162 @@ class EbookConverterPlugin(BasePlugin):
         print(f"查询翻译进度 - 文件名: {file_name}")
         print(f"当前进度数据: {self.translation_progress}")
         
-        progress = self.translation_progress.get(file_name, {
-            "current": 0,
-            "total": 0,
-            "status": "not_started"
-        })
+        progress = self.translation_progress.get(file_name)
+        if progress is None:
+            # 服务重启后内存中的进度丢失，从磁盘断点中查找
+            progress = self._find_checkpoint_progress(file_name) or {
+                "current": 0,
+                "total": 0,
+                "status": "not_started"
+            }
         
-        return {
+        result = {
             "success": True,
             "progress": progress
         }
+        if file_name in self.ocr_progress:
+            result["ocr_progress"] = self.ocr_progress[file_name]
+        return result
     
-    def _translate_ebook(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """翻译电子书"""
+    def _find_checkpoint_progress(self, file_name: str) -> Dict[str, Any]:
+        """在断点目录中查找指定文件的翻译进度"""
+        checkpoint_dir = getattr(config, 'TRANSLATION_CHECKPOINT_DIR', 'cache/checkpoints')
+        if not os.path.isdir(checkpoint_dir):
+            return None
+        for name in os.listdir(checkpoint_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(checkpoint_dir, name), 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if meta.get("file_name") == file_name:
+                status = meta.get("status")
+                return {
+                    "current": meta.get("current", 0),
+                    "total": meta.get("total", 0),
+                    # 记录为translating但进程中已没有该任务，说明服务在翻译中途退出
+                    "status": "interrupted" if status == "translating" else status,
+                    "resumable": True
+                }
+        return None
+    
+    def _translate_ebook(self, params: Dict[str, Any], resume: bool = False) -> Dict[str, Any]:
+        """翻译电子书
+        resume=True时从磁盘断点继续，翻译服务、模型和目标语言沿用断点中的设置
+        """
         input_file = params.get("input_file")
+        if not input_file or not os.path.exists(input_file):
+            return {"success": False, "error": "输入文件不存在"}
+        
+        checkpoint = _TranslationCheckpoint(
+            getattr(config, 'TRANSLATION_CHECKPOINT_DIR', 'cache/checkpoints'),
+            input_file
+        )
+        if resume:
+            ok, error = checkpoint.load()
+            if not ok:
+                return {"success": False, "error": error}
+            settings = checkpoint.meta.get("settings", {})
+            # 影响分段和译文的设置必须与断点一致，其余设置允许覆盖
+            params = {**settings, **{k: v for k, v in params.items() if k not in (
+                "translate_provider", "translate_model", "target_language")}}
+        
         provider = params.get("translate_provider", "ollama")
         model = params.get("translate_model", "qwen2.5:7b")
         target_language = params.get("target_language", "zh-CN")
         bilingual = params.get("bilingual", True)
         output_format = params.get("output_format", "epub")
+        concurrency = params.get("concurrency")
+        use_memory = params.get("use_translation_memory", True)
         
-        if not input_file or not os.path.exists(input_file):
-            return {"success": False, "error": "输入文件不存在"}
+        if not resume:
+            checkpoint.start({
+                "translate_provider": provider,
+                "translate_model": model,
+                "target_language": target_language,
+                "bilingual": bilingual,
+                "output_format": output_format
+            })
+        else:
+            checkpoint.update(status="translating")
         
         # 初始化进度跟踪
         file_name = os.path.basename(input_file)
         self.translation_progress[file_name] = {
             "current": 0,
             "total": 0,
-            "status": "starting"
+            "status": "resuming" if resume else "starting"
         }
         print(f"开始翻译 - 文件名: {file_name}")
         print(f"初始化进度: {self.translation_progress[file_name]}")
         
+        # 输出先流式写入临时txt，翻译完成后再转换为目标格式
+        suffix = "bilingual" if bilingual else "translated"
+        output_file = f"{self._input_stem(params)}_{suffix}.{output_format}"
+        output_path = os.path.join("outputs", output_file)
+        os.makedirs("outputs", exist_ok=True)
+        if output_format == "txt":
+            temp_txt = f"{output_path}.partial"
+        else:
+            temp_txt = os.path.splitext(output_path)[0] + ".txt"
+        
         try:
-            # 1. 先提取文本内容
-            text_content = self._extract_text(input_file)
-            if not text_content:
-                return {"success": False, "error": "无法提取文本内容，文件可能为空或格式不支持"}
+            # 1. 流式提取段落，边提取边翻译，首段无需等待全书提取完成
+            paragraphs = self._iter_paragraphs(self._iter_text_blocks(input_file))
             
-            # 2. 翻译文本
-            success, result = self._translate_text(
-                text_content, 
-                provider, 
-                model, 
-                target_language,
-                file_name,
-                bilingual  # 传递bilingual参数
-            )
+            with open(temp_txt, 'w', encoding='utf-8') as out:
+                written = [0]
+                
+                def write_paragraph(original: str, translated: str):
+                    """按原文顺序写出一个翻译完成的段落"""
+                    if bilingual:
+                        out.write(f"{original}\n{translated}\n\n")
+                    else:
+                        if written[0]:
+                            out.write("\n\n")
+                        out.write(translated)
+                    written[0] += 1
+                
+                # 2. 翻译文本
+                success, result = self._translate_text(
+                    paragraphs, 
+                    provider, 
+                    model, 
+                    target_language,
+                    file_name,
+                    bilingual,  # 传递bilingual参数
+                    concurrency,
+                    use_memory,
+                    checkpoint,
+                    write_paragraph
+                )
             
             if not success:
-                return {"success": False, "error": f"翻译失败: {result}"}
-            
-            # 3. 生成输出文件
-            input_path = Path(input_file)
-            if bilingual:
-                output_file = f"{input_path.stem}_bilingual.{output_format}"
-                # result 是 list of (original, translated) tuples
-                final_content = self._create_bilingual_content_from_pairs(result)
-            else:
-                output_file = f"{input_path.stem}_translated.{output_format}"
-                # result 是翻译后的文本字符串
-                final_content = result
+                progress = self.translation_progress[file_name]
+                if progress["total"] == 0:
+                    checkpoint.remove()
+                    return {"success": False, "error": "无法提取文本内容，文件可能为空或格式不支持"}
+                checkpoint.update(status="failed", current=progress["current"], total=progress["total"])
+                return {
+                    "success": False,
+                    "error": f"翻译失败: {result}。已完成的段落已保存，可使用resume操作从断点继续",
+                    "resumable": True
+                }
             
-            output_path = os.path.join("outputs", output_file)
-            os.makedirs("outputs", exist_ok=True)
+            # 3. 保存为指定格式
+            self._save_txt_as_format(temp_txt, output_path, output_format)
             
-            # 4. 保存为指定格式
-            self._save_as_format(final_content, output_path, output_format)
+            # 翻译完成，断点不再需要
+            checkpoint.remove()
             
             return {
                 "success": True,
                 "output_file": output_file,
                 "output_path": output_path,
+                "paragraphs": result,
+                "translation_memory": self.translation_progress[file_name].get("translation_memory"),
                 "message": "翻译成功"
             }
         except Exception as e:
@@ -389,363 +932,522 @@ class EbookConverterPlugin(BasePlugin):
                 "success": False,
                 "error": f"翻译失败: {str(e)}"
             }
+        finally:
+            checkpoint.close()
+            if os.path.exists(temp_txt):
+                os.remove(temp_txt)
     
     def _extract_text(self, file_path: str) -> str:
-        """从电子书中提取文本"""
+        """从电子书中提取全部文本"""
         try:
-            file_ext = Path(file_path).suffix.lower()
-            
-            if file_ext == '.pdf':
-                return self._extract_pdf_text(file_path)
-            elif file_ext == '.epub':
-                return self._extract_epub_text(file_path)
-            elif file_ext == '.txt':
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            else:
-                # 尝试转换为txt后提取
-                temp_txt = "temp_extract.txt"
-                self._convert_format({
-                    "input_file": file_path,
-                    "output_format": "txt",
-                    "output_file": temp_txt
-                })
-                temp_path = os.path.join("outputs", temp_txt)
-                if os.path.exists(temp_path):
-                    with open(temp_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    os.remove(temp_path)
-                    return content
-                return ""
+            return "".join(self._iter_text_blocks(file_path))
         except Exception as e:
             print(f"提取文本失败: {str(e)}")
             return ""
     
+    def _iter_text_blocks(self, file_path: str):
+        """按页/章节逐块产出电子书文本（生成器），各块直接拼接即为全文"""
+        file_ext = Path(file_path).suffix.lower()
+        
+        if file_ext == '.pdf':
+            yield from self._iter_pdf_pages(file_path)
+        elif file_ext == '.epub':
+            yield from self._iter_epub_documents(file_path)
+        elif file_ext == '.txt':
+            yield from self._iter_txt_chunks(file_path)
+        else:
+            # 尝试转换为txt后提取
+            temp_txt = f"temp_extract_{uuid.uuid4().hex}.txt"
+            self._convert_format({
+                "input_file": file_path,
+                "output_format": "txt",
+                "output_file": temp_txt
+            })
+            temp_path = os.path.join("outputs", temp_txt)
+            if os.path.exists(temp_path):
+                try:
+                    yield from self._iter_txt_chunks(temp_path)
+                finally:
+                    os.remove(temp_path)
+    
+    def _iter_txt_chunks(self, file_path: str, chunk_size: int = 1024 * 1024):
+        """按固定大小分块读取txt文件"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for chunk in iter(lambda: f.read(chunk_size), ''):
+                yield chunk
+    
+    def _iter_pdf_pages(self, file_path: str):
+        """逐页提取PDF文本
+        页数较多时按页码区间分片交给进程池并行提取，仍按页码顺序产出
+        """
+        import PyPDF2
+        with open(file_path, 'rb') as file:
+            page_count = len(PyPDF2.PdfReader(file).pages)
+        
+        workers = getattr(config, 'PDF_EXTRACT_WORKERS', 0) or os.cpu_count() or 1
+        pages_per_task = max(1, getattr(config, 'PDF_EXTRACT_PAGES_PER_TASK', 16))
+        
+        # 页数太少时多进程的启动开销大于收益，直接在当前进程提取
+        if workers <= 1 or page_count <= pages_per_task * 2:
+            yield from _extract_pdf_page_range(file_path, 0, page_count)
+            return
+        
+        ranges = [(start, min(start + pages_per_task, page_count))
+                  for start in range(0, page_count, pages_per_task)]
+        # 请求在多线程服务器的线程中处理，fork 出的子进程可能继承其他线程持有的锁（日志、SQLite）而死锁，
+        # 因此用 spawn 启动工作进程；提取函数是模块级函数，可以在新进程中按模块名导入
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # 最多提前提交 workers*2 个分片，避免消费方较慢时提取结果堆积在内存中
+            futures = deque()
+            next_range = 0
+            try:
+                while next_range < len(ranges) or futures:
+                    while next_range < len(ranges) and len(futures) < workers * 2:
+                        start, end = ranges[next_range]
+                        futures.append(executor.submit(_extract_pdf_page_range, file_path, start, end))
+                        next_range += 1
+                    yield from futures.popleft().result()
+            finally:
+                # 消费方提前停止（如翻译失败）时取消尚未开始的分片
+                for future in futures:
+                    future.cancel()
+    
+    def _iter_epub_documents(self, file_path: str):
+        """逐章节提取EPUB文本"""
+        import ebooklib
+        from ebooklib import epub
+        from bs4 import BeautifulSoup
+        
+        book = epub.read_epub(file_path)
+        for item in book.get_items():
+            if item.get_type() == ebooklib.ITEM_DOCUMENT:
+                soup = BeautifulSoup(item.get_content(), 'html.parser')
+                yield soup.get_text() + "\n"
+    
+    def _iter_paragraphs(self, blocks, max_length: int = None):
+        """把文本块流切分为段落（以空行分隔），跨页/跨章节的段落会被正确拼接
+        每块只与上一块留下的未结束部分拼接后切分；未结束部分超过max_length时（PDF页面文本常常没有空行）
+        在上限内最后一个换行处强制断开为段落，未结束部分保持有界，耗时与文本长度成线性
+        """
+        if max_length is None:
+            max_length = getattr(config, 'EBOOK_MAX_PARAGRAPH_LENGTH', 4000)
+        max_length = max(1, int(max_length))
+        tail = ""
+        for block in blocks:
+            parts = (tail + block).split('\n\n')
+            # 最后一部分可能是未结束的段落，留到下一块继续拼接
+            tail = parts.pop()
+            for part in parts:
+                para = part.strip()
+                if para:
+                    yield para
+            while len(tail) > max_length:
+                cut = tail.rfind('\n', 0, max_length)
+                if cut <= 0:
+                    cut = max_length
+                para = tail[:cut].strip()
+                tail = tail[cut:]
+                if para:
+                    yield para
+        para = tail.strip()
+        if para:
+            yield para
+    
     def _extract_pdf_text(self, file_path: str) -> str:
         """从PDF提取文本"""
         try:
-            import PyPDF2
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-            return text
+            return "".join(self._iter_pdf_pages(file_path))
         except:
             return ""
     
     def _extract_epub_text(self, file_path: str) -> str:
         """从EPUB提取文本"""
         try:
-            import ebooklib
-            from ebooklib import epub
-            from bs4 import BeautifulSoup
-            
-            book = epub.read_epub(file_path)
-            text = ""
-            
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_content(), 'html.parser')
-                    text += soup.get_text() + "\n"
-            
-            return text
+            return "".join(self._iter_epub_documents(file_path))
         except:
             return ""
     
-    def _translate_text(self, text: str, provider: str, model: str, target_language: str, file_name: str = None, bilingual: bool = False) -> tuple:
+    def _translate_text(self, text, provider: str, model: str, target_language: str, file_name: str = None, bilingual: bool = False, concurrency: int = None, use_memory: bool = True, checkpoint: _TranslationCheckpoint = None, on_paragraph=None) -> tuple:
         """使用AI翻译文本
+        text可以是完整文本，也可以是段落的迭代器（流式提取）
         返回: (success, result_or_error)
         如果bilingual=True，返回(success, list_of_tuples) 每个tuple为(original_para, translated_para)
+        如果提供了on_paragraph回调，段落按原文顺序逐个回调，返回(success, 段落数)
         """
         if provider == "ollama":
-            return self._translate_with_ollama(text, model, target_language, file_name, bilingual)
+            return self._translate_with_ollama(text, model, target_language, file_name, bilingual, concurrency, use_memory, checkpoint, on_paragraph)
         elif provider == "deepseek":
-            return self._translate_with_deepseek(text, model, target_language, file_name, bilingual)
+            return self._translate_with_deepseek(text, model, target_language, file_name, bilingual, concurrency, use_memory, checkpoint, on_paragraph)
         else:
             return (False, "不支持的翻译服务")
     
-    def _translate_with_ollama(self, text: str, model: str, target_language: str, file_name: str = None, bilingual: bool = False) -> tuple:
+    def _translate_with_ollama(self, text, model: str, target_language: str, file_name: str = None, bilingual: bool = False, concurrency: int = None, use_memory: bool = True, checkpoint: _TranslationCheckpoint = None, on_paragraph=None) -> tuple:
         """使用Ollama翻译
         返回: (success, result_or_error)
         如果bilingual=True，返回(success, list_of_tuples)
         """
-        try:
-            # 首先按段落分割原文
-            paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-            
-            # 使用配置的分段大小
-            max_segment_length = getattr(config, 'OLLAMA_MAX_SEGMENT_LENGTH', 2000)
-            
-            # 将每个段落进一步分割为更小的segments（如果段落太长）
-            all_segments = []  # [(para_index, segment_text)]
-            for para_idx, para in enumerate(paragraphs):
-                if len(para) <= max_segment_length:
-                    all_segments.append((para_idx, para))
-                else:
-                    # 将长段落分割为多个segment
-                    sentences = para.split('. ')
-                    current_segment = ""
-                    for sentence in sentences:
-                        if len(current_segment) + len(sentence) + 2 <= max_segment_length:
-                            current_segment += sentence + ". "
-                        else:
-                            if current_segment:
-                                all_segments.append((para_idx, current_segment.strip()))
-                            current_segment = sentence + ". "
-                    if current_segment:
-                        all_segments.append((para_idx, current_segment.strip()))
-            
-            # 更新进度：设置总段落数
-            if file_name and file_name in self.translation_progress:
-                self.translation_progress[file_name]["total"] = len(all_segments)
-                self.translation_progress[file_name]["status"] = "translating"
-            
-            lang_map = {
-                "zh-CN": "简体中文",
-                "en": "English",
-                "ja": "日本語",
-                "ko": "한국어"
-            }
-            target_lang_name = lang_map.get(target_language, "简体中文")
-            
-            ollama_url = getattr(config, 'OLLAMA_BASE_URL', 'http://localhost:11434')
-            ollama_timeout = getattr(config, 'OLLAMA_API_TIMEOUT', 300)
-            max_retries = 2  # 最大重试次数
-            
-            # 用于存储每个段落的翻译结果
-            paragraph_translations = {}  # {para_index: [translated_segments]}
-            
-            for i, (para_idx, segment) in enumerate(all_segments, 1):
-                prompt = f"请将以下文本翻译成{target_lang_name}，保持原文的格式和段落结构，只返回翻译结果：\n\n{segment}"
-                
-                # 重试机制
-                retry_count = 0
-                success = False
-                
-                while retry_count <= max_retries:
-                    try:
-                        response = requests.post(
-                            f"{ollama_url}/api/generate",
-                            json={
-                                "model": model,
-                                "prompt": prompt,
-                                "stream": False
-                            },
-                            timeout=ollama_timeout
-                        )
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            translated_text = result.get("response", "")
-                            if translated_text:
-                                # 按段落索引存储翻译结果
-                                if para_idx not in paragraph_translations:
-                                    paragraph_translations[para_idx] = []
-                                paragraph_translations[para_idx].append(translated_text)
-                                
-                                print(f"  ✓ 段落 {i}/{len(all_segments)} 翻译成功")
-                                
-                                # 更新进度
-                                if file_name and file_name in self.translation_progress:
-                                    self.translation_progress[file_name]["current"] = i
-                                
-                                success = True
-                                break  # 成功后退出重试循环
-                            else:
-                                return (False, f"Ollama返回空结果 (段落 {i}/{len(all_segments)})")
-                        else:
-                            return (False, f"Ollama API错误: HTTP {response.status_code} - {response.text[:200]}")
-                    except requests.exceptions.ConnectionError:
-                        # 连接错误不重试，立即返回
-                        return (False, f"无法连接到Ollama服务 ({ollama_url})，请确认服务已启动")
-                    except requests.exceptions.Timeout:
-                        retry_count += 1
-                        if retry_count <= max_retries:
-                            print(f"  ⚠ Ollama请求超时 (段落 {i}/{len(all_segments)})，第 {retry_count} 次重试...")
-                        else:
-                            return (False, f"Ollama请求超时 (段落 {i}/{len(all_segments)})，已重试 {max_retries} 次仍然失败。请尝试：1)增加config.py中OLLAMA_API_TIMEOUT至600秒 2)减小OLLAMA_MAX_SEGMENT_LENGTH至500")
-                
-                # 检查是否成功
-                if not success:
-                    return (False, f"翻译段落 {i}/{len(all_segments)} 失败")
+        ollama_url = getattr(config, 'OLLAMA_BASE_URL', 'http://localhost:11434')
+        ollama_timeout = getattr(config, 'OLLAMA_API_TIMEOUT', 300)
+        max_segment_length = getattr(config, 'OLLAMA_MAX_SEGMENT_LENGTH', 2000)
+        
+        def request_fn(segment: str) -> str:
+            try:
+                response = requests.post(
+                    f"{ollama_url}/api/generate",
+                    json={
+                        "model": model,
+                        "prompt": self._build_translate_prompt(segment, target_language),
+                        "stream": False
+                    },
+                    timeout=ollama_timeout
+                )
+            except requests.exceptions.ConnectionError:
+                # 连接错误不重试，立即返回
+                raise _TranslationError(f"无法连接到Ollama服务 ({ollama_url})，请确认服务已启动")
+            except requests.exceptions.Timeout:
+                raise _TranslationError(
+                    "Ollama请求超时。请尝试：1)增加config.py中OLLAMA_API_TIMEOUT至600秒 2)减小OLLAMA_MAX_SEGMENT_LENGTH至500",
+                    retryable=True
+                )
             
-            # 合并翻译结果
-            if bilingual:
-                # 返回段落对应列表
-                bilingual_pairs = []
-                for para_idx, para in enumerate(paragraphs):
-                    translated_parts = paragraph_translations.get(para_idx, [])
-                    translated_para = " ".join(translated_parts) if translated_parts else para
-                    bilingual_pairs.append((para, translated_para))
-                
-                # 更新进度为完成
-                if file_name and file_name in self.translation_progress:
-                    self.translation_progress[file_name]["status"] = "completed"
-                
-                return (True, bilingual_pairs)
-            else:
-                # 按段落顺序合并翻译结果
-                translated_paragraphs = []
-                for para_idx in sorted(paragraph_translations.keys()):
-                    translated_parts = paragraph_translations[para_idx]
-                    translated_paragraphs.append(" ".join(translated_parts))
-                
-                if not translated_paragraphs:
-                    return (False, "翻译结果为空")
-                
-                # 更新进度为完成
-                if file_name and file_name in self.translation_progress:
-                    self.translation_progress[file_name]["status"] = "completed"
-                
-                return (True, "\n\n".join(translated_paragraphs))
+            if response.status_code != 200:
+                raise _TranslationError(
+                    f"Ollama API错误: HTTP {response.status_code} - {response.text[:200]}",
+                    retryable=response.status_code >= 500
+                )
+            translated_text = response.json().get("response", "")
+            if not translated_text:
+                raise _TranslationError("Ollama返回空结果")
+            return translated_text
+        
+        try:
+            memory_scope = (model, target_language) if use_memory else None
+            return self._run_translation(
+                "ollama", text, request_fn, max_segment_length, file_name, bilingual, concurrency, memory_scope, checkpoint,
+                on_paragraph
+            )
         except Exception as e:
-            # 更新进度为失败
-            if file_name and file_name in self.translation_progress:
-                self.translation_progress[file_name]["status"] = "failed"
-            
+            self._set_progress_status(file_name, "failed")
             error_msg = f"Ollama翻译异常: {type(e).__name__} - {str(e)}"
             print(error_msg)
             return (False, error_msg)
     
-    def _translate_with_deepseek(self, text: str, model: str, target_language: str, file_name: str = None, bilingual: bool = False) -> tuple:
+    def _translate_with_deepseek(self, text, model: str, target_language: str, file_name: str = None, bilingual: bool = False, concurrency: int = None, use_memory: bool = True, checkpoint: _TranslationCheckpoint = None, on_paragraph=None) -> tuple:
         """使用DeepSeek翻译
         返回: (success, result_or_error)
         如果bilingual=True，返回(success, list_of_tuples)
         """
-        try:
-            # 获取API密钥：优先使用config中的配置，其次使用环境变量
-            api_key = getattr(config, 'DEEPSEEK_API_KEY', '') or os.environ.get("DEEPSEEK_API_KEY", "")
-            if not api_key:
-                return (False, "未配置DeepSeek API密钥，请在config.py中设置DEEPSEEK_API_KEY或设置环境变量")
-            
-            deepseek_url = getattr(config, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com/v1')
-            deepseek_timeout = getattr(config, 'DEEPSEEK_API_TIMEOUT', 120)
-            
-            # 首先按段落分割原文
-            paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-            
-            # 将每个段落进一步分割为更小的segments（如果段落太长）
-            max_segment_length = 2000
-            all_segments = []  # [(para_index, segment_text)]
-            for para_idx, para in enumerate(paragraphs):
-                if len(para) <= max_segment_length:
-                    all_segments.append((para_idx, para))
-                else:
-                    # 将长段落分割为多个segment
-                    sentences = para.split('. ')
-                    current_segment = ""
-                    for sentence in sentences:
-                        if len(current_segment) + len(sentence) + 2 <= max_segment_length:
-                            current_segment += sentence + ". "
-                        else:
-                            if current_segment:
-                                all_segments.append((para_idx, current_segment.strip()))
-                            current_segment = sentence + ". "
-                    if current_segment:
-                        all_segments.append((para_idx, current_segment.strip()))
-            
-            # 更新进度：设置总段落数
-            if file_name and file_name in self.translation_progress:
-                self.translation_progress[file_name]["total"] = len(all_segments)
-                self.translation_progress[file_name]["status"] = "translating"
-            
-            lang_map = {
-                "zh-CN": "简体中文",
-                "en": "English",
-                "ja": "日本語",
-                "ko": "한국어"
-            }
-            target_lang_name = lang_map.get(target_language, "简体中文")
-            
-            # 用于存储每个段落的翻译结果
-            paragraph_translations = {}  # {para_index: [translated_segments]}
+        # 获取API密钥：优先使用config中的配置，其次使用环境变量
+        api_key = getattr(config, 'DEEPSEEK_API_KEY', '') or os.environ.get("DEEPSEEK_API_KEY", "")
+        if not api_key:
+            return (False, "未配置DeepSeek API密钥，请在config.py中设置DEEPSEEK_API_KEY或设置环境变量")
+        
+        deepseek_url = getattr(config, 'DEEPSEEK_BASE_URL', 'https://api.deepseek.com/v1')
+        deepseek_timeout = getattr(config, 'DEEPSEEK_API_TIMEOUT', 120)
+        
+        # 多个线程复用同一个连接池，避免每个段落都重新建立TLS连接
+        session = requests.Session()
+        session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        
+        def request_fn(segment: str) -> str:
+            try:
+                response = session.post(
+                    f"{deepseek_url}/chat/completions",
+                    json={
+                        "model": model or "deepseek-chat",
+                        "messages": [
+                            {
+                                "role": "user",
+                                "content": self._build_translate_prompt(segment, target_language)
+                            }
+                        ]
+                    },
+                    timeout=deepseek_timeout
+                )
+            except requests.exceptions.Timeout:
+                raise _TranslationError("DeepSeek请求超时，请检查网络或增加超时时间", retryable=True)
+            except requests.exceptions.ConnectionError:
+                raise _TranslationError(f"无法连接到DeepSeek服务 ({deepseek_url})，请检查网络连接")
             
-            for i, (para_idx, segment) in enumerate(all_segments, 1):
-                try:
-                    response = requests.post(
-                        f"{deepseek_url}/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": model or "deepseek-chat",
-                            "messages": [
-                                {
-                                    "role": "user",
-                                    "content": f"请将以下文本翻译成{target_lang_name}，保持原文的格式和段落结构，只返回翻译结果：\n\n{segment}"
-                                }
-                            ]
-                        },
-                        timeout=deepseek_timeout
-                    )
+            if response.status_code != 200:
+                # 429(限流)和5xx错误可以重试
+                raise _TranslationError(
+                    f"DeepSeek API错误: HTTP {response.status_code} - {response.text[:200]}",
+                    retryable=response.status_code == 429 or response.status_code >= 500
+                )
+            try:
+                translated_text = response.json()["choices"][0]["message"]["content"]
+            except KeyError as e:
+                raise _TranslationError(f"DeepSeek API响应格式错误: 缺少字段 {str(e)}")
+            if not translated_text:
+                raise _TranslationError("DeepSeek返回空结果")
+            return translated_text
+        
+        try:
+            memory_scope = (model or "deepseek-chat", target_language) if use_memory else None
+            return self._run_translation(
+                "deepseek", text, request_fn, 2000, file_name, bilingual, concurrency, memory_scope, checkpoint,
+                on_paragraph
+            )
+        except Exception as e:
+            self._set_progress_status(file_name, "failed")
+            error_msg = f"DeepSeek翻译异常: {type(e).__name__} - {str(e)}"
+            print(error_msg)
+            return (False, error_msg)
+        finally:
+            session.close()
+    
+    def _build_translate_prompt(self, segment: str, target_language: str) -> str:
+        """构建翻译提示词"""
+        target_lang_name = self.LANGUAGE_NAMES.get(target_language, "简体中文")
+        return f"请将以下文本翻译成{target_lang_name}，保持原文的格式和段落结构，只返回翻译结果：\n\n{segment}"
+    
+    def _split_segments(self, paragraphs: List[str], max_segment_length: int) -> List[tuple]:
+        """将段落切分为不超过max_segment_length的segments
+        返回: [(para_index, segment_text)]
+        """
+        all_segments = []
+        for para_idx, para in enumerate(paragraphs):
+            if len(para) <= max_segment_length:
+                all_segments.append((para_idx, para))
+            else:
+                # 将长段落按句子分割为多个segment
+                sentences = para.split('. ')
+                current_segment = ""
+                for sentence in sentences:
+                    if len(current_segment) + len(sentence) + 2 <= max_segment_length:
+                        current_segment += sentence + ". "
+                    else:
+                        if current_segment:
+                            all_segments.append((para_idx, current_segment.strip()))
+                        current_segment = sentence + ". "
+                if current_segment:
+                    all_segments.append((para_idx, current_segment.strip()))
+        return all_segments
+    
+    def _iter_segments(self, paragraphs, max_segment_length: int):
+        """逐段落切分segments（生成器）
+        产出: (para_index, segment_text, paragraph)
+        """
+        for para_idx, para in enumerate(paragraphs):
+            for _, segment in self._split_segments([para], max_segment_length):
+                yield (para_idx, segment, para)
+    
+    def _run_translation(self, provider: str, text, request_fn, max_segment_length: int,
+                         file_name: str = None, bilingual: bool = False, concurrency: int = None,
+                         memory_scope: tuple = None, checkpoint: _TranslationCheckpoint = None,
+                         on_paragraph=None) -> tuple:
+        """分段并发翻译并按段落顺序输出结果
+        memory_scope为(model, target_language)时先查询翻译记忆库，为None时不使用记忆库
+        返回: (success, result_or_error)
+        """
+        if isinstance(text, str):
+            paragraphs = (p.strip() for p in text.split('\n\n') if p.strip())
+        else:
+            paragraphs = text
+        
+        # 未提供回调时在内存中汇总结果
+        collected = []
+        streaming = on_paragraph is not None
+        if not streaming:
+            on_paragraph = lambda original, translated: collected.append((original, translated))
+        
+        if file_name and file_name in self.translation_progress:
+            self.translation_progress[file_name]["status"] = "translating"
+        
+        success, result = self._translate_segments(
+            provider, self._iter_segments(paragraphs, max_segment_length), request_fn,
+            file_name, concurrency, memory_scope, checkpoint, on_paragraph
+        )
+        if not success:
+            self._set_progress_status(file_name, "failed")
+            return (False, result)
+        if result == 0:
+            self._set_progress_status(file_name, "failed")
+            return (False, "翻译结果为空")
+        
+        self._set_progress_status(file_name, "completed")
+        if streaming:
+            return (True, result)
+        if bilingual:
+            # 返回段落对应列表
+            return (True, collected)
+        # 按段落顺序合并翻译结果
+        return (True, "\n\n".join(translated for _, translated in collected))
+    
+    def _translate_segments(self, provider: str, segments, request_fn,
+                            file_name: str = None, concurrency: int = None, memory_scope: tuple = None,
+                            checkpoint: _TranslationCheckpoint = None, on_paragraph=None) -> tuple:
+        """并发翻译segments流，同时在途的请求数不超过concurrency
+        segments是(para_index, segment_text, paragraph)的迭代器，按需读取：已读取但尚未按顺序输出的
+        segment不超过concurrency的4倍，因此提取、翻译和写出同时进行，内存占用不随文档大小增长
+        断点中已完成的segment直接复用；每完成一个segment就追加到断点
+        命中翻译记忆库的segment不发起请求，命中/未命中次数记录在翻译进度中
+        段落的全部segment完成后按原文顺序调用on_paragraph(original, translated)
+        返回: (success, paragraph_count_or_error)
+        """
+        if concurrency is None:
+            concurrency = getattr(config, 'TRANSLATE_CONCURRENCY', {}).get(provider, 1)
+        concurrency = max(1, int(concurrency))
+        window = concurrency * 4
+        rate = getattr(config, 'TRANSLATE_RATE_LIMIT', {}).get(provider, 0)
+        slots, limiter = _get_provider_limiters(provider, rate)
+        stop = threading.Event()
+        job = get_current_job()
+        memory = get_translation_memory() if memory_scope else None
+        
+        pending = {}       # {segment_index: (para_idx, segment, paragraph)} 已读取、尚未输出
+        translations = {}  # {segment_index: translated_text} 已完成、尚未输出
+        next_index = 0     # 下一个读取的segment序号
+        next_emit = 0      # 下一个按顺序输出的segment序号
+        exhausted = False
+        completed = 0
+        paragraph_count = 0
+        current_para = None  # [para_idx, paragraph, translated_parts]
+        memory_stats = {"hits": 0, "misses": 0}
+        if file_name and file_name in self.translation_progress:
+            self.translation_progress[file_name]["translation_memory"] = memory_stats
+        
+        def translate_fn(segment: str) -> str:
+            translated_text = self._translate_segment_with_retry(request_fn, segment, limiter,
+                                                                 slots, concurrency, stop)
+            if memory:
+                memory.put(provider, memory_scope[0], memory_scope[1], segment, translated_text)
+            return translated_text
+        
+        def emit_ready():
+            """按顺序输出已完成的segment，段落的全部segment完成后回调"""
+            nonlocal next_emit, current_para, paragraph_count
+            while next_emit in translations:
+                para_idx, _, paragraph = pending.pop(next_emit)
+                translated_text = translations.pop(next_emit)
+                if current_para is not None and current_para[0] != para_idx:
+                    on_paragraph(current_para[1], " ".join(current_para[2]))
+                    paragraph_count += 1
+                    current_para = None
+                if current_para is None:
+                    current_para = [para_idx, paragraph, []]
+                current_para[2].append(translated_text)
+                next_emit += 1
+        
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"translate-{provider}")
+        in_flight = {}  # {future: segment_index}
+        try:
+            while not exhausted or in_flight:
+                # 补满在途窗口
+                while not exhausted and len(in_flight) < concurrency and next_index - next_emit < window:
+                    item = next(segments, None)
+                    if item is None:
+                        exhausted = True
+                        break
+                    index = next_index
+                    next_index += 1
+                    pending[index] = item
+                    segment = item[1]
                     
-                    if response.status_code == 200:
-                        result = response.json()
-                        translated_text = result["choices"][0]["message"]["content"]
-                        if translated_text:
-                            # 按段落索引存储翻译结果
-                            if para_idx not in paragraph_translations:
-                                paragraph_translations[para_idx] = []
-                            paragraph_translations[para_idx].append(translated_text)
-                            
-                            print(f"  ✓ 段落 {i}/{len(all_segments)} 翻译成功")
-                            
-                            # 更新进度
-                            if file_name and file_name in self.translation_progress:
-                                self.translation_progress[file_name]["current"] = i
-                        else:
-                            return (False, f"DeepSeek返回空结果 (段落 {i}/{len(all_segments)})")
+                    restored = checkpoint.get(index, segment) if checkpoint else None
+                    cached = None
+                    if restored is None and memory:
+                        cached = memory.get(provider, memory_scope[0], memory_scope[1], segment)
+                    if restored is not None:
+                        translations[index] = restored
+                        completed += 1
+                    elif cached is not None:
+                        memory_stats["hits"] += 1
+                        translations[index] = cached
+                        completed += 1
+                        if checkpoint:
+                            checkpoint.record(index, segment, cached)
                     else:
-                        error_detail = response.text[:200]
-                        return (False, f"DeepSeek API错误: HTTP {response.status_code} - {error_detail}")
-                except requests.exceptions.Timeout:
-                    return (False, f"DeepSeek请求超时 (段落 {i}/{len(all_segments)})，请检查网络或增加超时时间")
-                except requests.exceptions.ConnectionError:
-                    return (False, f"无法连接到DeepSeek服务 ({deepseek_url})，请检查网络连接")
-            
-            # 合并翻译结果
-            if bilingual:
-                # 返回段落对应列表
-                bilingual_pairs = []
-                for para_idx, para in enumerate(paragraphs):
-                    translated_parts = paragraph_translations.get(para_idx, [])
-                    translated_para = " ".join(translated_parts) if translated_parts else para
-                    bilingual_pairs.append((para, translated_para))
+                        if memory:
+                            memory_stats["misses"] += 1
+                        future = executor.submit(translate_fn, segment)
+                        in_flight[future] = index
                 
-                # 更新进度为完成
-                if file_name and file_name in self.translation_progress:
-                    self.translation_progress[file_name]["status"] = "completed"
-                
-                return (True, bilingual_pairs)
-            else:
-                # 按段落顺序合并翻译结果
-                translated_paragraphs = []
-                for para_idx in sorted(paragraph_translations.keys()):
-                    translated_parts = paragraph_translations[para_idx]
-                    translated_paragraphs.append(" ".join(translated_parts))
+                if in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        try:
+                            translations[index] = future.result()
+                        except _TranslationError as e:
+                            return (False, f"{e} (段落 {index + 1})")
+                        
+                        if checkpoint:
+                            checkpoint.record(index, pending[index][1], translations[index])
+                        completed += 1
+                        logger.debug("段落 %d/%d 翻译成功", index + 1, next_index)
                 
-                if not translated_paragraphs:
-                    return (False, "翻译结果为空")
+                emit_ready()
                 
-                # 更新进度为完成
+                # 更新进度：流式提取时总数随读取增长，extracting表示是否仍在提取
                 if file_name and file_name in self.translation_progress:
-                    self.translation_progress[file_name]["status"] = "completed"
+                    self.translation_progress[file_name].update(
+                        current=completed, total=next_index, extracting=not exhausted
+                    )
+                if job:
+                    job.update_progress(current=completed, total=next_index, extracting=not exhausted)
+                if checkpoint and completed - checkpoint.meta.get("current", 0) >= 20:
+                    checkpoint.update(current=completed, total=next_index)
                 
-                return (True, "\n\n".join(translated_paragraphs))
-        except KeyError as e:
-            # 更新进度为失败
-            if file_name and file_name in self.translation_progress:
-                self.translation_progress[file_name]["status"] = "failed"
-            
-            error_msg = f"DeepSeek API响应格式错误: 缺少字段 {str(e)}"
-            print(error_msg)
-            return (False, error_msg)
-        except Exception as e:
-            error_msg = f"DeepSeek翻译异常: {type(e).__name__} - {str(e)}"
-            print(error_msg)
-            return (False, error_msg)
+                if job and job.cancel_requested:
+                    self._set_progress_status(file_name, "cancelled")
+                    return (False, f"翻译已取消 (已完成 {completed}/{next_index})")
+        finally:
+            # 失败或取消时直接返回：取消尚未开始的请求，不等待在途的请求完成（其结果被丢弃）；
+            # 在途的请求结束前仍占用服务的并发名额，之后看到stop不再重试
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if current_para is not None:
+            on_paragraph(current_para[1], " ".join(current_para[2]))
+            paragraph_count += 1
+        
+        return (True, paragraph_count)
+    
+    def _translate_segment_with_retry(self, request_fn, segment: str, limiter: "_RateLimiter",
+                                      slots: "_ConcurrencyLimiter" = None, concurrency: int = 1,
+                                      stop_event: threading.Event = None) -> str:
+        """
+        翻译单个segment，可重试的错误按指数退避重试
+        每次请求期间占用slots中的一个名额（上限concurrency）；stop_event被设置后不再发起新的请求或重试
+        """
+        max_retries = getattr(config, 'TRANSLATE_MAX_RETRIES', 2)
+        backoff = getattr(config, 'TRANSLATE_RETRY_BACKOFF', 2)
+        
+        retry_count = 0
+        while True:
+            if stop_event is not None and stop_event.is_set():
+                raise _TranslationError("翻译已停止")
+            if slots is not None and not slots.acquire(concurrency, stop_event):
+                raise _TranslationError("翻译已停止")
+            try:
+                limiter.acquire()
+                return request_fn(segment)
+            except _TranslationError as e:
+                if not e.retryable or retry_count >= max_retries:
+                    if e.retryable:
+                        raise _TranslationError(f"{e}，已重试 {max_retries} 次仍然失败")
+                    raise
+                retry_count += 1
+                logger.warning("%s，第 %d 次重试...", e, retry_count)
+            finally:
+                if slots is not None:
+                    slots.release()
+            # 退避等待期间不占用并发名额
+            delay = backoff * (2 ** (retry_count - 1))
+            if stop_event is not None:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+    
+    def _set_progress_status(self, file_name: str, status: str):
+        """更新翻译进度状态"""
+        if file_name and file_name in self.translation_progress:
+            self.translation_progress[file_name]["status"] = status
     
     def _split_text(self, text: str, max_length: int) -> List[str]:
         """分割文本为多个段落"""
@@ -807,19 +1509,26 @@ class EbookConverterPlugin(BasePlugin):
             temp_txt = output_path.replace(f".{format}", ".txt")
             with open(temp_txt, 'w', encoding='utf-8') as f:
                 f.write(content)
-            
-            # 使用ebook-convert转换
-            subprocess.run(
-                ["ebook-convert", temp_txt, output_path],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                timeout=120
-            )
-            
-            if os.path.exists(temp_txt):
-                os.remove(temp_txt)
+            self._save_txt_as_format(temp_txt, output_path, format)
+    
+    def _save_txt_as_format(self, txt_path: str, output_path: str, format: str):
+        """把已写好的txt文件保存为指定格式（转换后删除txt文件）"""
+        if format == "txt":
+            os.replace(txt_path, output_path)
+            return
+        
+        # 使用ebook-convert转换
+        subprocess.run(
+            ["ebook-convert", txt_path, output_path],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            timeout=120
+        )
+        
+        if os.path.exists(txt_path):
+            os.remove(txt_path)
     
     def _get_ebook_info(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """获取电子书信息"""
@@ -833,7 +1542,7 @@ class EbookConverterPlugin(BasePlugin):
             file_stat = os.stat(input_file)
             
             info = {
-                "filename": file_path.name,
+                "filename": params.get("input_filename") or file_path.name,
                 "format": file_path.suffix.lower().replace('.', ''),
                 "size": f"{file_stat.st_size / (1024*1024):.2f} MB",
                 "path": input_file
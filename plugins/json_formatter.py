@@ -2,8 +2,574 @@
 JSON格式化工具插件
 """
 from backend.base_plugin import BasePlugin
-from typing import Dict, Any, List
+from backend.job_manager import get_current_job
+from backend.json_query import compile_query, compile_projection, JsonQueryError, JsonSyntaxError
+from backend.json_patch import diff_json, apply_patch, JsonPatchError
+from backend.json_schema import compile_schema, JsonSchemaError
+from typing import Dict, Any, List, Optional, TextIO
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import codecs
+import config
 import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import uuid
+
+
+# 流式处理每次读取的字节数
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# JSON词法单元（前导空白 + 标点/字符串/数字/字面量），严格按RFC 8259；标点最常见，放在最前
+_TOKEN_RE = re.compile(r"""
+    [ \t\n\r]*
+    (?:
+        (?P<punct>[{}\[\]:,])
+      | (?P<str>"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*")
+      | (?P<num>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+      | (?P<lit>true|false|null)
+    )
+""", re.VERBOSE)
+_PUNCT, _STRING, _NUMBER, _LITERAL = 1, 2, 3, 4
+# 被读取边界截断的词法单元前缀（需要读取更多数据才能判断）
+_PARTIAL_TOKEN_RE = re.compile(r"""
+    "[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*(?:\\(?:u[0-9a-fA-F]{0,3})?)?
+  | -?[0-9]*(?:\.[0-9]*)?(?:[eE][+-]?[0-9]*)?
+  | t(?:r(?:u)?)? | f(?:a(?:l(?:s)?)?)? | n(?:u(?:l)?)?
+""", re.VERBOSE)
+# 数字之后直到读取边界的字符都可能属于同一个数字（如 "1e" 后面还有 "+5"）
+_NUMBER_TAIL_RE = re.compile(r"[0-9.eE+-]*")
+
+# 流式解析的状态：期望的下一个词法单元
+_EXPECT_VALUE = 0           # 值（顶层、冒号后、数组逗号后）
+_EXPECT_VALUE_OR_END = 1    # 数组的第一个元素或 ]
+_EXPECT_KEY = 2             # 对象逗号后的键
+_EXPECT_KEY_OR_END = 3      # 对象的第一个键或 }
+_EXPECT_COLON = 4
+_EXPECT_COMMA_OR_END = 5
+_EXPECT_DONE = 6            # 顶层值已结束
+
+
+def _normalize_number(token: str) -> str:
+    """
+    数字字面量按 json.loads 解析、json.dumps 写出的形式输出，文件与文本两种输入的结果相同：
+    浮点数用 float 的 repr（1E5 -> 100000.0，1.50 -> 1.5，溢出时为 Infinity），整数只有 -0 需要写为 0
+    """
+    if "." in token or "e" in token or "E" in token:
+        return json.dumps(float(token))
+    return "0" if token == "-0" else token
+
+
+def _utf8_len(text: str) -> int:
+    """字符串的UTF-8字节数（纯ASCII时不需要编码）"""
+    return len(text) if text.isascii() else len(text.encode("utf-8", "surrogatepass"))
+
+
+def analyze_json(obj: Any) -> Dict[str, Any]:
+    """
+    单遍统计已解析的JSON对象
+
+    使用显式栈迭代遍历（不受递归深度限制），标量子元素就地统计，只有容器入栈。
+    深度的定义：值外层的容器层数，空容器按所在层级计算
+
+    Returns:
+        {
+            "keys_count": 键总数, "depth": 最大深度,
+            "structure": 各类型的数量,
+            "longest_array": 最长数组的元素数, "largest_object": 最大对象的键数,
+            "string_bytes": 字符串值的UTF-8字节总数, "max_string_bytes": 最长字符串值的字节数
+        }
+    """
+    keys_count = depth = 0
+    objects = arrays = strings = numbers = booleans = nulls = 0
+    longest_array = largest_object = string_bytes = max_string_bytes = 0
+    
+    # 栈中每项为 (一组子元素, 这些元素外层的容器层数)，根节点按层级为0的一组元素处理
+    stack = [((obj,), 0)]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        children, level = pop()
+        if level > depth:
+            depth = level
+        child_level = level + 1
+        for value in children:
+            value_type = type(value)
+            if value_type is dict:
+                objects += 1
+                size = len(value)
+                keys_count += size
+                if size > largest_object:
+                    largest_object = size
+                if size:
+                    push((value.values(), child_level))
+            elif value_type is list:
+                arrays += 1
+                size = len(value)
+                if size > longest_array:
+                    longest_array = size
+                if size:
+                    push((value, child_level))
+            elif value_type is str:
+                strings += 1
+                size = len(value) if value.isascii() else _utf8_len(value)
+                string_bytes += size
+                if size > max_string_bytes:
+                    max_string_bytes = size
+            elif value_type is bool:
+                booleans += 1
+            elif value_type is int or value_type is float:
+                numbers += 1
+            elif value is None:
+                nulls += 1
+    
+    return {
+        "keys_count": keys_count,
+        "depth": depth,
+        "structure": {
+            "objects": objects,
+            "arrays": arrays,
+            "strings": strings,
+            "numbers": numbers,
+            "booleans": booleans,
+            "nulls": nulls
+        },
+        "longest_array": longest_array,
+        "largest_object": largest_object,
+        "string_bytes": string_bytes,
+        "max_string_bytes": max_string_bytes
+    }
+
+
+class JsonStreamError(ValueError):
+    """流式解析的语法错误，包含出错的行号和列号"""
+
+    def __init__(self, message: str, line: int, column: int):
+        super().__init__(f"第{line}行第{column}列: {message}")
+        self.line = line
+        self.column = column
+
+
+class JsonStreamProcessor:
+    """
+    基于词法单元的流式JSON处理器
+
+    逐块读取文件、逐个词法单元校验语法，同时输出格式化/压缩结果并统计键数、深度和结构，
+    不构建对象树，内存占用与文件大小无关，只保存当前嵌套路径上的容器类型
+    """
+
+    def __init__(self, indent: Optional[int] = None, compact: bool = False):
+        """
+        Args:
+            indent: 格式化缩进空格数，为None且compact为False时只校验不输出
+            compact: 压缩输出（移除所有空白）
+        """
+        self.indent = indent
+        self.compact = compact
+        self.keys_count = 0
+        self.depth = 0
+        self.structure = {"objects": 0, "arrays": 0, "strings": 0, "numbers": 0, "booleans": 0, "nulls": 0}
+        self.longest_array = 0
+        self.largest_object = 0
+        self.string_bytes = 0
+        self.max_string_bytes = 0
+        self.root_type = None
+        self.bytes_read = 0
+
+    def process(self, input_path: str, output: Optional[TextIO] = None, progress_callback=None):
+        """
+        处理文件，语法错误时抛出 JsonStreamError
+
+        Args:
+            input_path: 输入文件路径（UTF-8编码）
+            output: 输出流，为None时只校验和统计
+            progress_callback: 每读取一块调用一次 progress_callback(已读取字节数)，返回True时中止处理
+        """
+        emit = output is not None
+        pretty = emit and not self.compact
+        item_sep = "," if not pretty else None
+        key_sep = ":" if self.compact else ": "
+        indent_unit = " " * max(self.indent or 0, 0)
+        indents = ["\n"]
+        
+        def newline(level):
+            while len(indents) <= level:
+                indents.append("\n" + indent_unit * len(indents))
+            return indents[level]
+        
+        pieces = []
+        append = pieces.append
+        objects = arrays = strings = numbers = booleans = nulls = 0
+        longest_array = largest_object = string_bytes = max_string_bytes = 0
+        stack = []
+        sizes = []  # 嵌套路径上每个容器已有的逗号数
+        expect = _EXPECT_VALUE
+        keys_count = 0
+        depth = 0
+        
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        buf = ""
+        pos = 0
+        eof = False
+        # 行号跟踪：buf[0] 在文件中的字符偏移、当前行号和当前行起始偏移
+        buf_offset = 0
+        line = 1
+        line_start = 0
+        finditer = _TOKEN_RE.finditer
+        number_tail = _NUMBER_TAIL_RE.fullmatch
+        
+        def error(message, at):
+            at += len(buf[at:]) - len(buf[at:].lstrip(" \t\n\r"))
+            err_line = line + buf.count("\n", 0, at)
+            last_newline = buf.rfind("\n", 0, at)
+            column = at - last_newline if last_newline >= 0 else buf_offset + at - line_start + 1
+            return JsonStreamError(message, err_line, column)
+        
+        with open(input_path, "rb") as f:
+            while True:
+                for m in finditer(buf, pos):
+                    # 词法单元之间有无法识别的内容，或数字可能被读取边界截断
+                    if m.start() != pos:
+                        break
+                    kind = m.lastindex
+                    if kind == _NUMBER and not eof and number_tail(buf, m.end()):
+                        break
+                    token = m.group(kind)
+                    start = pos
+                    pos = m.end()
+                    
+                    if kind == _PUNCT:
+                        if token == ",":
+                            if expect != _EXPECT_COMMA_OR_END:
+                                raise error("意外的逗号", start)
+                            sizes[-1] += 1
+                            if emit:
+                                append(item_sep or ("," + newline(len(stack))))
+                            expect = _EXPECT_KEY if stack[-1] == "{" else _EXPECT_VALUE
+                            continue
+                        if token == ":":
+                            if expect != _EXPECT_COLON:
+                                raise error("意外的冒号", start)
+                            if emit:
+                                append(key_sep)
+                            expect = _EXPECT_VALUE
+                            continue
+                        if token == "}" or token == "]":
+                            opener = "{" if token == "}" else "["
+                            empty = expect == (_EXPECT_KEY_OR_END if opener == "{" else _EXPECT_VALUE_OR_END)
+                            if not stack or stack[-1] != opener or not (empty or expect == _EXPECT_COMMA_OR_END):
+                                raise error(f"意外的 {token}", start)
+                            stack.pop()
+                            size = sizes.pop() + (not empty)
+                            if opener == "{":
+                                if size > largest_object:
+                                    largest_object = size
+                            elif size > longest_array:
+                                longest_array = size
+                            if empty:
+                                # 空容器的深度按所在层级计算
+                                if len(stack) > depth:
+                                    depth = len(stack)
+                                if emit:
+                                    append(token)
+                            elif emit:
+                                append(token if not pretty else newline(len(stack)) + token)
+                            expect = _EXPECT_COMMA_OR_END if stack else _EXPECT_DONE
+                            continue
+                        # { 或 [ 作为值
+                        if expect == _EXPECT_VALUE_OR_END:
+                            if pretty:
+                                append(newline(len(stack)))
+                        elif expect != _EXPECT_VALUE:
+                            raise error(f"意外的 {token}", start)
+                        if token == "{":
+                            objects += 1
+                            expect = _EXPECT_KEY_OR_END
+                        else:
+                            arrays += 1
+                            expect = _EXPECT_VALUE_OR_END
+                        if self.root_type is None:
+                            self.root_type = "dict" if token == "{" else "list"
+                        stack.append(token)
+                        sizes.append(0)
+                        if emit:
+                            append(token)
+                        continue
+                    
+                    if kind == _STRING and (expect == _EXPECT_KEY or expect == _EXPECT_KEY_OR_END):
+                        keys_count += 1
+                        if emit:
+                            if expect == _EXPECT_KEY_OR_END and pretty:
+                                append(newline(len(stack)))
+                            append(token if "\\" not in token else json.dumps(json.loads(token), ensure_ascii=False))
+                        expect = _EXPECT_COLON
+                        continue
+                    
+                    # 标量值
+                    if expect == _EXPECT_VALUE_OR_END:
+                        if pretty:
+                            append(newline(len(stack)))
+                    elif expect != _EXPECT_VALUE:
+                        raise error("缺少逗号或冒号" if expect != _EXPECT_DONE else "JSON值之后有多余的内容", start)
+                    if kind == _STRING:
+                        strings += 1
+                        if "\\" in token:
+                            size = _utf8_len(json.loads(token))
+                            if emit:
+                                token = json.dumps(json.loads(token), ensure_ascii=False)
+                        else:
+                            size = len(token) - 2 if token.isascii() else _utf8_len(token) - 2
+                        string_bytes += size
+                        if size > max_string_bytes:
+                            max_string_bytes = size
+                    elif kind == _NUMBER:
+                        numbers += 1
+                        if emit:
+                            token = _normalize_number(token)
+                    elif token == "null":
+                        nulls += 1
+                    else:
+                        booleans += 1
+                    if self.root_type is None:
+                        self.root_type = self._scalar_type(kind, token)
+                    if len(stack) > depth:
+                        depth = len(stack)
+                    if emit:
+                        append(token)
+                    expect = _EXPECT_COMMA_OR_END if stack else _EXPECT_DONE
+                
+                # 当前缓冲区已处理完，或剩余内容不构成完整的词法单元
+                rest = buf[pos:].lstrip(" \t\n\r")
+                if eof:
+                    if rest:
+                        raise error("无效的JSON内容", pos)
+                    break
+                if rest and _PARTIAL_TOKEN_RE.fullmatch(rest) is None:
+                    raise error("无效的JSON内容", pos)
+                
+                # 读取下一块（保留被截断的词法单元）
+                newlines = buf.count("\n", 0, pos)
+                if newlines:
+                    line += newlines
+                    line_start = buf_offset + buf.rfind("\n", 0, pos) + 1
+                buf_offset += pos
+                raw = f.read(STREAM_CHUNK_SIZE)
+                self.bytes_read += len(raw)
+                try:
+                    text = decoder.decode(raw, final=not raw)
+                except UnicodeDecodeError:
+                    raise JsonStreamError("文件不是有效的UTF-8编码", line, 1)
+                eof = not raw
+                buf = buf[pos:] + text
+                pos = 0
+                if emit and pieces:
+                    output.write("".join(pieces))
+                    pieces.clear()
+                if progress_callback and progress_callback(self.bytes_read):
+                    raise InterruptedError("处理已取消")
+        
+        if expect != _EXPECT_DONE:
+            raise error("JSON内容不完整" if self.root_type else "JSON内容为空", len(buf))
+        if emit:
+            output.write("".join(pieces))
+        self.structure.update(objects=objects, arrays=arrays, strings=strings,
+                              numbers=numbers, booleans=booleans, nulls=nulls)
+        self.keys_count = keys_count
+        self.depth = depth
+        self.longest_array = longest_array
+        self.largest_object = largest_object
+        self.string_bytes = string_bytes
+        self.max_string_bytes = max_string_bytes
+    
+    def stats(self) -> Dict[str, Any]:
+        """统计结果（字段与 analyze_json 一致）"""
+        return {
+            "keys_count": self.keys_count,
+            "depth": self.depth,
+            "structure": self.structure,
+            "longest_array": self.longest_array,
+            "largest_object": self.largest_object,
+            "string_bytes": self.string_bytes,
+            "max_string_bytes": self.max_string_bytes
+        }
+    
+    @staticmethod
+    def _scalar_type(kind: int, token: str) -> str:
+        """顶层标量值的类型名（与 json.loads 结果的类型名一致）"""
+        if kind == _STRING:
+            return "str"
+        if kind == _NUMBER:
+            return "float" if any(c in token for c in ".eE") else "int"
+        return "NoneType" if token == "null" else "bool"
+
+
+def empty_json_stats() -> Dict[str, Any]:
+    """全部为0的统计结果（字段与 analyze_json 一致），作为 merge_json_stats 的初始值"""
+    return {
+        "keys_count": 0,
+        "depth": 0,
+        "structure": {"objects": 0, "arrays": 0, "strings": 0, "numbers": 0, "booleans": 0, "nulls": 0},
+        "longest_array": 0,
+        "largest_object": 0,
+        "string_bytes": 0,
+        "max_string_bytes": 0
+    }
+
+
+def merge_json_stats(total: Dict[str, Any], stats: Dict[str, Any]) -> Dict[str, Any]:
+    """把一组 analyze_json 统计结果合并到total中（计数相加，最大值取较大者），返回total"""
+    for name in ("keys_count", "string_bytes"):
+        total[name] += stats[name]
+    for name in ("depth", "longest_array", "largest_object", "max_string_bytes"):
+        if stats[name] > total[name]:
+            total[name] = stats[name]
+    structure = total["structure"]
+    for name, count in stats["structure"].items():
+        structure[name] += count
+    return total
+
+
+def _ndjson_ranges(path: str, total_bytes: int, chunk_bytes: int) -> List[tuple]:
+    """把文件按约chunk_bytes切分为字节区间，每个区间都从行首开始、在行尾结束"""
+    ranges = []
+    start = 0
+    with open(path, "rb") as f:
+        while start < total_bytes:
+            target = start + max(chunk_bytes, 1)
+            if target >= total_bytes:
+                end = total_bytes
+            else:
+                # 从目标位置的前一个字节读到行尾：目标位置恰好是行首时也不会跳过整行
+                f.seek(target - 1)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _process_ndjson_range(path: str, start: int, end: int, output_path: Optional[str],
+                          options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    处理NDJSON文件中 [start, end) 字节区间内的所有行（模块级函数，供进程池调用）
+
+    每行独立解析；format/compress 把有效记录重新序列化为一行追加写入output_path，
+    query 把每条记录上的匹配值（或投影）各写为一行，schema_validate 按模式校验每条记录，
+    无效记录跳过并记录区间内的行号（从0开始）
+
+    Args:
+        options: {"operation", "sort_keys", "max_errors", "query", "projection", "schema", "schema_max_errors"}
+
+    Returns:
+        {"lines": 行数, "records": 有效记录数, "blank_lines": 空行数, "invalid_records": 无效记录数,
+         "errors": [(区间内行号, 列号, 错误信息)], "stats": 合并的结构统计, "matches": 查询匹配数,
+         "schema_invalid_records": 不符合模式的记录数, "schema_errors": [(区间内行号, 模式错误列表)]}
+    """
+    operation = options["operation"]
+    max_errors = options["max_errors"]
+    sort_keys = options.get("sort_keys", False)
+    if operation == "format":
+        separators = (", ", ": ")
+    else:
+        separators = (",", ":")
+    query = project = validator = None
+    if operation == "schema_validate":
+        # 编译结果按模式哈希缓存，同一进程处理后续区间时直接复用
+        validator = compile_schema(options["schema"])
+        schema_max_errors = options.get("schema_max_errors", 0)
+    if operation == "query":
+        # 编译结果按表达式缓存，同一进程处理后续区间时直接复用
+        query = compile_query(options["query"])
+        if options.get("projection"):
+            project = compile_projection(options["projection"])
+    dumps = json.dumps
+    loads = json.loads
+    lines = records = blank_lines = invalid_records = matches = schema_invalid_records = 0
+    errors = []
+    schema_errors = []
+    stats = empty_json_stats()
+    pieces = []
+    pending = 0
+
+    out = open(output_path, "ab") if output_path else None
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            pos = start
+            while pos < end:
+                raw = f.readline()
+                if not raw:
+                    break
+                pos += len(raw)
+                index = lines
+                lines += 1
+                if index == 0 and start == 0 and raw.startswith(codecs.BOM_UTF8):
+                    raw = raw[len(codecs.BOM_UTF8):]
+                if not raw.strip():
+                    blank_lines += 1
+                    continue
+                try:
+                    # 去掉行尾换行符，出错时的列号仍以本行为准
+                    obj = loads(raw.decode("utf-8").rstrip("\r\n"))
+                except UnicodeDecodeError:
+                    invalid_records += 1
+                    if len(errors) < max_errors:
+                        errors.append((index, None, "不是有效的UTF-8编码"))
+                    continue
+                except json.JSONDecodeError as e:
+                    invalid_records += 1
+                    if len(errors) < max_errors:
+                        errors.append((index, e.colno, e.msg))
+                    continue
+
+                records += 1
+                if validator:
+                    record_errors = validator.validate(obj, schema_max_errors)
+                    if record_errors:
+                        schema_invalid_records += 1
+                        if len(schema_errors) < max_errors:
+                            schema_errors.append((index, record_errors))
+                    continue
+                if query:
+                    values = query.apply_record(obj)
+                    matches += len(values)
+                    if project:
+                        values = [project(value) for value in values]
+                else:
+                    merge_json_stats(stats, analyze_json(obj))
+                    values = (obj,)
+                if out:
+                    for value in values:
+                        text = dumps(value, separators=separators, sort_keys=sort_keys, ensure_ascii=False)
+                        pieces.append(text)
+                        pending += len(text)
+                    if pending >= STREAM_CHUNK_SIZE:
+                        pieces.append("")
+                        out.write("\n".join(pieces).encode("utf-8"))
+                        pieces.clear()
+                        pending = 0
+        if out and pieces:
+            pieces.append("")
+            out.write("\n".join(pieces).encode("utf-8"))
+    finally:
+        if out:
+            out.close()
+
+    return {
+        "lines": lines,
+        "records": records,
+        "blank_lines": blank_lines,
+        "invalid_records": invalid_records,
+        "errors": errors,
+        "stats": stats,
+        "matches": matches,
+        "schema_invalid_records": schema_invalid_records,
+        "schema_errors": schema_errors
+    }
 
 
 class JsonFormatterPlugin(BasePlugin):
@@ -12,8 +578,8 @@ class JsonFormatterPlugin(BasePlugin):
     def __init__(self):
         super().__init__()
         self.name = "JsonFormatter"
-        self.version = "1.0.0"
-        self.description = "提供JSON格式化、压缩和验证功能"
+        self.version = "1.5.0"
+        self.description = "提供JSON格式化、压缩、验证、JSON Schema校验、路径查询和结构化差异/补丁功能，大文件和JSON Lines（NDJSON）文件可通过 input_file 流式处理"
     
     def get_parameters(self) -> List[Dict[str, Any]]:
         """定义插件参数"""
@@ -21,14 +587,102 @@ class JsonFormatterPlugin(BasePlugin):
             {
                 "name": "json_text",
                 "type": "string",
-                "required": True,
-                "description": "要处理的JSON文本"
+                "required": False,
+                "description": "要处理的JSON文本（与input_file二选一）"
+            },
+            {
+                "name": "input_file",
+                "type": "string",
+                "required": False,
+                "description": "要处理的JSON文件路径（上传后的路径），流式处理，结果写入outputs目录"
+            },
+            {
+                "name": "input_filename",
+                "type": "string",
+                "required": False,
+                "description": "输入文件的原始文件名，用于生成输出文件名和判断格式（通过API调用时由服务端根据上传记录自动填写）"
+            },
+            {
+                "name": "output_file",
+                "type": "string",
+                "required": False,
+                "description": "输出文件名（仅用于input_file），默认根据输入文件名生成"
+            },
+            {
+                "name": "input_format",
+                "type": "string",
+                "required": False,
+                "description": "输入文件格式（仅用于input_file）: auto(按扩展名判断，.ndjson/.jsonl为NDJSON), json, ndjson，默认auto",
+                "default": "auto"
             },
             {
                 "name": "operation",
                 "type": "string",
                 "required": True,
-                "description": "操作类型: format(格式化), compress(压缩), validate(验证)"
+                "description": "操作类型: format(格式化), compress(压缩), validate(验证), "
+                               "schema_validate(按JSON Schema校验), query(路径查询), "
+                               "diff(生成RFC 6902补丁), patch(应用补丁)"
+            },
+            {
+                "name": "schema",
+                "type": "string",
+                "required": False,
+                "description": "schema_validate使用的JSON Schema（对象或其JSON文本，与schema_file二选一），"
+                               "编译结果按模式哈希缓存"
+            },
+            {
+                "name": "schema_file",
+                "type": "string",
+                "required": False,
+                "description": "schema_validate使用的模式文件路径（上传后的路径）"
+            },
+            {
+                "name": "documents",
+                "type": "string",
+                "required": False,
+                "description": "schema_validate批量校验的文档数组（或其JSON文本），逐个校验并分别返回结果"
+            },
+            {
+                "name": "target_text",
+                "type": "string",
+                "required": False,
+                "description": "diff的目标JSON文本（与target_file二选一），json_text/input_file为源文档"
+            },
+            {
+                "name": "target_file",
+                "type": "string",
+                "required": False,
+                "description": "diff的目标JSON文件路径（上传后的路径）"
+            },
+            {
+                "name": "target_filename",
+                "type": "string",
+                "required": False,
+                "description": "目标文件的原始文件名，只有target_file时用于生成输出文件名（通过API调用时由服务端自动填写）"
+            },
+            {
+                "name": "patch",
+                "type": "string",
+                "required": False,
+                "description": "patch要应用的RFC 6902补丁（操作数组或其JSON文本，与patch_file二选一）"
+            },
+            {
+                "name": "patch_file",
+                "type": "string",
+                "required": False,
+                "description": "patch要应用的补丁文件路径（上传后的路径）"
+            },
+            {
+                "name": "query",
+                "type": "string",
+                "required": False,
+                "description": "JSONPath查询表达式（仅用于query），如 $.items[?(@.price < 10)].name"
+            },
+            {
+                "name": "projection",
+                "type": "dict",
+                "required": False,
+                "description": "投影（仅用于query），{输出字段名: 相对路径}，如 {\"id\": \"@.id\", \"city\": \"@.address.city\"}"
             },
             {
                 "name": "indent",
@@ -46,11 +700,28 @@ class JsonFormatterPlugin(BasePlugin):
             }
         ]
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """文本处理的结果只由参数决定，可以缓存；涉及文件的处理会读取文件内容或写出输出文件，不缓存"""
+        if params.get("input_file") or params.get("target_file") or params.get("patch_file") \
+                or params.get("schema_file"):
+            return None
+        return {}
+    
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行JSON处理"""
         if params is None:
             params = {}
         
+        operation = str(params.get("operation", "")).lower()
+        if operation == "diff":
+            return self._diff(params)
+        if operation == "patch":
+            return self._patch(params)
+        if operation == "schema_validate":
+            return self._schema_validate(params)
+        if params.get("input_file"):
+            return self._process_file(params)
+        
         try:
             json_text = params.get("json_text", "")
             operation = params.get("operation", "").lower()
@@ -74,6 +745,12 @@ class JsonFormatterPlugin(BasePlugin):
                     "message": f"JSON格式错误: {str(e)}"
                 }
             
+            if operation == "query":
+                return self._query_object(json_obj, params)
+            
+            # 键数、深度和结构统计在一次遍历中完成
+            stats = analyze_json(json_obj)
+            
             if operation == "format":
                 # 格式化JSON
                 result = json.dumps(json_obj, indent=indent, sort_keys=sort_keys, ensure_ascii=False)
@@ -84,8 +761,7 @@ class JsonFormatterPlugin(BasePlugin):
                         "result": result,
                         "original_size": len(json_text),
                         "formatted_size": len(result),
-                        "keys_count": self._count_keys(json_obj),
-                        "depth": self._get_depth(json_obj)
+                        **stats
                     },
                     "message": "格式化成功"
                 }
@@ -101,8 +777,7 @@ class JsonFormatterPlugin(BasePlugin):
                         "original_size": len(json_text),
                         "compressed_size": len(result),
                         "compression_ratio": f"{(1 - len(result) / len(json_text)) * 100:.2f}%",
-                        "keys_count": self._count_keys(json_obj),
-                        "depth": self._get_depth(json_obj)
+                        **stats
                     },
                     "message": "压缩成功"
                 }
@@ -115,9 +790,7 @@ class JsonFormatterPlugin(BasePlugin):
                         "valid": True,
                         "type": type(json_obj).__name__,
                         "size": len(json_text),
-                        "keys_count": self._count_keys(json_obj),
-                        "depth": self._get_depth(json_obj),
-                        "structure": self._analyze_structure(json_obj)
+                        **stats
                     },
                     "message": "JSON格式正确"
                 }
@@ -126,7 +799,7 @@ class JsonFormatterPlugin(BasePlugin):
                 return {
                     "success": False,
                     "data": None,
-                    "message": f"不支持的操作: {operation}。支持的操作: format, compress, validate"
+                    "message": f"不支持的操作: {operation}。支持的操作: format, compress, validate, schema_validate, query, diff, patch"
                 }
             
         except Exception as e:
@@ -136,57 +809,620 @@ class JsonFormatterPlugin(BasePlugin):
                 "message": f"处理失败: {str(e)}"
             }
     
-    def _count_keys(self, obj: Any, count: int = 0) -> int:
-        """递归统计JSON中的键数量"""
-        if isinstance(obj, dict):
-            count += len(obj)
-            for value in obj.values():
-                count = self._count_keys(value, count)
-        elif isinstance(obj, list):
-            for item in obj:
-                count = self._count_keys(item, count)
-        return count
-    
-    def _get_depth(self, obj: Any, current_depth: int = 0) -> int:
-        """获取JSON的最大深度"""
-        if isinstance(obj, dict):
-            if not obj:
-                return current_depth
-            return max(self._get_depth(v, current_depth + 1) for v in obj.values())
-        elif isinstance(obj, list):
-            if not obj:
-                return current_depth
-            return max(self._get_depth(item, current_depth + 1) for item in obj)
-        return current_depth
-    
-    def _analyze_structure(self, obj: Any) -> Dict[str, int]:
-        """分析JSON结构"""
-        structure = {
-            "objects": 0,
-            "arrays": 0,
-            "strings": 0,
-            "numbers": 0,
-            "booleans": 0,
-            "nulls": 0
+    def _process_file(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        流式处理JSON文件：边读取边校验，格式化/压缩结果直接写入outputs目录，
+        键数、深度和结构统计在同一遍扫描中完成
+        """
+        input_file = params.get("input_file")
+        operation = params.get("operation", "").lower()
+        if not os.path.isfile(input_file):
+            return self._error("输入文件不存在")
+        if operation not in ("format", "compress", "validate", "query"):
+            return self._error(f"不支持的操作: {operation}。文件模式支持的操作: format, compress, validate, query")
+        if operation == "query":
+            # 查询表达式在读取文件之前编译，语法错误立即返回
+            try:
+                self._compile_query_params(params)
+            except JsonQueryError as e:
+                return self._error(str(e))
+        
+        input_format = self._input_format(params, input_file)
+        if input_format == "ndjson":
+            return self._process_ndjson_file(params, input_file, operation)
+        if input_format != "json":
+            return self._error(f"不支持的输入格式: {input_format}。支持的格式: auto, json, ndjson")
+        if operation == "query":
+            return self._query_file(params, input_file)
+        
+        if operation == "format" and params.get("sort_keys"):
+            return self._error("文件流式格式化不支持 sort_keys，请使用 json_text 方式处理")
+        
+        try:
+            indent = int(params.get("indent", 4))
+        except (TypeError, ValueError):
+            return self._error("indent 必须是整数")
+        
+        total_bytes = os.path.getsize(input_file)
+        processor = JsonStreamProcessor(indent=indent, compact=operation == "compress")
+        on_progress = self._progress_callback(total_bytes)
+        
+        output_file = output_path = temp_path = None
+        if operation != "validate":
+            suffix = "formatted" if operation == "format" else "compressed"
+            output_file = os.path.basename(params.get("output_file") or "") or \
+                f"{self._input_stem(params)}_{suffix}.json"
+            output_path = os.path.join("outputs", output_file)
+            os.makedirs("outputs", exist_ok=True)
+            temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+        
+        started = time.time()
+        try:
+            if temp_path:
+                with open(temp_path, "w", encoding="utf-8", newline="\n") as out:
+                    processor.process(input_file, out, on_progress)
+                os.replace(temp_path, output_path)
+            else:
+                processor.process(input_file, None, on_progress)
+        except JsonStreamError as e:
+            result = self._error(f"JSON格式错误: {str(e)}")
+            if operation == "validate":
+                result["data"] = {"valid": False, "line": e.line, "column": e.column, "size": total_bytes}
+            return result
+        except InterruptedError as e:
+            return self._error(str(e))
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        data = {
+            "original_size": total_bytes,
+            **processor.stats(),
+            "elapsed": round(time.time() - started, 3)
+        }
+        if operation == "validate":
+            data.update({"valid": True, "type": processor.root_type, "size": total_bytes})
+            return {"success": True, "data": data, "message": "JSON格式正确"}
+        
+        output_size = os.path.getsize(output_path)
+        data.update({"output_file": output_file, "output_path": output_path})
+        if operation == "format":
+            data["formatted_size"] = output_size
+            message = "格式化成功"
+        else:
+            data["compressed_size"] = output_size
+            data["compression_ratio"] = f"{(1 - output_size / total_bytes) * 100:.2f}%" if total_bytes else "0.00%"
+            message = "压缩成功"
+        return {"success": True, "data": data, "message": message}
+    
+    def _process_ndjson_file(self, params: Dict[str, Any], input_file: str, operation: str,
+                             schema: Any = None) -> Dict[str, Any]:
+        """
+        处理JSON Lines（NDJSON）文件：每行一条记录，文件按行边界切分为若干区间交给进程池并行解析，
+        format/compress 的结果按区间顺序拼接写入outputs目录（每条记录仍占一行，无效记录跳过），
+        返回合并的统计信息和无效记录的行号；schema_validate 时每条记录按schema校验
+        """
+        if operation == "query" and not self._compile_query_params(params)[0].record_wise:
+            return self._error("NDJSON文件按记录数组查询，$ 表示全部记录：不支持按下标、切片或并集选择记录，"
+                               "过滤条件中也不能引用 $")
+        
+        total_bytes = os.path.getsize(input_file)
+        max_errors = max(0, getattr(config, 'JSON_NDJSON_MAX_ERRORS', 1000))
+        options = {
+            "operation": operation,
+            "sort_keys": bool(params.get("sort_keys", False)),
+            "max_errors": max_errors,
+            "query": params.get("query"),
+            "projection": params.get("projection"),
+            "schema": schema,
+            "schema_max_errors": max(0, getattr(config, 'JSON_SCHEMA_MAX_ERRORS', 100))
+        }
+        chunk_bytes = max(1, getattr(config, 'JSON_NDJSON_CHUNK_BYTES', 8 * 1024 * 1024))
+        ranges = _ndjson_ranges(input_file, total_bytes, chunk_bytes)
+        job = get_current_job()
+        
+        output_file = output_path = temp_path = None
+        if operation not in ("validate", "schema_validate"):
+            suffix = {"format": "formatted", "compress": "compressed", "query": "query"}[operation]
+            output_file = os.path.basename(params.get("output_file") or "") or \
+                f"{self._input_stem(params)}_{suffix}.ndjson"
+            output_path = os.path.join("outputs", output_file)
+            os.makedirs("outputs", exist_ok=True)
+            temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+            # 先创建空文件，没有有效记录时也有输出
+            open(temp_path, "wb").close()
+        
+        started = time.time()
+        lines = records = blank_lines = invalid_records = matches = schema_invalid_records = 0
+        invalid_lines = []
+        schema_errors = []
+        stats = empty_json_stats()
+        results = self._iter_ndjson_ranges(input_file, ranges, temp_path, options)
+        try:
+            for chunk, processed_bytes in results:
+                for index, column, message in chunk["errors"]:
+                    if len(invalid_lines) >= max_errors:
+                        break
+                    invalid_lines.append({"line": lines + index + 1, "column": column, "message": message})
+                for index, errors in chunk["schema_errors"]:
+                    if len(schema_errors) >= max_errors:
+                        break
+                    schema_errors.append({"line": lines + index + 1, "errors": errors})
+                lines += chunk["lines"]
+                records += chunk["records"]
+                blank_lines += chunk["blank_lines"]
+                invalid_records += chunk["invalid_records"]
+                matches += chunk["matches"]
+                schema_invalid_records += chunk["schema_invalid_records"]
+                merge_json_stats(stats, chunk["stats"])
+                
+                if job:
+                    job.update_progress(
+                        processed_bytes=processed_bytes,
+                        total_bytes=total_bytes,
+                        percent=round(processed_bytes * 100 / total_bytes, 1) if total_bytes else 100.0,
+                        records=records,
+                        invalid_records=invalid_records
+                    )
+                    if job.cancel_requested:
+                        return self._error("处理已取消")
+            if temp_path:
+                os.replace(temp_path, output_path)
+        finally:
+            results.close()
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        data = {
+            "input_format": "ndjson",
+            "original_size": total_bytes,
+            "lines": lines,
+            "records": records,
+            "blank_lines": blank_lines,
+            "invalid_records": invalid_records,
+            "invalid_lines": invalid_lines,
+            "invalid_lines_truncated": invalid_records > len(invalid_lines),
+            "chunks": len(ranges),
+            "elapsed": round(time.time() - started, 3)
+        }
+        
+        if operation == "query":
+            data.update(self._query_output(output_file, output_path, matches))
+            message = f"查询完成，共 {matches} 个匹配"
+            if invalid_records:
+                message += f"，已跳过 {invalid_records} 条无效记录"
+            return {"success": True, "data": data, "message": message}
+        
+        if operation == "schema_validate":
+            data.update({
+                "valid": invalid_records == 0 and schema_invalid_records == 0,
+                "schema_hash": compile_schema(schema).schema_hash,
+                "schema_invalid_records": schema_invalid_records,
+                "schema_errors": schema_errors,
+                "schema_errors_truncated": schema_invalid_records > len(schema_errors)
+            })
+            if not data["valid"]:
+                problems = []
+                if invalid_records:
+                    problems.append(f"{invalid_records} 条无效记录")
+                if schema_invalid_records:
+                    problems.append(f"{schema_invalid_records} 条记录不符合模式")
+                return {"success": False, "data": data, "message": f"发现 {'，'.join(problems)}"}
+            return {"success": True, "data": data, "message": f"全部 {records} 条记录符合模式"}
+        
+        data.update(stats)
+        
+        if operation == "validate":
+            data.update({"valid": invalid_records == 0, "size": total_bytes})
+            if invalid_records:
+                return {"success": False, "data": data, "message": f"发现 {invalid_records} 条无效记录"}
+            return {"success": True, "data": data, "message": "JSON Lines格式正确"}
+        
+        output_size = os.path.getsize(output_path)
+        data.update({"output_file": output_file, "output_path": output_path})
+        if operation == "format":
+            data["formatted_size"] = output_size
+            message = "格式化成功"
+        else:
+            data["compressed_size"] = output_size
+            data["compression_ratio"] = f"{(1 - output_size / total_bytes) * 100:.2f}%" if total_bytes else "0.00%"
+            message = "压缩成功"
+        if invalid_records:
+            message += f"，已跳过 {invalid_records} 条无效记录"
+        return {"success": True, "data": data, "message": message}
+    
+    def _iter_ndjson_ranges(self, input_file: str, ranges: List[tuple], output_path: Optional[str],
+                            options: Dict[str, Any]):
+        """
+        按区间顺序产出 (区间处理结果, 已处理到的字节偏移)
+        区间较多时交给进程池并行处理，每个区间先写入单独的分片文件，再按顺序追加到output_path
+        """
+        workers = getattr(config, 'JSON_NDJSON_WORKERS', 0) or os.cpu_count() or 1
+        
+        # 区间太少时多进程的启动开销大于收益，直接在当前进程处理
+        if workers <= 1 or len(ranges) <= 2:
+            for start, end in ranges:
+                yield _process_ndjson_range(input_file, start, end, output_path, options), end
+            return
+        
+        # 请求在多线程服务器的线程中处理，fork 出的子进程可能继承其他线程持有的锁（日志、SQLite）而死锁，
+        # 因此用 spawn 启动工作进程；区间处理函数是模块级函数，可以在新进程中按模块名导入
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # 最多提前提交 workers*2 个区间，未合并的分片文件数量保持有界
+            futures = deque()
+            next_range = 0
+            try:
+                while next_range < len(ranges) or futures:
+                    while next_range < len(ranges) and len(futures) < workers * 2:
+                        start, end = ranges[next_range]
+                        part_path = f"{output_path}.{next_range}.part" if output_path else None
+                        future = executor.submit(_process_ndjson_range, input_file, start, end,
+                                                 part_path, options)
+                        futures.append((future, part_path, end))
+                        next_range += 1
+                    
+                    future, part_path, end = futures[0]
+                    chunk = future.result()
+                    futures.popleft()
+                    if part_path:
+                        with open(part_path, "rb") as src, open(output_path, "ab") as dst:
+                            shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+                        os.remove(part_path)
+                    yield chunk, end
+            finally:
+                # 取消或出错时取消尚未开始的区间，等待进行中的区间结束后清理分片文件
+                for future, _, _ in futures:
+                    future.cancel()
+                for future, part_path, _ in futures:
+                    if part_path and not future.cancelled():
+                        try:
+                            future.result()
+                        except Exception:
+                            pass
+                    if part_path and os.path.exists(part_path):
+                        os.remove(part_path)
+    
+    def _query_object(self, json_obj: Any, params: Dict[str, Any]) -> Dict[str, Any]:
+        """在已解析的文档上执行查询，匹配值直接返回"""
+        try:
+            query, project = self._compile_query_params(params)
+        except JsonQueryError as e:
+            return self._error(str(e))
+        
+        matches = query.apply(json_obj)
+        if project:
+            matches = [project(value) for value in matches]
+        return {
+            "success": True,
+            "data": {
+                "query": query.expression,
+                "matches": matches,
+                "count": len(matches)
+            },
+            "message": f"查询完成，共 {len(matches)} 个匹配"
+        }
+    
+    def _query_file(self, params: Dict[str, Any], input_file: str) -> Dict[str, Any]:
+        """
+        流式查询JSON文件：沿查询路径逐层进入，只解码匹配路径上的子树，
+        每个匹配值（或投影）写为结果文件中的一行
+        """
+        query, project = self._compile_query_params(params)
+        total_bytes = os.path.getsize(input_file)
+        output_file = os.path.basename(params.get("output_file") or "") or \
+            f"{self._input_stem(params)}_query.ndjson"
+        output_path = os.path.join("outputs", output_file)
+        os.makedirs("outputs", exist_ok=True)
+        temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+        
+        matches = 0
+        started = time.time()
+        try:
+            with open(temp_path, "w", encoding="utf-8", newline="\n") as out, open(input_file, "rb") as f:
+                def emit(value):
+                    nonlocal matches
+                    matches += 1
+                    if project:
+                        value = project(value)
+                    out.write(json.dumps(value, separators=(",", ":"), ensure_ascii=False))
+                    out.write("\n")
+                
+                query.stream(f, emit, self._progress_callback(total_bytes))
+            os.replace(temp_path, output_path)
+        except JsonSyntaxError as e:
+            return self._error(f"JSON格式错误: {str(e)}")
+        except InterruptedError as e:
+            return self._error(str(e))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        data = {
+            "query": query.expression,
+            "original_size": total_bytes,
+            **self._query_output(output_file, output_path, matches),
+            "elapsed": round(time.time() - started, 3)
+        }
+        return {"success": True, "data": data, "message": f"查询完成，共 {matches} 个匹配"}
+    
+    def _diff(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        生成把源文档变为目标文档的RFC 6902补丁；两个文件都给出时补丁同时写入outputs目录，
+        结果包含各类操作数、文档和补丁大小以及解析和比较的耗时
+        """
+        started = time.time()
+        try:
+            source, source_size = self._load_json(params, "json_text", "input_file", "源文档")
+            target, target_size = self._load_json(params, "target_text", "target_file", "目标文档")
+        except ValueError as e:
+            return self._error(str(e))
+        parsed = time.time()
+        
+        try:
+            patch = diff_json(source, target)
+        except JsonPatchError as e:
+            return self._error(f"比较失败: {str(e)}")
+        finished = time.time()
+        
+        patch_text = json.dumps(patch, separators=(",", ":"), ensure_ascii=False)
+        op_counts = {}
+        for operation in patch:
+            op_counts[operation["op"]] = op_counts.get(operation["op"], 0) + 1
+        data = {
+            "identical": not patch,
+            "operations": len(patch),
+            "op_counts": op_counts,
+            "source_size": source_size,
+            "target_size": target_size,
+            "patch_size": len(patch_text.encode("utf-8")),
+            "elapsed": {
+                "parse": round(parsed - started, 3),
+                "diff": round(finished - parsed, 3)
+            }
+        }
+        
+        if params.get("input_file") or params.get("target_file"):
+            # 文件比较：补丁写入outputs目录，操作数不超过上限时同时直接返回
+            output_file = os.path.basename(params.get("output_file") or "") or \
+                f"{self._input_stem(params, 'input_file' if params.get('input_file') else 'target_file')}_diff.json"
+            output_path = os.path.join("outputs", output_file)
+            os.makedirs("outputs", exist_ok=True)
+            temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+            try:
+                with open(temp_path, "w", encoding="utf-8", newline="\n") as out:
+                    out.write(patch_text)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            limit = max(0, getattr(config, 'JSON_PATCH_MAX_INLINE_OPS', 1000))
+            data.update({
+                "patch": patch[:limit],
+                "patch_truncated": len(patch) > limit,
+                "output_file": output_file,
+                "output_path": output_path
+            })
+        else:
+            data["patch"] = patch
+        
+        message = "两个文档相同" if not patch else f"比较完成，共 {len(patch)} 个操作"
+        return {"success": True, "data": data, "message": message}
+    
+    def _patch(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """按顺序应用RFC 6902补丁，文件输入时结果写入outputs目录"""
+        started = time.time()
+        try:
+            indent = int(params.get("indent", 4))
+        except (TypeError, ValueError):
+            return self._error("indent 必须是整数")
+        try:
+            document, source_size = self._load_json(params, "json_text", "input_file", "文档")
+            patch = params.get("patch")
+            if isinstance(patch, str) or params.get("patch_file"):
+                patch, _ = self._load_json(params, "patch", "patch_file", "补丁")
+            elif patch is None:
+                return self._error("补丁不能为空，请提供 patch 或 patch_file")
+        except ValueError as e:
+            return self._error(str(e))
+        
+        try:
+            result = apply_patch(document, patch)
+        except JsonPatchError as e:
+            return self._error(f"补丁应用失败: {str(e)}")
+        
+        data = {
+            "operations": len(patch),
+            "source_size": source_size
+        }
+        if params.get("input_file"):
+            output_file = os.path.basename(params.get("output_file") or "") or \
+                f"{self._input_stem(params)}_patched.json"
+            output_path = os.path.join("outputs", output_file)
+            os.makedirs("outputs", exist_ok=True)
+            temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+            try:
+                with open(temp_path, "w", encoding="utf-8", newline="\n") as out:
+                    json.dump(result, out, indent=indent, ensure_ascii=False)
+                os.replace(temp_path, output_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            data.update({
+                "output_file": output_file,
+                "output_path": output_path,
+                "result_size": os.path.getsize(output_path)
+            })
+        else:
+            text = json.dumps(result, indent=indent, ensure_ascii=False)
+            data.update({"result": text, "result_size": len(text.encode("utf-8"))})
+        data["elapsed"] = round(time.time() - started, 3)
+        return {"success": True, "data": data, "message": f"补丁应用成功，共 {len(patch)} 个操作"}
+    
+    def _schema_validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按JSON Schema校验单个文档（json_text/input_file）、一批文档（documents）或NDJSON文件的每条记录，
+        模式编译后按哈希缓存，所有错误以JSON Pointer指出位置
+        """
+        started = time.time()
+        try:
+            schema = params.get("schema")
+            if isinstance(schema, str) or params.get("schema_file"):
+                schema, _ = self._load_json(params, "schema", "schema_file", "模式")
+            elif schema is None:
+                return self._error("模式不能为空，请提供 schema 或 schema_file")
+            validator = compile_schema(schema)
+        except ValueError as e:
+            # JsonSchemaError 是 ValueError 的子类
+            prefix = "模式无效: " if isinstance(e, JsonSchemaError) else ""
+            return self._error(f"{prefix}{str(e)}")
+        max_errors = max(0, getattr(config, 'JSON_SCHEMA_MAX_ERRORS', 100))
+        
+        documents = params.get("documents")
+        if documents is not None:
+            if isinstance(documents, str):
+                try:
+                    documents = json.loads(documents)
+                except json.JSONDecodeError as e:
+                    return self._error(f"文档数组JSON格式错误: {str(e)}")
+            if not isinstance(documents, list):
+                return self._error("documents 必须是文档数组")
+            results = []
+            invalid = 0
+            for index, document in enumerate(documents):
+                errors = validator.validate(document, max_errors)
+                if errors:
+                    invalid += 1
+                results.append({"index": index, "valid": not errors, "errors": errors})
+            data = {
+                "valid": invalid == 0,
+                "schema_hash": validator.schema_hash,
+                "documents": len(documents),
+                "invalid_documents": invalid,
+                "results": results,
+                "elapsed": round(time.time() - started, 3)
+            }
+            if invalid:
+                return {"success": False, "data": data, "message": f"{len(documents)} 个文档中有 {invalid} 个不符合模式"}
+            return {"success": True, "data": data, "message": f"全部 {len(documents)} 个文档符合模式"}
+        
+        input_file = params.get("input_file")
+        if input_file and os.path.isfile(input_file):
+            input_format = self._input_format(params, input_file)
+            if input_format == "ndjson":
+                return self._process_ndjson_file(params, input_file, "schema_validate", schema)
+            if input_format != "json":
+                return self._error(f"不支持的输入格式: {input_format}。支持的格式: auto, json, ndjson")
+        
+        try:
+            document, size = self._load_json(params, "json_text", "input_file", "文档")
+        except ValueError as e:
+            return self._error(str(e))
+        errors = validator.validate(document)
+        data = {
+            "valid": not errors,
+            "schema_hash": validator.schema_hash,
+            "size": size,
+            "errors": errors[:max_errors] if max_errors else errors,
+            "error_count": len(errors),
+            "errors_truncated": bool(max_errors) and len(errors) > max_errors,
+            "elapsed": round(time.time() - started, 3)
+        }
+        if errors:
+            return {"success": False, "data": data, "message": f"文档不符合模式，发现 {len(errors)} 个错误"}
+        return {"success": True, "data": data, "message": "文档符合模式"}
+    
+    @staticmethod
+    def _load_json(params: Dict[str, Any], text_key: str, file_key: str, label: str) -> tuple:
+        """
+        从文本参数或文件参数读取并解析JSON，返回 (对象, UTF-8字节数)；
+        缺少参数、文件不存在或解析失败时抛出 ValueError（信息可直接返回给调用方）
+        """
+        path = params.get(file_key)
+        if path:
+            if not os.path.isfile(path):
+                raise ValueError(f"{label}文件不存在: {path}")
+            try:
+                with open(path, "r", encoding="utf-8-sig") as f:
+                    return json.load(f), os.path.getsize(path)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{label}JSON格式错误: {str(e)}")
+            except UnicodeDecodeError:
+                raise ValueError(f"{label}文件不是有效的UTF-8编码")
+        
+        text = params.get(text_key)
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"{label}不能为空，请提供 {text_key} 或 {file_key}")
+        try:
+            return json.loads(text), len(text.encode("utf-8"))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{label}JSON格式错误: {str(e)}")
+    
+    @staticmethod
+    def _compile_query_params(params: Dict[str, Any]) -> tuple:
+        """编译 query 和 projection 参数（编译结果按表达式缓存），返回 (查询, 投影函数或None)"""
+        query = compile_query(params.get("query") or "")
+        projection = params.get("projection")
+        return query, compile_projection(projection) if projection else None
+    
+    @staticmethod
+    def _query_output(output_file: str, output_path: str, matches: int) -> Dict[str, Any]:
+        """文件查询的结果：匹配数、结果文件，以及不超过 JSON_QUERY_MAX_INLINE 个直接返回的匹配值"""
+        limit = max(0, getattr(config, 'JSON_QUERY_MAX_INLINE', 1000))
+        inline = []
+        if limit:
+            with open(output_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    inline.append(json.loads(line))
+                    if len(inline) >= limit:
+                        break
+        return {
+            "count": matches,
+            "matches": inline,
+            "matches_truncated": matches > len(inline),
+            "output_file": output_file,
+            "output_path": output_path,
+            "output_size": os.path.getsize(output_path)
         }
+    
+    @staticmethod
+    def _progress_callback(total_bytes: int):
+        """生成流式处理的进度回调：上报已处理字节数，返回True表示任务已请求取消"""
+        job = get_current_job()
         
-        def analyze(item):
-            if isinstance(item, dict):
-                structure["objects"] += 1
-                for value in item.values():
-                    analyze(value)
-            elif isinstance(item, list):
-                structure["arrays"] += 1
-                for element in item:
-                    analyze(element)
-            elif isinstance(item, str):
-                structure["strings"] += 1
-            elif isinstance(item, (int, float)):
-                structure["numbers"] += 1
-            elif isinstance(item, bool):
-                structure["booleans"] += 1
-            elif item is None:
-                structure["nulls"] += 1
-        
-        analyze(obj)
-        return structure
+        def on_progress(bytes_read: int) -> bool:
+            if job:
+                job.update_progress(
+                    processed_bytes=bytes_read,
+                    total_bytes=total_bytes,
+                    percent=round(bytes_read * 100 / total_bytes, 1) if total_bytes else 100.0
+                )
+                return job.cancel_requested
+            return False
+        return on_progress
+    
+    @staticmethod
+    def _input_format(params: Dict[str, Any], input_file: str) -> str:
+        """输入文件格式：input_format 为 auto 时按原始文件扩展名判断，.ndjson/.jsonl 为NDJSON"""
+        input_format = str(params.get("input_format") or "auto").lower()
+        if input_format == "auto":
+            suffix = Path(params.get("input_filename") or input_file).suffix.lower()
+            input_format = "ndjson" if suffix in (".ndjson", ".jsonl") else "json"
+        return input_format
+    
+    @staticmethod
+    def _input_stem(params: Dict[str, Any], file_key: str = "input_file") -> str:
+        """
+        输入文件的原始文件名（不含扩展名）：上传的文件按内容哈希保存，
+        原始文件名由API层以对应的 *_filename 参数传入（input_file -> input_filename）
+        """
+        name_key = file_key[:-len("_file")] + "_filename"
+        return Path(params.get(name_key) or params.get(file_key)).stem
+    
+    @staticmethod
+    def _error(message: str) -> Dict[str, Any]:
+        """返回错误信息"""
+        return {
+            "success": False,
+            "data": None,
+            "message": message
+        }
@@ -2,12 +2,12 @@
 示例插件 - 系统信息工具
 """
 from backend.base_plugin import BasePlugin
+from backend.capabilities import get_capability_registry
 from typing import Dict, Any, List
 import platform
 import os
 from datetime import datetime
 import psutil
-import subprocess
 
 
 class SystemInfoPlugin(BasePlugin):
@@ -135,39 +135,12 @@ class SystemInfoPlugin(BasePlugin):
             return {"error": f"获取内存信息失败: {str(e)}"}
     
     def _get_gpu_info(self) -> Dict[str, Any]:
-        """获取显卡信息"""
-        gpu_info = {}
-        try:
-            # 尝试使用nvidia-smi获取NVIDIA显卡信息
-            result = subprocess.run(
-                ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                lines = result.stdout.strip().split('\n')
-                if lines:
-                    parts = lines[0].split(',')
-                    if len(parts) >= 2:
-                        gpu_info["model"] = parts[0].strip()
-                        memory_str = parts[1].strip()
-                        try:
-                            memory_mb = float(memory_str.split()[0])
-                            memory_gb = round(memory_mb / 1024, 1)
-                            gpu_info["memory"] = f"{memory_gb} GB"
-                        except:
-                            gpu_info["memory"] = memory_str
-                        return gpu_info
-            
-            # 如果nvidia-smi失败，返回基本信息
-            gpu_info["model"] = "未检测到独立显卡或驱动未安装"
-            return gpu_info
-            
-        except (FileNotFoundError, subprocess.TimeoutExpired, Exception):
-            gpu_info["model"] = "未检测到独立显卡或驱动未安装"
-            return gpu_info
+        """获取显卡信息（使用能力注册表中缓存的nvidia-smi探测结果）"""
+        gpus = get_capability_registry().get()["nvidia_gpus"]
+        if gpus:
+            return dict(gpus[0])
+        
+        return {"model": "未检测到独立显卡或驱动未安装"}
     
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """获取系统信息"""
@@ -2,7 +2,99 @@
 示例插件 - 文本处理工具
 """
 from backend.base_plugin import BasePlugin
-from typing import Dict, Any, List
+from backend.job_manager import get_current_job
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+import codecs
+import os
+import re
+import time
+import uuid
+
+
+# 流式处理每次读取的字节数
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# 单词（与 str.split() 相同，\s 即 str.isspace() 为真的字符）
+_WORD_RE = re.compile(r"\S+")
+# 除 \n、\r 之外 str.splitlines() 认作行边界的字符（\r\n 计为一个行边界）
+_ASCII_LINE_BREAKS = ("\v", "\f", "\x1c", "\x1d", "\x1e")
+_UNICODE_LINE_BREAKS = ("\x85", "\u2028", "\u2029")
+_LINE_BREAK_CHARS = "\n\r" + "".join(_ASCII_LINE_BREAKS + _UNICODE_LINE_BREAKS)
+
+
+class TextCounter:
+    """
+    增量统计字符数、单词数和行数，结果与 len(text)、len(text.split())、len(text.splitlines()) 相同；
+    文本可以分块送入，跨块的单词和 \\r\\n 只计一次，不构建任何列表
+    """
+
+    def __init__(self):
+        self.length = 0
+        self.words = 0
+        self.line_breaks = 0
+        self._last = ""
+
+    def feed(self, text: str):
+        if not text:
+            return
+        self.length += len(text)
+        # subn 在C中完成计数，替换结果只是与块大小相当的临时字符串
+        self.words += _WORD_RE.subn("", text)[1]
+        # 行边界用 str.count 逐个字符计数，比正则快得多
+        breaks = text.count("\n") + text.count("\r") - text.count("\r\n")
+        for char in _ASCII_LINE_BREAKS:
+            breaks += text.count(char)
+        if not text.isascii():
+            for char in _UNICODE_LINE_BREAKS:
+                breaks += text.count(char)
+        self.line_breaks += breaks
+        if self._last and not self._last.isspace() and not text[0].isspace():
+            # 单词跨越了块边界
+            self.words -= 1
+        if self._last == "\r" and text[0] == "\n":
+            # \r\n 被块边界分开
+            self.line_breaks -= 1
+        self._last = text[-1]
+
+    def result(self) -> Dict[str, int]:
+        # 最后一行没有换行符时也算一行
+        trailing = 1 if self._last and self._last not in _LINE_BREAK_CHARS else 0
+        return {
+            "length": self.length,
+            "words": self.words,
+            "lines": self.line_breaks + trailing
+        }
+
+
+class WordAlignedBuffer:
+    """
+    把分块送入的文本在最后一个空白处重新切分后交给 handle，单词不会被块边界切开：
+    希腊字母 Σ 转小写时是否为词尾形式 ς 取决于前后的字符，逐块 lower() 时必须看到整个单词；
+    超过 MAX_CARRY 个字符仍没有空白时直接交出，内存占用保持有界
+    """
+
+    MAX_CARRY = 64 * 1024
+
+    def __init__(self, handle):
+        self.handle = handle
+        self._carry = ""
+
+    def feed(self, text: str):
+        if not text:
+            return
+        text = self._carry + text
+        cut = max(text.rfind(" "), text.rfind("\n"), text.rfind("\t"), text.rfind("\r")) + 1
+        if len(text) - cut > self.MAX_CARRY:
+            cut = len(text)
+        self._carry = text[cut:]
+        if cut:
+            self.handle(text[:cut])
+
+    def flush(self):
+        if self._carry:
+            self.handle(self._carry)
+            self._carry = ""
 
 
 class TextToolPlugin(BasePlugin):
@@ -11,8 +103,8 @@ class TextToolPlugin(BasePlugin):
     def __init__(self):
         super().__init__()
         self.name = "TextTool"
-        self.version = "1.0.0"
-        self.description = "提供文本处理功能，包括大小写转换、反转、统计等"
+        self.version = "1.1.0"
+        self.description = "提供文本处理功能，包括大小写转换、反转、统计等，大文件可通过 input_file 流式处理"
     
     def get_parameters(self) -> List[Dict[str, Any]]:
         """定义插件参数"""
@@ -20,8 +112,26 @@ class TextToolPlugin(BasePlugin):
             {
                 "name": "text",
                 "type": "string",
-                "required": True,
-                "description": "要处理的文本"
+                "required": False,
+                "description": "要处理的文本（与input_file二选一）"
+            },
+            {
+                "name": "input_file",
+                "type": "string",
+                "required": False,
+                "description": "要处理的UTF-8文本文件路径（上传后的路径），分块流式处理，转换结果写入outputs目录"
+            },
+            {
+                "name": "input_filename",
+                "type": "string",
+                "required": False,
+                "description": "输入文件的原始文件名，用于生成输出文件名（通过API调用时由服务端根据上传记录自动填写）"
+            },
+            {
+                "name": "output_file",
+                "type": "string",
+                "required": False,
+                "description": "输出文件名（仅用于input_file），默认根据输入文件名生成"
             },
             {
                 "name": "operation",
@@ -31,11 +141,20 @@ class TextToolPlugin(BasePlugin):
             }
         ]
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """文本处理的结果只由参数决定，可以缓存；文件处理会读取文件内容并写出输出文件，不缓存"""
+        if params.get("input_file"):
+            return None
+        return {}
+    
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行文本处理"""
         if params is None:
             params = {}
         
+        if params.get("input_file"):
+            return self._process_file(params)
+        
         text = params.get("text", "")
         operation = params.get("operation", "").lower()
         
@@ -47,11 +166,9 @@ class TextToolPlugin(BasePlugin):
             elif operation == "reverse":
                 result = text[::-1]
             elif operation == "count":
-                result = {
-                    "length": len(text),
-                    "words": len(text.split()),
-                    "lines": len(text.splitlines())
-                }
+                counter = TextCounter()
+                counter.feed(text)
+                result = counter.result()
             else:
                 return {
                     "success": False,
@@ -71,3 +188,158 @@ class TextToolPlugin(BasePlugin):
                 "data": None,
                 "message": f"处理失败: {str(e)}"
             }
+    
+    def _process_file(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        分块流式处理文本文件，内存占用与文件大小无关：
+        count 增量统计；uppercase/lowercase 逐块转换后写入outputs目录；
+        reverse 从文件末尾向前按UTF-8字符边界分块读取，每块反转后顺序写出
+        
+        无效的UTF-8字节按 surrogateescape 原样保留（转换时不改变，统计时每个字节计为一个字符），
+        文件开头的UTF-8 BOM不参与处理
+        """
+        input_file = params.get("input_file")
+        operation = params.get("operation", "").lower()
+        if not os.path.isfile(input_file):
+            return self._error("输入文件不存在")
+        if operation not in ("uppercase", "lowercase", "reverse", "count"):
+            return self._error(f"不支持的操作: {operation}")
+        
+        total_bytes = os.path.getsize(input_file)
+        started = time.time()
+        
+        if operation == "count":
+            counter = TextCounter()
+            try:
+                self._stream(input_file, total_bytes, counter.feed)
+            except InterruptedError as e:
+                return self._error(str(e))
+            data = {
+                **counter.result(),
+                "size": total_bytes,
+                "elapsed": round(time.time() - started, 3)
+            }
+            return {"success": True, "data": data, "message": "处理成功"}
+        
+        # 上传的文件按内容哈希保存，原始文件名由API层以 input_filename 传入
+        stem = Path(params.get("input_filename") or input_file)
+        output_file = os.path.basename(params.get("output_file") or "") or \
+            f"{stem.stem}_{operation}{stem.suffix or '.txt'}"
+        output_path = os.path.join("outputs", output_file)
+        os.makedirs("outputs", exist_ok=True)
+        temp_path = os.path.join("outputs", f".{output_file}.{uuid.uuid4().hex}.tmp")
+        
+        try:
+            with open(temp_path, "wb") as out:
+                def write(text: str):
+                    out.write(text.encode("utf-8", "surrogateescape"))
+                
+                if operation == "reverse":
+                    self._stream_reversed(input_file, total_bytes, lambda text: write(text[::-1]))
+                elif operation == "uppercase":
+                    self._stream(input_file, total_bytes, lambda text: write(text.upper()))
+                else:
+                    lower = WordAlignedBuffer(lambda text: write(text.lower()))
+                    self._stream(input_file, total_bytes, lower.feed)
+                    lower.flush()
+            os.replace(temp_path, output_path)
+        except InterruptedError as e:
+            return self._error(str(e))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        data = {
+            "output_file": output_file,
+            "output_path": output_path,
+            "original_size": total_bytes,
+            "output_size": os.path.getsize(output_path),
+            "elapsed": round(time.time() - started, 3)
+        }
+        return {"success": True, "data": data, "message": "处理成功"}
+    
+    def _stream(self, input_file: str, total_bytes: int, handle):
+        """从头到尾按块读取文件，增量解码后把每块文本交给 handle（多字节字符不会被块边界截断）"""
+        decoder = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+        with open(input_file, "rb") as f:
+            position = self._bom_length(f)
+            f.seek(position)
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                final = not chunk
+                handle(decoder.decode(chunk, final))
+                if final:
+                    break
+                position += len(chunk)
+                self._report_progress(position, total_bytes)
+    
+    def _stream_reversed(self, input_file: str, total_bytes: int, handle):
+        """
+        从文件末尾向前按块读取，每块的起点向前移到UTF-8字符的首字节（块比一个字符还小时也不会截断字符），
+        按从后往前的顺序把每块文本交给 handle
+        """
+        with open(input_file, "rb") as f:
+            begin = self._bom_length(f)
+            end = total_bytes
+            while end > begin:
+                start = max(begin, end - STREAM_CHUNK_SIZE)
+                # 多读起点前最多3个字节，起点落在多字节字符中间时前移到该字符的首字节
+                back = min(3, start - begin)
+                f.seek(start - back)
+                chunk = f.read(end - start + back)
+                offset = self._char_start(chunk, back)
+                chunk = chunk[offset:]
+                start += offset - back
+                handle(chunk.decode("utf-8", "surrogateescape"))
+                end = start
+                self._report_progress(total_bytes - end, total_bytes)
+    
+    @staticmethod
+    def _char_start(chunk: bytes, offset: int) -> int:
+        """
+        chunk[offset] 是一个有效UTF-8字符的延续字节时返回该字符首字节的下标，否则返回 offset
+        （无效字节按 surrogateescape 逐字节解码，从哪里切开结果都一样）
+        """
+        if offset >= len(chunk) or chunk[offset] & 0xC0 != 0x80:
+            return offset
+        lead = offset - 1
+        while lead >= 0 and chunk[lead] & 0xC0 == 0x80:
+            lead -= 1
+        if lead < 0 or chunk[lead] < 0xC0:
+            return offset
+        length = 2 if chunk[lead] < 0xE0 else 3 if chunk[lead] < 0xF0 else 4
+        if lead + length <= offset:
+            return offset
+        try:
+            chunk[lead:lead + length].decode("utf-8")
+        except UnicodeDecodeError:
+            return offset
+        return lead
+    
+    @staticmethod
+    def _bom_length(f) -> int:
+        """文件开头UTF-8 BOM的字节数"""
+        f.seek(0)
+        return len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+    
+    @staticmethod
+    def _report_progress(processed_bytes: int, total_bytes: int):
+        """上报已处理字节数，任务已请求取消时抛出 InterruptedError"""
+        job = get_current_job()
+        if job:
+            job.update_progress(
+                processed_bytes=processed_bytes,
+                total_bytes=total_bytes,
+                percent=round(processed_bytes * 100 / total_bytes, 1) if total_bytes else 100.0
+            )
+            if job.cancel_requested:
+                raise InterruptedError("处理已取消")
+    
+    @staticmethod
+    def _error(message: str) -> Dict[str, Any]:
+        """返回错误信息"""
+        return {
+            "success": False,
+            "data": None,
+            "message": message
+        }
@@ -1,8 +1,29 @@
 import subprocess
 import os
+import re
 import json
-from typing import Dict, Any
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Dict, Any, List, Optional
 from backend.base_plugin import BasePlugin
+from backend.job_manager import get_current_job
+from backend.capabilities import get_capability_registry
+import config
+
+# ffmpeg日志中的输入时长，如 "Duration: 00:01:23.45"
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+# 压缩失败时保留的ffmpeg日志行数
+STDERR_TAIL_LINES = 200
+
+# 保留的压缩进度记录数
+PROGRESS_HISTORY_LIMIT = 100
+
 
 class VideoCompressor(BasePlugin):
     """视频压缩工具插件，支持GPU加速"""
@@ -11,6 +32,10 @@ class VideoCompressor(BasePlugin):
         super().__init__()
         self.description = "视频压缩工具，支持GPU加速（NVIDIA NVENC, AMD VCE等）"
         self.version = "1.0.0"
+        
+        # 压缩进度 {task_id: {status, frame, fps, speed, out_time, duration, percent, eta, ...}}
+        self.compress_progress: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._progress_lock = threading.Lock()
     
     def get_parameters(self):
         """返回插件所需的参数"""
@@ -19,8 +44,14 @@ class VideoCompressor(BasePlugin):
                 "name": "action",
                 "type": "string",
                 "required": True,
-                "description": "操作类型：check_gpu（检测GPU），get_info（获取视频信息），compress（压缩）",
-                "enum": ["check_gpu", "get_info", "compress"]
+                "description": "操作类型：check_gpu（检测GPU），get_info（获取视频信息），compress（压缩），get_progress（压缩进度）",
+                "enum": ["check_gpu", "get_info", "compress", "get_progress"]
+            },
+            {
+                "name": "task_id",
+                "type": "string",
+                "required": False,
+                "description": "压缩任务ID，compress时可自行指定（默认自动生成），get_progress时用于查询进度"
             },
             {
                 "name": "input_file",
@@ -68,9 +99,42 @@ class VideoCompressor(BasePlugin):
                 "required": False,
                 "description": "CRF质量参数（0-51，越小质量越高），仅CPU编码",
                 "default": 23
+            },
+            {
+                "name": "mode",
+                "type": "string",
+                "required": False,
+                "description": "压缩模式：single（单个ffmpeg进程），segmented（按关键帧切分后多进程并行编码，仅CPU编码器）",
+                "default": "single",
+                "enum": ["single", "segmented"]
+            },
+            {
+                "name": "segment_seconds",
+                "type": "int",
+                "required": False,
+                "description": "分段模式下每段的目标时长（秒），实际在关键帧处切分"
+            },
+            {
+                "name": "workers",
+                "type": "int",
+                "required": False,
+                "description": "分段模式下同时编码的分段数"
+            },
+            {
+                "name": "refresh",
+                "type": "boolean",
+                "required": False,
+                "description": "check_gpu时忽略缓存重新探测（安装驱动或更换ffmpeg后使用）",
+                "default": False
             }
         ]
     
+    def get_cache_policy(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """文件信息查询只依赖文件内容，文件变化后缓存自动失效；其他操作不缓存"""
+        if str(params.get("action", "")) == "get_info":
+            return {"file_params": ["input_file"]}
+        return None
+    
     def execute(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """执行插件功能"""
         if params is None:
@@ -79,11 +143,13 @@ class VideoCompressor(BasePlugin):
         action = params.get("action")
         
         if action == "check_gpu":
-            return self._check_gpu()
+            return self._check_gpu(bool(params.get("refresh", False)))
         elif action == "get_info":
             return self._get_video_info(params.get("input_file"))
         elif action == "compress":
             return self._compress_video(params)
+        elif action == "get_progress":
+            return self._get_compress_progress(params.get("task_id"))
         else:
             return {
                 "success": False,
@@ -91,97 +157,56 @@ class VideoCompressor(BasePlugin):
             }
     
     def _check_ffmpeg(self):
-        """检查ffmpeg是否安装"""
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-version"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            return False
+        """检查ffmpeg是否安装（使用能力注册表中的缓存结果）"""
+        return get_capability_registry().get()["ffmpeg"]["installed"]
     
     def _get_nvidia_gpu_info(self):
         """获取NVIDIA显卡信息（型号和显存）"""
-        try:
-            # 尝试使用nvidia-smi获取显卡信息
-            result = subprocess.run(
-                ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                # 解析输出，格式："GPU Name, Memory MB"
-                lines = result.stdout.strip().split('\n')
-                if lines:
-                    # 取第一张显卡的信息
-                    parts = lines[0].split(',')
-                    if len(parts) >= 2:
-                        gpu_model = parts[0].strip()
-                        memory_str = parts[1].strip()
-                        # 转换显存单位（MiB 转 GB）
-                        try:
-                            memory_mb = float(memory_str.split()[0])
-                            memory_gb = round(memory_mb / 1024, 1)
-                            return {
-                                "model": gpu_model,
-                                "memory": f"{memory_gb} GB"
-                            }
-                        except:
-                            return {
-                                "model": gpu_model,
-                                "memory": memory_str
-                            }
-            return {"model": "未知", "memory": "未知"}
-        except (FileNotFoundError, subprocess.TimeoutExpired, Exception):
-            return {"model": "未知", "memory": "未知"}
+        gpus = get_capability_registry().get()["nvidia_gpus"]
+        # 取第一张显卡的信息
+        if gpus:
+            return gpus[0]
+        return {"model": "未知", "memory": "未知"}
     
-    def _check_gpu(self):
-        """检测可用的GPU编码器并获取显卡信息"""
-        if not self._check_ffmpeg():
+    def _check_gpu(self, refresh: bool = False):
+        """检测可用的GPU编码器并获取显卡信息
+        编码器列表和显卡信息来自进程内共享的能力注册表，refresh=True时重新探测
+        """
+        registry = get_capability_registry()
+        capabilities = registry.refresh() if refresh else registry.get()
+        
+        if not capabilities["ffmpeg"]["installed"]:
             return {
                 "success": False,
                 "error": "未检测到ffmpeg，请先安装 ffmpeg"
             }
         
         try:
-            # 获取ffmpeg支持的编码器列表
-            result = subprocess.run(
-                ["ffmpeg", "-encoders"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            
-            encoders_output = result.stdout
+            encoders = capabilities["ffmpeg"]["encoders"]
             
             # 获取NVIDIA显卡信息
             nvidia_info = self._get_nvidia_gpu_info()
             
             gpu_encoders = {
                 "nvidia": {
-                    "available": "h264_nvenc" in encoders_output,
+                    "available": "h264_nvenc" in encoders,
                     "name": "NVIDIA NVENC",
                     "encoder": "h264_nvenc",
                     "gpu_model": nvidia_info.get("model", "未知"),
                     "gpu_memory": nvidia_info.get("memory", "未知")
                 },
                 "amd": {
-                    "available": "h264_amf" in encoders_output,
+                    "available": "h264_amf" in encoders,
                     "name": "AMD VCE",
                     "encoder": "h264_amf"
                 },
                 "intel": {
-                    "available": "h264_qsv" in encoders_output,
+                    "available": "h264_qsv" in encoders,
                     "name": "Intel Quick Sync",
                     "encoder": "h264_qsv"
                 },
                 "cpu": {
-                    "available": "libx264" in encoders_output,
+                    "available": "libx264" in encoders,
                     "name": "CPU (libx264)",
                     "encoder": "libx264"
                 }
@@ -190,6 +215,8 @@ class VideoCompressor(BasePlugin):
             return {
                 "success": True,
                 "ffmpeg_installed": True,
+                "ffmpeg_version": capabilities["ffmpeg"]["version"],
+                "probed_at": capabilities["probed_at"],
                 "encoders": gpu_encoders
             }
         
@@ -261,92 +288,408 @@ class VideoCompressor(BasePlugin):
         if not os.path.exists(input_file):
             return {"success": False, "error": f"输入文件不存在: {input_file}"}
         
-        # 确定使用的编码器
-        encoder = params.get("encoder", "auto")
-        if encoder == "auto":
-            gpu_check = self._check_gpu()
-            if gpu_check.get("success"):
-                encoders = gpu_check.get("encoders", {})
-                # 优先级：NVIDIA > AMD > Intel > CPU
-                if encoders.get("nvidia", {}).get("available"):
-                    encoder = "h264_nvenc"
-                elif encoders.get("amd", {}).get("available"):
-                    encoder = "h264_amf"
-                elif encoders.get("intel", {}).get("available"):
-                    encoder = "h264_qsv"
-                else:
-                    encoder = "libx264"
-            else:
-                encoder = "libx264"
+        encoder = self._resolve_encoder(params.get("encoder", "auto"))
+        task_id = params.get("task_id") or uuid.uuid4().hex
+        
+        if params.get("mode", "single") == "segmented":
+            if encoder == "libx264":
+                return self._compress_video_segmented(params, encoder, task_id)
+            # GPU编码器本身已经足够快，且并发会话数受硬件限制，使用单进程模式
+        
+        progress = self._start_progress(task_id, "single")
         
         # 构建ffmpeg命令
         cmd = ["ffmpeg", "-i", input_file]
+        cmd.extend(self._build_video_args(encoder, params))
+        
+        # 音频编码
+        cmd.extend(["-c:a", "aac", "-b:a", "128k"])
+        
+        # 输出文件
+        cmd.extend(["-y", output_file])  # -y 覆盖已存在的文件
+        
+        try:
+            # 执行压缩
+            result = self._run_ffmpeg(
+                cmd,
+                timeout=3600,  # 1小时超时
+                on_progress=lambda snapshot: self._update_progress(progress, **snapshot)
+            )
+            
+            if result["timed_out"]:
+                self._update_progress(progress, status="failed")
+                return {"success": False, "error": "压缩超时（超过1小时）", "task_id": task_id}
+            if result["cancelled"]:
+                self._update_progress(progress, status="cancelled")
+                return {"success": False, "error": "压缩已取消", "task_id": task_id}
+            if result["returncode"] != 0:
+                self._update_progress(progress, status="failed")
+                return {
+                    "success": False,
+                    "error": f"压缩失败: {result['stderr']}",
+                    "task_id": task_id
+                }
+            
+            self._update_progress(progress, status="completed", percent=100.0, eta=0)
+            return self._compress_result(input_file, output_file, encoder, {"mode": "single", "task_id": task_id})
+        
+        except Exception as e:
+            self._update_progress(progress, status="failed")
+            return {"success": False, "error": f"压缩过程出错: {str(e)}", "task_id": task_id}
+    
+    def _run_ffmpeg(self, cmd: List[str], timeout: int = 3600, on_progress=None,
+                    stop_event: threading.Event = None) -> Dict[str, Any]:
+        """运行ffmpeg，通过 -progress 输出增量解析编码进度
+        stderr由后台线程持续读取，只保留最后STDERR_TAIL_LINES行，内存占用不随编码时长增长；
+        当前任务被取消或stop_event被设置时终止ffmpeg（结果中cancelled为True）
+        
+        Returns:
+            {"returncode": int, "stderr": 日志末尾, "duration": 输入时长(秒), "timed_out": bool, "cancelled": bool}
+        """
+        cmd = [cmd[0], "-nostats", "-progress", "pipe:1"] + cmd[1:]
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        
+        stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        state = {"duration": None, "timed_out": False, "cancelled": False}
         
+        def drain_stderr():
+            for line in process.stderr:
+                stderr_tail.append(line)
+                if state["duration"] is None:
+                    match = _DURATION_RE.search(line)
+                    if match:
+                        hours, minutes, seconds = match.groups()
+                        state["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        
+        def kill_on_timeout():
+            state["timed_out"] = True
+            process.kill()
+        
+        stderr_thread = threading.Thread(target=drain_stderr, daemon=True)
+        stderr_thread.start()
+        timer = threading.Timer(timeout, kill_on_timeout)
+        timer.start()
+        job = get_current_job()
+        
+        try:
+            # -progress 每隔约0.5秒输出一组 key=value，以 progress=continue/end 结尾
+            snapshot = {}
+            for line in process.stdout:
+                key, _, value = line.strip().partition("=")
+                if not key:
+                    continue
+                snapshot[key] = value
+                if key != "progress":
+                    continue
+                
+                if on_progress:
+                    on_progress(self._parse_progress(snapshot, state["duration"]))
+                snapshot = {}
+                if ((job and job.cancel_requested) or (stop_event and stop_event.is_set())) \
+                        and not state["cancelled"]:
+                    state["cancelled"] = True
+                    process.terminate()
+            process.wait()
+        finally:
+            timer.cancel()
+            stderr_thread.join(timeout=5)
+        
+        return {
+            "returncode": process.returncode,
+            "stderr": "".join(stderr_tail),
+            "duration": state["duration"],
+            "timed_out": state["timed_out"],
+            "cancelled": state["cancelled"]
+        }
+    
+    def _parse_progress(self, snapshot: Dict[str, str], duration: float = None) -> Dict[str, Any]:
+        """把一组 -progress 输出转换为进度信息"""
+        def number(key, cast=float):
+            try:
+                return cast(snapshot.get(key, "").strip().rstrip("x"))
+            except ValueError:
+                return None
+        
+        # out_time_us 为微秒；旧版ffmpeg只有 out_time_ms（实际单位同样是微秒）
+        out_time_us = number("out_time_us", int)
+        if out_time_us is None:
+            out_time_us = number("out_time_ms", int)
+        out_time = out_time_us / 1_000_000 if out_time_us is not None and out_time_us >= 0 else None
+        speed = number("speed")
+        
+        progress = {
+            "frame": number("frame", int),
+            "fps": number("fps"),
+            "speed": speed,
+            "out_time": round(out_time, 2) if out_time is not None else None,
+            "duration": duration,
+            "percent": None,
+            "eta": None
+        }
+        if duration and out_time is not None:
+            progress["percent"] = round(min(100.0, out_time / duration * 100), 2)
+            if speed:
+                progress["eta"] = round(max(0.0, (duration - out_time) / speed), 1)
+        return progress
+    
+    def _start_progress(self, task_id: str, mode: str) -> Dict[str, Any]:
+        """创建压缩进度记录"""
+        progress = {
+            "task_id": task_id,
+            "mode": mode,
+            "status": "running",
+            "started_at": time.time(),
+            "updated_at": time.time()
+        }
+        with self._progress_lock:
+            self.compress_progress[task_id] = progress
+            while len(self.compress_progress) > PROGRESS_HISTORY_LIMIT:
+                self.compress_progress.popitem(last=False)
+        
+        job = get_current_job()
+        if job:
+            job.update_progress(task_id=task_id)
+        return progress
+    
+    def _update_progress(self, progress: Dict[str, Any], **fields):
+        """更新压缩进度，同时同步到当前异步任务"""
+        fields["updated_at"] = time.time()
+        progress.update(fields)
+        job = get_current_job()
+        if job:
+            job.update_progress(**fields)
+    
+    def _get_compress_progress(self, task_id: str) -> Dict[str, Any]:
+        """获取压缩进度"""
+        if not task_id:
+            return {"success": False, "error": "未提供task_id"}
+        
+        progress = self.compress_progress.get(task_id)
+        if progress is None:
+            return {"success": False, "error": f"压缩任务不存在: {task_id}"}
+        
+        return {
+            "success": True,
+            "progress": dict(progress)
+        }
+    
+    def _resolve_encoder(self, encoder: str) -> str:
+        """确定使用的编码器，auto时按 NVIDIA > AMD > Intel > CPU 的优先级选择"""
+        if encoder != "auto":
+            return encoder
+        
+        gpu_check = self._check_gpu()
+        if gpu_check.get("success"):
+            encoders = gpu_check.get("encoders", {})
+            if encoders.get("nvidia", {}).get("available"):
+                return "h264_nvenc"
+            elif encoders.get("amd", {}).get("available"):
+                return "h264_amf"
+            elif encoders.get("intel", {}).get("available"):
+                return "h264_qsv"
+        return "libx264"
+    
+    def _build_video_args(self, encoder: str, params: Dict[str, Any], threads: int = None) -> List[str]:
+        """构建视频编码参数（编码器、分辨率、码率、预设、CRF）"""
         # 添加编码器参数
-        cmd.extend(["-c:v", encoder])
+        args = ["-c:v", encoder]
         
         # 分辨率设置
         resolution = params.get("resolution", "original")
         if resolution != "original":
-            cmd.extend(["-s", resolution])
+            args.extend(["-s", resolution])
         
         # 码率设置
         bitrate = params.get("bitrate", "2M")
-        cmd.extend(["-b:v", bitrate])
+        args.extend(["-b:v", bitrate])
         
         # 预设设置
         preset = params.get("preset", "medium")
         if encoder in ["h264_nvenc", "h264_amf", "h264_qsv"]:
             # GPU编码器预设
-            cmd.extend(["-preset", preset])
+            args.extend(["-preset", preset])
         else:
             # CPU编码器
-            cmd.extend(["-preset", preset])
+            args.extend(["-preset", preset])
             crf = params.get("crf", 23)
-            cmd.extend(["-crf", str(crf)])
+            args.extend(["-crf", str(crf)])
+            if threads:
+                args.extend(["-threads", str(threads)])
         
-        # 音频编码
-        cmd.extend(["-c:a", "aac", "-b:a", "128k"])
+        return args
+    
+    def _compress_result(self, input_file: str, output_file: str, encoder: str, extra: Dict[str, Any] = None) -> Dict[str, Any]:
+        """压缩完成后统计输出文件信息"""
+        # 获取输出文件信息
+        if not os.path.exists(output_file):
+            return {"success": False, "error": "输出文件未生成"}
         
-        # 输出文件
-        cmd.extend(["-y", output_file])  # -y 覆盖已存在的文件
+        input_size = os.path.getsize(input_file)
+        output_size = os.path.getsize(output_file)
+        compression_ratio = (1 - output_size / input_size) * 100 if input_size > 0 else 0
+        
+        result = {
+            "output_file": output_file,
+            "input_size": input_size,
+            "output_size": output_size,
+            "compression_ratio": round(compression_ratio, 2),
+            "encoder_used": encoder
+        }
+        if extra:
+            result.update(extra)
+        
+        return {
+            "success": True,
+            "message": "压缩完成",
+            "result": result
+        }
+    
+    def _compress_video_segmented(self, params: Dict[str, Any], encoder: str, task_id: str) -> Dict[str, Any]:
+        """分段并行压缩
+        1. 按关键帧把视频流无损切分为若干段（-c copy，不重新编码）
+        2. 多个ffmpeg进程并发编码各段，总线程数不超过线程预算
+        3. 用concat分离器无损拼接各段，并从原文件重新编码音频
+        """
+        input_file = params.get("input_file")
+        output_file = params.get("output_file")
+        segment_seconds = int(params.get("segment_seconds") or getattr(config, 'VIDEO_SEGMENT_SECONDS', 30))
+        thread_budget = getattr(config, 'VIDEO_THREAD_BUDGET', 0) or os.cpu_count() or 1
+        workers = int(params.get("workers") or getattr(config, 'VIDEO_SEGMENT_WORKERS', 0) or max(1, thread_budget // 2))
+        workers = max(1, min(workers, thread_budget))
+        threads_per_segment = max(1, thread_budget // workers)
+        job = get_current_job()
+        progress = self._start_progress(task_id, "segmented")
         
+        work_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_file)))
         try:
-            # 执行压缩
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600  # 1小时超时
+            # 1. 在关键帧处切分（只处理视频流，音频最后整体编码，避免分段边界处出现音频间隙）
+            self._update_progress(progress, stage="splitting")
+            split = self._run_ffmpeg(
+                [
+                    "ffmpeg", "-i", input_file,
+                    "-map", "0:v:0", "-c", "copy",
+                    "-f", "segment",
+                    "-segment_time", str(segment_seconds),
+                    "-reset_timestamps", "1",
+                    "-y", os.path.join(work_dir, "part_%05d.mkv")
+                ],
+                timeout=3600
             )
+            if split["cancelled"]:
+                raise RuntimeError("压缩已取消")
+            if split["returncode"] != 0:
+                raise RuntimeError(f"视频切分失败: {split['stderr'][-2000:]}")
             
-            if result.returncode != 0:
-                return {
-                    "success": False,
-                    "error": f"压缩失败: {result.stderr}"
-                }
+            parts = sorted(f for f in os.listdir(work_dir) if f.startswith("part_"))
+            if not parts:
+                raise RuntimeError("视频切分失败: 未生成分段")
             
-            # 获取输出文件信息
-            if os.path.exists(output_file):
-                input_size = os.path.getsize(input_file)
-                output_size = os.path.getsize(output_file)
-                compression_ratio = (1 - output_size / input_size) * 100 if input_size > 0 else 0
-                
-                return {
-                    "success": True,
-                    "message": "压缩完成",
-                    "result": {
-                        "output_file": output_file,
-                        "input_size": input_size,
-                        "output_size": output_size,
-                        "compression_ratio": round(compression_ratio, 2),
-                        "encoder_used": encoder
-                    }
-                }
-            else:
-                return {"success": False, "error": "输出文件未生成"}
+            # 2. 并发编码各段，总进度按各段已编码时长之和估算
+            video_args = self._build_video_args(encoder, params, threads_per_segment)
+            duration = split["duration"]
+            encoded_time = [0.0] * len(parts)
+            completed = [0]
+            encode_started = time.time()
+            lock = threading.Lock()
+            self._update_progress(progress, stage="encoding", duration=duration,
+                                  completed_segments=0, total_segments=len(parts))
+            
+            def report(index: int, snapshot: Dict[str, Any]):
+                with lock:
+                    if snapshot.get("out_time") is not None:
+                        encoded_time[index] = snapshot["out_time"]
+                    out_time = sum(encoded_time)
+                    fields = {"out_time": round(out_time, 2), "completed_segments": completed[0]}
+                    if duration:
+                        fraction = min(1.0, out_time / duration)
+                        elapsed = time.time() - encode_started
+                        fields["percent"] = round(fraction * 100, 2)
+                        fields["speed"] = round(out_time / elapsed, 2) if elapsed > 0 else None
+                        fields["eta"] = round(elapsed * (1 - fraction) / fraction, 1) if fraction > 0 else None
+                    self._update_progress(progress, **fields)
+            
+            # 任一分段失败时设置，其余分段的ffmpeg随即终止，尚未开始的分段不再编码
+            stop = threading.Event()
+            
+            def encode_part(index: int) -> str:
+                if stop.is_set() or (job and job.cancel_requested):
+                    raise RuntimeError("压缩已取消")
+                part = parts[index]
+                encoded = os.path.join(work_dir, part.replace("part_", "enc_"))
+                result = self._run_ffmpeg(
+                    ["ffmpeg", "-i", os.path.join(work_dir, part)] + video_args + ["-an", "-y", encoded],
+                    timeout=3600,
+                    on_progress=lambda snapshot: report(index, snapshot),
+                    stop_event=stop
+                )
+                if result["cancelled"]:
+                    raise RuntimeError("压缩已取消")
+                if result["timed_out"]:
+                    raise RuntimeError(f"分段 {part} 编码超时（超过1小时）")
+                if result["returncode"] != 0:
+                    raise RuntimeError(f"分段 {part} 编码失败: {result['stderr'][-2000:]}")
+                with lock:
+                    completed[0] += 1
+                report(index, {})
+                return encoded
+            
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encode")
+            futures = [executor.submit(encode_part, index) for index in range(len(parts))]
+            try:
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                # 报告导致失败的错误（其余分段随后因 stop 终止，它们的"已取消"错误不是原因）
+                failed = [future for future in futures if future in done and future.exception()]
+                if failed:
+                    raise failed[0].exception()
+                encoded_parts = [future.result() for future in futures]
+            finally:
+                # 出错时取消尚未开始的分段并终止进行中的ffmpeg；需要等它们退出后才能删除临时目录
+                stop.set()
+                executor.shutdown(wait=True, cancel_futures=True)
+            
+            # 3. 拼接视频并编码音频
+            list_file = os.path.join(work_dir, "concat.txt")
+            with open(list_file, 'w', encoding='utf-8') as f:
+                for path in encoded_parts:
+                    escaped = path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+            
+            self._update_progress(progress, stage="muxing")
+            concat = self._run_ffmpeg(
+                [
+                    "ffmpeg",
+                    "-f", "concat", "-safe", "0", "-i", list_file,
+                    "-i", input_file,
+                    "-map", "0:v:0", "-map", "1:a?",
+                    "-c:v", "copy",
+                    "-c:a", "aac", "-b:a", "128k",
+                    "-y", output_file
+                ],
+                timeout=3600
+            )
+            if concat["returncode"] != 0:
+                raise RuntimeError(f"分段拼接失败: {concat['stderr'][-2000:]}")
+            
+            self._update_progress(progress, status="completed", stage="done", percent=100.0, eta=0)
+            return self._compress_result(input_file, output_file, encoder, {
+                "mode": "segmented",
+                "task_id": task_id,
+                "segments": len(parts),
+                "workers": workers,
+                "threads_per_segment": threads_per_segment
+            })
         
-        except subprocess.TimeoutExpired:
-            return {"success": False, "error": "压缩超时（超过1小时）"}
         except Exception as e:
-            return {"success": False, "error": f"压缩过程出错: {str(e)}"}
+            cancelled = bool(job and job.cancel_requested)
+            self._update_progress(progress, status="cancelled" if cancelled else "failed")
+            return {"success": False, "error": f"压缩过程出错: {str(e)}", "task_id": task_id}
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
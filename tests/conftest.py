@@ -0,0 +1,7 @@
+"""
+测试配置：把项目根目录加入模块搜索路径（项目没有打包配置，模块按根目录下的相对路径导入）
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
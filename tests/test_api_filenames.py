@@ -0,0 +1,60 @@
+"""
+frontend/api_server.py：上传的文件按内容哈希保存，执行插件时由API层把原始文件名作为 *_filename 参数传入
+"""
+import io
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("flask_cors")
+
+import backend.blob_store as blob_store
+from backend.plugin_manager import PluginManager
+from frontend.api_server import APIServer
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(blob_store, "_store", blob_store.BlobStore(str(tmp_path / "blobs")))
+    # 插件管理器会重新执行插件模块并替换 sys.modules 中的条目，测试结束后恢复，其他测试引用的模块保持不变
+    for name in [name for name in sys.modules if name.startswith("plugins.")]:
+        monkeypatch.setitem(sys.modules, name, sys.modules[name])
+    manager = PluginManager(PLUGIN_DIR)
+    manager.load_plugins()
+    server = APIServer(manager)
+    server.app.config["TESTING"] = True
+    return server.app.test_client()
+
+
+def _upload(client, name, data):
+    response = client.post("/upload", data={"file": (io.BytesIO(data), name)}, content_type="multipart/form-data")
+    return response.get_json()["filepath"]
+
+
+def test_execute_receives_original_filename(client):
+    path = _upload(client, "records.jsonl", b'{"a": 1}\n{"b": [2]}\n')
+    assert os.path.basename(path) != "records.jsonl"
+
+    response = client.post("/plugins/JsonFormatter/execute", json={"input_file": path, "operation": "compress"})
+    result = response.get_json()
+    assert result["success"], result["message"]
+    # 按原始扩展名识别为NDJSON，输出文件名使用原始文件名
+    assert result["data"]["input_format"] == "ndjson"
+    assert result["data"]["output_file"] == "records_compressed.ndjson"
+
+
+def test_caller_supplied_filename_is_kept_and_batch_items_are_filled(client):
+    path = _upload(client, "notes.txt", "Ünïcode".encode("utf-8"))
+    response = client.post("/plugins/TextTool/execute",
+                           json={"input_file": path, "input_filename": "custom.md", "operation": "uppercase"})
+    assert response.get_json()["data"]["output_file"] == "custom_uppercase.md"
+
+    response = client.post("/plugins/TextTool/batch", json=[{"input_file": path, "operation": "lowercase"}])
+    entry = response.get_json()["data"][0]
+    assert entry["result"]["data"]["output_file"] == "notes_lowercase.txt"
+    with open(os.path.join("outputs", "notes_lowercase.txt"), encoding="utf-8") as f:
+        assert f.read() == "ünïcode"
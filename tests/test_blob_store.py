@@ -0,0 +1,33 @@
+"""
+backend/blob_store.py：扩展名是内容键的一部分，相同内容以不同扩展名写入时路径的扩展名与文件名一致
+"""
+from backend.blob_store import BlobStore
+
+
+def _put(store, tmp_path, data, name, namespace="uploads"):
+    src = tmp_path / f"src-{name}"
+    src.write_bytes(data)
+    return store.put_file(str(src), name, namespace)
+
+
+def test_same_content_with_different_extensions_keeps_each_extension(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    data = b'{"a": 1}'
+    as_text = _put(store, tmp_path, data, "x.txt")
+    as_json = _put(store, tmp_path, data, "x.json")
+
+    assert as_text["hash"] == as_json["hash"]
+    assert as_text["path"].endswith(".txt") and as_json["path"].endswith(".json")
+    assert store.resolve("x.json").endswith(".json")
+    assert store.resolve("x.txt").endswith(".txt")
+    assert store.name_for_path(as_json["path"]) == "x.json"
+
+    again = _put(store, tmp_path, data, "y.JSON")
+    assert again["deduplicated"] and again["path"] == as_json["path"]
+
+
+def test_link_requires_matching_extension(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    blob = _put(store, tmp_path, b"hello", "a.txt")
+    assert store.link(blob["hash"], "b.txt")["path"] == blob["path"]
+    assert store.link(blob["hash"], "b.epub") is None
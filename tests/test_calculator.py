@@ -0,0 +1,21 @@
+"""
+plugins/calculator.py 的幂运算：浮点数溢出时改用科学计数法，数量级也溢出时返回明确的错误
+"""
+import pytest
+
+from plugins.calculator import CalculatorPlugin
+
+
+@pytest.mark.parametrize("output", ["auto", "scientific", "digits"])
+def test_pow_overflow_falls_back_to_scientific(output):
+    result = CalculatorPlugin().execute({"operation": "pow", "a": 10, "b": 400, "output": output})
+    assert result["success"], result["message"]
+    assert result["data"]["digits"] == 401
+
+
+@pytest.mark.parametrize("a, b", [(1e308, 1e308), (-1e308, 1e308), (1e-308, -1e308)])
+@pytest.mark.parametrize("output", ["auto", "scientific", "digits"])
+def test_pow_magnitude_overflow_is_reported(a, b, output):
+    result = CalculatorPlugin().execute({"operation": "pow", "a": a, "b": b, "output": output})
+    assert not result["success"]
+    assert "数量级超出浮点数范围" in result["message"]
@@ -0,0 +1,47 @@
+"""
+plugins/ebook_converter.py 的并发翻译：失败后立即返回，被放弃的在途请求结束前仍占用翻译服务的并发名额
+"""
+import threading
+import time
+
+from plugins.ebook_converter import EbookConverterPlugin, _TranslationError
+
+
+def _segments(texts):
+    return iter([(index, text, text) for index, text in enumerate(texts)])
+
+
+def test_abandoned_requests_keep_provider_concurrency_slots():
+    active = peak = 0
+    lock = threading.Lock()
+
+    def request(segment):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        try:
+            if segment == "bad":
+                raise _TranslationError("boom")
+            time.sleep(0.3)
+            return segment.upper()
+        finally:
+            with lock:
+                active -= 1
+
+    plugin = EbookConverterPlugin()
+    started = time.monotonic()
+    success, message = plugin._translate_segments("test-provider", _segments(["a", "b", "bad", "c"]), request,
+                                                  concurrency=3, on_paragraph=lambda *_: None)
+    assert not success and "boom" in message
+    # 不等待在途的 "a"、"b" 完成
+    assert time.monotonic() - started < 0.25
+
+    # 立即恢复：与仍在途的旧请求合计不超过并发上限
+    translated = []
+    success, count = plugin._translate_segments("test-provider", _segments(["x", "y", "z", "w"]), request,
+                                                concurrency=3,
+                                                on_paragraph=lambda original, text: translated.append(text))
+    assert success and count == 4
+    assert translated == ["X", "Y", "Z", "W"]
+    assert peak == 3
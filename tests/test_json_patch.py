@@ -0,0 +1,169 @@
+"""
+backend/json_patch.py：diff → patch 往返、JSON Pointer 转义和补丁错误
+"""
+import copy
+import json
+import random
+
+import pytest
+
+from backend.json_patch import (
+    diff_json, apply_patch, json_equal, json_identical, parse_pointer, escape_pointer_token, JsonPatchError
+)
+
+
+def _make_config(count, rng):
+    """大对象：按服务名组织的配置快照"""
+    return {
+        f"service_{i}": {
+            "enabled": rng.random() < 0.8,
+            "port": 8000 + i % 1000,
+            "replicas": rng.randint(1, 10),
+            "tags": [rng.choice(["api", "db", "cache", "web"]) for _ in range(rng.randint(0, 4))],
+            "limits": {"cpu": round(rng.random() * 4, 2), "memory": f"{rng.randint(1, 16)}Gi"}
+        }
+        for i in range(count)
+    }
+
+
+def _mutate_config(config, rng):
+    result = copy.deepcopy(config)
+    names = list(result)
+    for name in rng.sample(names, len(names) // 100):
+        result[name]["replicas"] += 1
+        result[name]["tags"].append("canary")
+    for name in rng.sample(names, len(names) // 200):
+        del result[name]
+    for i in range(len(names) // 200):
+        result[f"new/service~{i}"] = {"enabled": True, "port": 9000 + i}
+    return result
+
+
+def _make_records(count, rng):
+    """大数组：带唯一ID的记录导出"""
+    return [{"id": i, "user": f"user{i}", "score": rng.randint(0, 1000), "path": ["a", str(i % 97)]}
+            for i in range(count)]
+
+
+def _mutate_records(records, rng):
+    result = copy.deepcopy(records)
+    for index in rng.sample(range(len(result)), len(result) // 100):
+        result[index]["score"] += 1
+    for index in sorted(rng.sample(range(len(result)), len(result) // 200), reverse=True):
+        del result[index]
+    for i in range(len(records) // 200):
+        result.insert(rng.randrange(len(result)), {"id": -i, "user": "inserted"})
+    block = len(result) // 3
+    result.extend(result[block:block + 100])
+    del result[block:block + 100]
+    return result
+
+
+def _round_trip(source, target):
+    patch = diff_json(source, target)
+    # 补丁经过序列化再应用，与通过文件或接口传递时一致
+    result = apply_patch(copy.deepcopy(source), json.loads(json.dumps(patch)))
+    assert result == target
+    assert json_identical(result, target)
+    return patch
+
+
+@pytest.mark.parametrize("make, mutate, count", [
+    (_make_config, _mutate_config, 20000),
+    (_make_records, _mutate_records, 40000),
+])
+def test_round_trip_on_multi_megabyte_documents(make, mutate, count):
+    rng = random.Random(0)
+    source = make(count, rng)
+    target = mutate(source, rng)
+    assert len(json.dumps(source)) > 2 * 1024 * 1024
+
+    patch = _round_trip(source, target)
+    # 只生成改动部分的操作，而不是整体替换
+    assert 0 < len(patch) < count // 10
+    assert all(op["path"] != "" for op in patch)
+
+
+def test_round_trip_on_random_documents():
+    rng = random.Random(1)
+
+    def value(depth):
+        kind = rng.randrange(6 if depth < 4 else 3)
+        if kind == 0:
+            return rng.choice([0, 1, 1.5, True, False, None])
+        if kind == 1:
+            return rng.choice(["a", "b", "a/b", "m~n", ""])
+        if kind == 2:
+            return rng.randint(0, 3)
+        if kind == 3:
+            return [value(depth + 1) for _ in range(rng.randint(0, 6))]
+        return {rng.choice(["x", "y", "a/b", "~1", "~0/"]): value(depth + 1) for _ in range(rng.randint(0, 4))}
+
+    for _ in range(2000):
+        _round_trip(value(0), value(0))
+
+
+def test_diff_of_identical_documents_is_empty():
+    document = {"a": [1, 2, {"b": None}], "c": "d"}
+    assert diff_json(document, copy.deepcopy(document)) == []
+
+
+def test_pointer_escaping():
+    source = {"a/b": 1, "m~n": {"~1": [1, 2]}}
+    target = {"a/b": 2, "m~n": {"~1": [1, 2, 3]}}
+    patch = _round_trip(source, target)
+    paths = {op["path"] for op in patch}
+    assert "/a~1b" in paths
+    assert "/m~0n/~01/2" in paths
+
+    assert escape_pointer_token("a/b~c") == "a~1b~0c"
+    # ~01 是转义后的 "~1"，不能被解码为 "/"
+    assert parse_pointer("/m~0n/~01") == ["m~n", "~1"]
+    assert parse_pointer("") == []
+    with pytest.raises(JsonPatchError):
+        parse_pointer("a/b")
+
+
+def test_move_into_own_child_is_rejected():
+    document = {"a": {"b": {"c": 1}}}
+    with pytest.raises(JsonPatchError, match="第0个操作"):
+        apply_patch(document, [{"op": "move", "from": "/a", "path": "/a/b/d"}])
+
+
+def test_failed_operation_reports_its_index():
+    with pytest.raises(JsonPatchError, match="第1个操作.*路径不存在"):
+        apply_patch({"a": 1}, [{"op": "add", "path": "/b", "value": 2},
+                               {"op": "remove", "path": "/missing"}])
+
+
+@pytest.mark.parametrize("token", ["²", "١", "０", "01", "-1", "1.0", " 1", ""])
+@pytest.mark.parametrize("op", ["add", "remove", "replace", "test"])
+def test_non_ascii_and_malformed_array_indices_are_rejected(op, token):
+    # str.isdigit() 对 "²"、阿拉伯数字等Unicode数字也为真，下标只能是ASCII数字
+    operation = {"op": op, "path": f"/{token}"}
+    if op != "remove":
+        operation["value"] = 0
+    with pytest.raises(JsonPatchError, match="无效的数组下标"):
+        apply_patch([1, 2], [operation])
+
+
+def test_test_operation_compares_numbers_by_value():
+    document = {"n": 1, "list": [1, {"x": 2.0}], "flag": True}
+    apply_patch(document, [{"op": "test", "path": "/n", "value": 1.0}])
+    apply_patch(document, [{"op": "test", "path": "/list", "value": [1.0, {"x": 2}]}])
+    with pytest.raises(JsonPatchError, match="test 失败"):
+        apply_patch(document, [{"op": "test", "path": "/flag", "value": 1}])
+    with pytest.raises(JsonPatchError, match="test 失败"):
+        apply_patch(document, [{"op": "test", "path": "/n", "value": True}])
+
+
+def test_equality_helpers():
+    assert json_equal(1, 1.0)
+    assert json_equal({"a": [1, 2]}, {"a": [1.0, 2]})
+    assert not json_equal(True, 1)
+    assert not json_equal(0, False)
+    assert not json_equal([1], [1, 1])
+    assert not json_equal({"a": 1}, {"b": 1})
+    # diff 仍区分类型，1 → 1.0 会生成 replace
+    assert not json_identical(1, 1.0)
+    assert diff_json({"a": 1}, {"a": 1.0}) == [{"op": "replace", "path": "/a", "value": 1.0}]
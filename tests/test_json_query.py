@@ -0,0 +1,22 @@
+"""
+backend/json_query.py 的过滤条件：== / != 与 json_patch.json_equal 语义一致（嵌套的布尔值与数字也不相等）
+"""
+import pytest
+
+from backend.json_query import compile_query
+
+
+@pytest.mark.parametrize("records, expected", [
+    ([{"b": [1], "c": [True]}], []),
+    ([{"b": {"x": [0]}, "c": {"x": [False]}}], []),
+    ([{"b": [1, {"y": 2.0}], "c": [1.0, {"y": 2}]}], [0]),
+    ([{"b": True, "c": 1}], []),
+    ([{"b": None, "c": None}], [0]),
+    ([{"b": 1}], []),
+    ([{}], [0]),
+])
+def test_equality_is_json_equality_at_every_depth(records, expected):
+    equal = compile_query("$[?(@.b == @.c)]").apply(records)
+    assert equal == [records[index] for index in expected]
+    not_equal = compile_query("$[?(@.b != @.c)]").apply(records)
+    assert not_equal == [record for index, record in enumerate(records) if index not in expected]
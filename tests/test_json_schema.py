@@ -0,0 +1,35 @@
+"""
+backend/json_schema.py 的 const / enum / uniqueItems：相等性与 json_patch.json_equal 一致
+（数字按数值比较，嵌套的布尔值与数字也不相等）
+"""
+import pytest
+
+from backend.json_schema import compile_schema
+
+
+def _valid(schema, value):
+    return compile_schema(schema).validate(value, 10) == []
+
+
+@pytest.mark.parametrize("value, expected", [
+    ([1, 1.0], False),
+    ([[1], [1.0]], False),
+    ([{"a": [2.0]}, {"a": [2]}], False),
+    ([0, -0.0], False),
+    ([True, 1], True),
+    ([[True], [1]], True),
+    ([{"a": False}, {"a": 0}], True),
+    ([1, "1", None, [], {}], True),
+])
+def test_unique_items(value, expected):
+    assert _valid({"uniqueItems": True}, value) is expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ([1.0, {"b": 2}], True),
+    ([True, {"b": 2}], False),
+    ([1, {"b": 2.5}], False),
+])
+def test_const_and_enum(value, expected):
+    assert _valid({"const": [1, {"b": 2}]}, value) is expected
+    assert _valid({"enum": ["x", [1, {"b": 2}]]}, value) is expected
@@ -0,0 +1,163 @@
+"""
+plugins/json_formatter.py 的流式处理：在很小的读取块大小下与 json 模块的内存处理结果逐字节对比，
+覆盖被读取边界截断的多字节字符、转义序列和数字
+"""
+import codecs
+import json
+import random
+
+import pytest
+
+import plugins.json_formatter as json_formatter
+from plugins.json_formatter import JsonStreamProcessor, JsonStreamError, analyze_json
+
+CHUNK_SIZES = [1, 2, 3, 5, 64]
+
+_STRINGS = ["", "a", "é", "中文", "😀", "a\"b", "back\\slash", "tab\tnew\nline", "/", " ", "\x7f", "ñ😀中"]
+
+
+def _random_document(rng, depth=0):
+    kind = rng.randrange(8 if depth < 5 else 5)
+    if kind == 0:
+        return rng.choice([True, False, None])
+    if kind == 1:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 2:
+        return rng.choice([0.5, -12.25, 1e-7, 3.14159, 1e21, 123456.789])
+    if kind in (3, 4):
+        return rng.choice(_STRINGS)
+    if kind == 5:
+        return [_random_document(rng, depth + 1) for _ in range(rng.randint(0, 5))]
+    return {rng.choice(_STRINGS) + str(i): _random_document(rng, depth + 1) for i in range(rng.randint(0, 5))}
+
+
+def _process(path, **kwargs):
+    processor = JsonStreamProcessor(**kwargs)
+    output = _Collector()
+    processor.process(str(path), output)
+    return processor, output.text
+
+
+class _Collector:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+
+@pytest.fixture
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(json_formatter, "STREAM_CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+def test_format_and_compress_match_json_module(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    path = tmp_path / "doc.json"
+    for _ in range(60):
+        document = _random_document(rng)
+        # 输入既有原样的多字节字符，也有 \uXXXX 转义（包括代理对）
+        text = json.dumps(document, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 1, 3]))
+        path.write_text(text, encoding="utf-8")
+
+        processor, formatted = _process(path, indent=4)
+        assert formatted == json.dumps(document, indent=4, ensure_ascii=False)
+        assert processor.stats() == analyze_json(document)
+        assert processor.root_type == type(document).__name__
+
+        _, compressed = _process(path, compact=True)
+        assert compressed == json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+def test_multibyte_characters_split_across_chunks(tmp_path, chunk_size):
+    document = {"😀中é": ["😀" * 7, "中" * 5, "é" * 3], "n": -1234567.875e-3}
+    path = tmp_path / "doc.json"
+    # 每个字符占2~4个字节，在各种块大小下都会被读取边界截断
+    path.write_bytes(codecs.BOM_UTF8 + json.dumps(document, ensure_ascii=False).encode("utf-8"))
+
+    processor, compressed = _process(path, compact=True)
+    assert compressed == json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+    assert processor.stats() == analyze_json(document)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("text", [
+    '{"a": 1E5, "b": -0, "c": 1.50}',
+    '[1e400, -1E+400, -0.0, 0.10, 1e-7, 5E-324, 2.5e+3, 12345678901234567890, -0]',
+    '1.0e0',
+    '-0',
+])
+def test_non_canonical_numbers_are_normalized_like_json_module(tmp_path, chunk_size, text):
+    # json.dumps 生成的输入里数字已经是规范形式，这里直接写入不规范的数字字面量
+    document = json.loads(text)
+    path = tmp_path / "numbers.json"
+    path.write_text(text, encoding="utf-8")
+
+    processor, compressed = _process(path, compact=True)
+    assert compressed == json.dumps(document, separators=(",", ":"), ensure_ascii=False)
+    _, formatted = _process(path, indent=2)
+    assert formatted == json.dumps(document, indent=2, ensure_ascii=False)
+    assert processor.stats() == analyze_json(document)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("text", [
+    '{"a": 1,\n "b": x}',
+    '[1, 2,\n\n  ]',
+    '{"a" 1}',
+    '[1 2]',
+    '{"é中": "😀", "b": tru}',
+    '\n\n  {"a": [1, 2}',
+    '{"a": 1}}',
+    '[01]',
+    '"abc',
+])
+def test_error_position_matches_json_module(tmp_path, chunk_size, text):
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(text)
+    path = tmp_path / "bad.json"
+    path.write_text(text, encoding="utf-8")
+
+    with pytest.raises(JsonStreamError) as actual:
+        JsonStreamProcessor().process(str(path))
+    assert (actual.value.line, actual.value.column) == (expected.value.lineno, expected.value.colno)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("text", ["", "   ", "[1, 2", '{"a": 1,}', "[1]x", '"\x01"', "nul", "1.", "-"])
+def test_invalid_documents_are_rejected(tmp_path, chunk_size, text):
+    path = tmp_path / "bad.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(JsonStreamError):
+        JsonStreamProcessor().process(str(path))
+
+
+def test_invalid_utf8_is_rejected(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_bytes(b'["\xff"]')
+    with pytest.raises(JsonStreamError, match="UTF-8"):
+        JsonStreamProcessor().process(str(path))
+
+
+def test_plugin_file_mode_writes_same_output_as_text_mode(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(json_formatter, "STREAM_CHUNK_SIZE", 3)
+    document = {"name": "测试😀", "items": [{"id": i, "tags": ["é", "中"]} for i in range(20)]}
+    text = json.dumps(document, ensure_ascii=False)
+    (tmp_path / "doc.json").write_text(text, encoding="utf-8")
+    plugin = json_formatter.JsonFormatterPlugin()
+
+    in_memory = plugin.execute({"json_text": text, "operation": "format", "indent": 2})
+    streamed = plugin.execute({"input_file": str(tmp_path / "doc.json"), "operation": "format", "indent": 2})
+    assert streamed["success"], streamed["message"]
+    with open(streamed["data"]["output_path"], encoding="utf-8") as f:
+        assert f.read() == in_memory["data"]["result"]
+    for key in ("keys_count", "depth", "structure", "longest_array", "largest_object", "string_bytes"):
+        assert streamed["data"][key] == in_memory["data"][key]
@@ -0,0 +1,192 @@
+"""
+plugins/json_formatter.py 的JSON Lines（NDJSON）文件处理：文件按很小的字节区间切分（单进程和进程池两种路径），
+结果与逐行 json.loads/json.dumps 的内存处理逐字节对比，并检查跨区间的全局行号
+"""
+import codecs
+import json
+import random
+
+import pytest
+
+import config
+import plugins.json_formatter as json_formatter
+from plugins.json_formatter import analyze_json, empty_json_stats, merge_json_stats
+
+CHUNK_BYTES = [1, 7, 64, 1000]
+
+_STRINGS = ["", "a", "é", "中文", "😀", "a\"b", "tab\tnew", "ñ😀中"]
+_INVALID_LINES = [b'{"a": 1,}', b'{"\xc3\xa9": \xe4\xb8\xad}', b'"\xff"', b"[1, 2", b"nul", b'{"a" 1}']
+
+
+def _random_record(rng):
+    return {
+        rng.choice(_STRINGS) + str(i): rng.choice([
+            rng.randint(-1000, 1000),
+            rng.choice(_STRINGS),
+            [rng.choice(_STRINGS) for _ in range(rng.randint(0, 3))],
+            {"n": 0.5, "s": rng.choice(_STRINGS)},
+            None,
+            True
+        ])
+        for i in range(rng.randint(0, 4))
+    }
+
+
+def _random_ndjson(rng, count):
+    """随机生成NDJSON字节串：有效记录、空行、空白行、CRLF行尾和无效记录混合，可能有BOM、末行可能没有换行符"""
+    lines = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.1:
+            line = rng.choice([b"", b"   ", b"\t"])
+        elif roll < 0.2:
+            line = rng.choice(_INVALID_LINES)
+        else:
+            record = _random_record(rng)
+            line = json.dumps(record, ensure_ascii=rng.random() < 0.3,
+                              separators=rng.choice([None, (",", ":")])).encode("utf-8")
+        lines.append(line + rng.choice([b"\n", b"\n", b"\r\n"]))
+    data = b"".join(lines)
+    if rng.random() < 0.3:
+        data = data.rstrip(b"\r\n")
+    if rng.random() < 0.3:
+        data = codecs.BOM_UTF8 + data
+    return data
+
+
+def _in_memory(data, separators):
+    """逐行在内存中解析，返回与插件相同口径的统计、全局行号和每条有效记录重新序列化的输出"""
+    lines = data.split(b"\n") if data else []
+    if data.endswith(b"\n"):
+        lines.pop()
+    if lines and lines[0].startswith(codecs.BOM_UTF8):
+        lines[0] = lines[0][len(codecs.BOM_UTF8):]
+    blank_lines = 0
+    invalid_lines = []
+    output = []
+    stats = empty_json_stats()
+    for number, raw in enumerate(lines, 1):
+        if not raw.strip():
+            blank_lines += 1
+            continue
+        try:
+            obj = json.loads(raw.decode("utf-8").rstrip("\r"))
+        except UnicodeDecodeError:
+            invalid_lines.append((number, None))
+            continue
+        except json.JSONDecodeError as e:
+            invalid_lines.append((number, e.colno))
+            continue
+        merge_json_stats(stats, analyze_json(obj))
+        output.append(json.dumps(obj, separators=separators, ensure_ascii=False) + "\n")
+    return {
+        "lines": len(lines),
+        "records": len(output),
+        "blank_lines": blank_lines,
+        "invalid_lines": invalid_lines,
+        "output": "".join(output),
+        "stats": stats
+    }
+
+
+@pytest.fixture
+def ndjson_env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "JSON_NDJSON_WORKERS", 1, raising=False)
+    # 输出批量写入的阈值也调小，区间内的多次写入同样被覆盖
+    monkeypatch.setattr(json_formatter, "STREAM_CHUNK_SIZE", 16)
+    return tmp_path
+
+
+def _set_chunk_bytes(monkeypatch, chunk_bytes, workers=1):
+    monkeypatch.setattr(config, "JSON_NDJSON_CHUNK_BYTES", chunk_bytes, raising=False)
+    monkeypatch.setattr(config, "JSON_NDJSON_WORKERS", workers, raising=False)
+
+
+# 单进程覆盖各种区间大小；进程池（spawn启动较慢）只取一种区间大小
+CHUNK_PARAMS = [(chunk_bytes, 1) for chunk_bytes in CHUNK_BYTES] + [(7, 3)]
+
+
+@pytest.mark.parametrize("chunk_bytes, workers", CHUNK_PARAMS)
+def test_format_and_compress_match_line_by_line_processing(ndjson_env, monkeypatch, chunk_bytes, workers):
+    _set_chunk_bytes(monkeypatch, chunk_bytes, workers)
+    rng = random.Random(chunk_bytes)
+    plugin = json_formatter.JsonFormatterPlugin()
+    for round_index in range(4):
+        data = _random_ndjson(rng, rng.randint(0, 60))
+        path = ndjson_env / f"records{round_index}.jsonl"
+        path.write_bytes(data)
+
+        for operation, separators in (("format", (", ", ": ")), ("compress", (",", ":"))):
+            expected = _in_memory(data, separators)
+            result = plugin.execute({"input_file": str(path), "operation": operation})
+            assert result["success"], result["message"]
+            result_data = result["data"]
+            with open(result_data["output_path"], encoding="utf-8") as f:
+                assert f.read() == expected["output"]
+            for key in ("lines", "records", "blank_lines"):
+                assert result_data[key] == expected[key]
+            assert [(item["line"], item["column"]) for item in result_data["invalid_lines"]] == \
+                expected["invalid_lines"]
+            assert result_data["invalid_records"] == len(expected["invalid_lines"])
+            for key, value in expected["stats"].items():
+                assert result_data[key] == value
+
+
+@pytest.mark.parametrize("chunk_bytes, workers", CHUNK_PARAMS)
+def test_invalid_line_numbers_across_chunk_boundaries(ndjson_env, monkeypatch, chunk_bytes, workers):
+    _set_chunk_bytes(monkeypatch, chunk_bytes, workers)
+    path = ndjson_env / "records.ndjson"
+    path.write_bytes(codecs.BOM_UTF8 + b"\r\n".join([
+        '{"name": "中文😀"}'.encode("utf-8"),    # 1
+        b"",                                     # 2
+        b'{"a": 1,}',                            # 3
+        b"   ",                                  # 4
+        '["é", "😀"]'.encode("utf-8"),            # 5
+        b'"\xff"',                               # 6
+        b"",                                     # 7
+        b"",                                     # 8
+        b'{"x": [1, 2}',                         # 9
+        b"true",                                 # 10
+        '{"中": tru}'.encode("utf-8"),            # 11
+    ]))
+    result = json_formatter.JsonFormatterPlugin().execute({"input_file": str(path), "operation": "validate"})
+
+    assert not result["success"]
+    data = result["data"]
+    assert (data["lines"], data["records"], data["blank_lines"], data["invalid_records"]) == (11, 3, 4, 4)
+    assert not data["valid"]
+    assert [(item["line"], item["column"]) for item in data["invalid_lines"]] == \
+        [(3, 9), (6, None), (9, 12), (11, 7)]
+
+
+def test_max_errors_truncates_invalid_lines_across_chunks(ndjson_env, monkeypatch):
+    _set_chunk_bytes(monkeypatch, 5, workers=3)
+    monkeypatch.setattr(config, "JSON_NDJSON_MAX_ERRORS", 3, raising=False)
+    path = ndjson_env / "records.ndjson"
+    path.write_text("\n".join(["{}", "x", "[]", "y", "z", "w"]), encoding="utf-8")
+    result = json_formatter.JsonFormatterPlugin().execute({"input_file": str(path), "operation": "validate"})
+
+    data = result["data"]
+    assert data["invalid_records"] == 4
+    assert [item["line"] for item in data["invalid_lines"]] == [2, 4, 5]
+    assert data["invalid_lines_truncated"]
+
+
+def test_input_format_override_and_empty_file(ndjson_env, monkeypatch):
+    _set_chunk_bytes(monkeypatch, 1)
+    path = ndjson_env / "records.txt"
+    path.write_text('{"a": "é"}\n[1,2]\n', encoding="utf-8")
+    plugin = json_formatter.JsonFormatterPlugin()
+
+    result = plugin.execute({"input_file": str(path), "operation": "compress", "input_format": "ndjson"})
+    assert result["success"], result["message"]
+    with open(result["data"]["output_path"], encoding="utf-8") as f:
+        assert f.read() == '{"a":"é"}\n[1,2]\n'
+
+    empty = ndjson_env / "empty.ndjson"
+    empty.write_bytes(b"")
+    result = plugin.execute({"input_file": str(empty), "operation": "format"})
+    assert result["success"], result["message"]
+    assert (result["data"]["lines"], result["data"]["records"]) == (0, 0)
+    assert result["data"]["formatted_size"] == 0
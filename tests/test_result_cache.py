@@ -0,0 +1,92 @@
+"""
+backend/result_cache.py 的磁盘溢出：重复溢出同一个键时磁盘占用不重复累计，磁盘命中放回内存后删除对应文件，
+超出磁盘配额时清理最早写入的文件
+"""
+import os
+import threading
+
+from backend.result_cache import ResultCache
+
+
+def _disk_size(spill_dir):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(spill_dir) for name in files)
+
+
+def test_spilling_same_key_again_is_counted_once(tmp_path):
+    cache = ResultCache(max_entries=1, spill_dir=str(tmp_path))
+    for value in range(5):
+        cache.put("a" * 64, {"value": value})
+        cache.put("b" * 64, {"value": value})  # 把 a 挤到磁盘
+    assert cache.stats()["spill_bytes"] == _disk_size(tmp_path)
+    assert cache.get("a" * 64) == {"value": 4}
+
+
+def test_disk_hit_is_moved_back_to_memory(tmp_path):
+    cache = ResultCache(max_entries=2, spill_dir=str(tmp_path))
+    for key in ("a", "b", "c"):
+        cache.put(key * 64, {"key": key})
+    assert os.path.exists(cache._spill_path("a" * 64))
+
+    assert cache.get("a" * 64) == {"key": "a"}
+    # a 放回内存后删除其文件，被挤出的 b 写入磁盘
+    assert not os.path.exists(cache._spill_path("a" * 64))
+    assert os.path.exists(cache._spill_path("b" * 64))
+    stats = cache.stats()
+    assert (stats["entries"], stats["disk_hits"]) == (2, 1)
+    assert stats["spill_bytes"] == _disk_size(tmp_path)
+
+
+def test_entries_larger_than_memory_stay_on_disk(tmp_path):
+    cache = ResultCache(max_bytes=10, spill_dir=str(tmp_path))
+    cache.put("a" * 64, {"value": "x" * 100})
+    for _ in range(2):
+        assert cache.get("a" * 64) == {"value": "x" * 100}
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["spill_bytes"] == _disk_size(tmp_path)
+
+
+def test_expired_disk_entry_is_removed(tmp_path):
+    cache = ResultCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a" * 64, {"value": 1}, ttl=0.05)
+    cache.put("b" * 64, {"value": 2})
+    cache._write_spills([("c" * 64, "{}", 0)])  # 直接写入一个已过期的磁盘条目
+    assert cache.get("c" * 64) is None
+    assert not os.path.exists(cache._spill_path("c" * 64))
+    assert cache.stats()["spill_bytes"] == _disk_size(tmp_path)
+
+
+def test_prune_keeps_disk_within_quota(tmp_path):
+    cache = ResultCache(max_entries=1, spill_dir=str(tmp_path), spill_max_bytes=2000)
+    for i in range(100):
+        cache.put(f"{i:064d}", {"value": "x" * 50})
+    assert _disk_size(tmp_path) <= 2000
+    assert cache.stats()["spill_bytes"] == _disk_size(tmp_path)
+
+
+def test_disk_writes_do_not_hold_the_lock(tmp_path, monkeypatch):
+    cache = ResultCache(max_entries=1, spill_dir=str(tmp_path))
+    cache.put("a" * 64, {"value": 1})
+    writing = threading.Event()
+    release = threading.Event()
+    original = cache._write_spill
+
+    def slow_write(*args):
+        writing.set()
+        release.wait(5)
+        return original(*args)
+
+    monkeypatch.setattr(cache, "_write_spill", slow_write)
+    thread = threading.Thread(target=cache.put, args=("b" * 64, {"value": 2}))
+    thread.start()
+    try:
+        assert writing.wait(5)
+        # 溢出写入进行中，内存查询不被阻塞
+        acquired = cache._lock.acquire(timeout=1)
+        assert acquired
+        cache._lock.release()
+        assert cache.get("b" * 64) == {"value": 2}
+    finally:
+        release.set()
+        thread.join()
+    assert os.path.exists(cache._spill_path("a" * 64))
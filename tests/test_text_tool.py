@@ -0,0 +1,118 @@
+"""
+plugins/text_tool.py 的文件流式处理：在很小的读取块大小下与 execute({"text": ...}) 的内存处理结果对比，
+覆盖被块边界截断的多字节字符、跨块的 \\r\\n 和单词、BOM、无效UTF-8字节和空文件
+"""
+import codecs
+import random
+
+import pytest
+
+import plugins.text_tool as text_tool
+from plugins.text_tool import TextCounter, TextToolPlugin, WordAlignedBuffer
+
+CHUNK_SIZES = [1, 2, 3, 4, 5, 7]
+OPERATIONS = ["uppercase", "lowercase", "reverse", "count"]
+
+# 1~4字节的UTF-8字符、各种行边界和空白、组合字符、大小写转换会改变长度的字符和希腊字母Σ（词尾小写为ς）
+_ALPHABET = ["a", "Z", " ", "\t", "\n", "\r", "\r\n", "\v", "\x85", " ", "　", "é", "ß", "İ",
+             "中", "文", "😀", "🇨🇳", "é", "ΟΔΟΣ", "Σ", "ﬁ"]
+
+
+@pytest.fixture
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(text_tool, "STREAM_CHUNK_SIZE", request.param)
+    return request.param
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return TextToolPlugin()
+
+
+def _random_text(rng, length):
+    return "".join(rng.choice(_ALPHABET) for _ in range(length))
+
+
+def _run_file(plugin, path, operation):
+    result = plugin.execute({"input_file": str(path), "operation": operation})
+    assert result["success"], result["message"]
+    if operation == "count":
+        return {key: result["data"][key] for key in ("length", "words", "lines")}
+    with open(result["data"]["output_path"], "rb") as f:
+        return f.read()
+
+
+def _run_text(plugin, text, operation):
+    result = plugin.execute({"text": text, "operation": operation})
+    assert result["success"], result["message"]
+    if operation == "count":
+        return result["data"]
+    return result["data"].encode("utf-8", "surrogateescape")
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_file_mode_matches_text_mode(plugin, tmp_path, chunk_size, operation):
+    rng = random.Random(f"{chunk_size}-{operation}")
+    path = tmp_path / "input.txt"
+    for _ in range(30):
+        text = _random_text(rng, rng.randint(0, 40))
+        path.write_text(text, encoding="utf-8", newline="")
+        assert _run_file(plugin, path, operation) == _run_text(plugin, text, operation)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_bom_is_skipped(plugin, tmp_path, chunk_size, operation):
+    text = "😀中é\r\nabc"
+    path = tmp_path / "input.txt"
+    path.write_bytes(codecs.BOM_UTF8 + text.encode("utf-8"))
+    assert _run_file(plugin, path, operation) == _run_text(plugin, text, operation)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_invalid_bytes_are_preserved(plugin, tmp_path, chunk_size, operation):
+    rng = random.Random(chunk_size)
+    path = tmp_path / "input.txt"
+    pieces = [b"\xff", b"\x80", b"\x80\x80\x80\x80", b"\xe4\xb8", b"\xf0\x9f\x98", b"\xc3"]
+    for _ in range(30):
+        data = b"".join(rng.choice(pieces) if rng.random() < 0.3 else rng.choice(_ALPHABET).encode("utf-8")
+                        for _ in range(rng.randint(0, 20)))
+        path.write_bytes(data)
+        # 无效字节按 surrogateescape 解码为单独的字符，与整体解码后在内存中处理的结果一致
+        text = data.decode("utf-8", "surrogateescape")
+        assert _run_file(plugin, path, operation) == _run_text(plugin, text, operation)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES, indirect=True)
+@pytest.mark.parametrize("operation", OPERATIONS)
+def test_empty_file(plugin, tmp_path, chunk_size, operation):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    expected = {"length": 0, "words": 0, "lines": 0} if operation == "count" else b""
+    assert _run_file(plugin, path, operation) == expected
+
+
+@pytest.mark.parametrize("text", ["", "a", "a b", " a ", "\r\n", "a\r\nb\r", "x\n\n", "ab cd\x85", "😀 中文\r\n"])
+def test_counter_matches_builtins_for_every_split(text):
+    expected = {"length": len(text), "words": len(text.split()), "lines": len(text.splitlines())}
+    for cut in range(len(text) + 1):
+        counter = TextCounter()
+        counter.feed(text[:cut])
+        counter.feed(text[cut:])
+        assert counter.result() == expected
+
+
+def test_word_aligned_buffer_splits_at_whitespace_and_bounds_carry(monkeypatch):
+    monkeypatch.setattr(WordAlignedBuffer, "MAX_CARRY", 4)
+    pieces = []
+    buffer = WordAlignedBuffer(pieces.append)
+    for text in ["ab c", "dΣ e", "fghijk", "lm", ""]:
+        buffer.feed(text)
+    buffer.flush()
+    assert "".join(pieces) == "ab cdΣ efghijklm"
+    assert pieces[:2] == ["ab ", "cdΣ "]
+    # 超过 MAX_CARRY 个字符仍没有空白时整块交出
+    assert pieces[2] == "efghijk"